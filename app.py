@@ -1,11 +1,35 @@
-from flask import Flask
+from typing import Callable, Optional
 
-app = Flask(__name__)
+from flask import Flask, jsonify
 
+from src.domain.fortune.algorithm_registry import algorithm_registry
+from src.domain.fortune.services import FortuneCalculationService
+from src.infrastructure.monitoring.algorithm_warm_up import init_algorithm_warm_up
 
-@app.route('/')
-def hello_world():  # put application's code here
-    return 'Hello World!'
+
+def create_app(fortune_service_factory: Optional[Callable[[], FortuneCalculationService]] = None) -> Flask:
+    """fortune_service_factory 返回本进程共享的命理计算服务，启动时为其预加载动态配置快照"""
+    app = Flask(__name__)
+
+    @app.route('/')
+    def hello_world():  # put application's code here
+        return 'Hello World!'
+
+    @app.route('/readyz')
+    def readiness_check():
+        # 算法注册表在后台预热，完成前返回503
+        algorithms = algorithm_registry.readiness()
+        status = 200 if algorithms["ready"] else 503
+        return jsonify({"status": "READY" if algorithms["ready"] else "NOT_READY",
+                        "algorithms": algorithms}), status
+
+    # 启动时在后台线程中预热算法注册表（只预热内置算法）并预加载配置快照
+    app.extensions["algorithm_warm_up"] = init_algorithm_warm_up(
+        app, fortune_service_factory=fortune_service_factory)
+    return app
+
+
+app = create_app()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,146 @@
+# src/application/services/fortune_batch_app_service.py
+"""
+批量命理分析应用服务
+营销活动、节气重算等任务按用户ID分块执行批量分析：每块一次查询出生信息、
+整批计算命盘、一次批量写入结果。每块完成后写入进度检查点，
+工作进程重启后同一作业从最后完成的块之后继续。
+
+结果写入与检查点不在同一事务中：块已写入但检查点未保存时进程退出，恢复后该块会重新计算并写入。
+因此分析结果的ID由作业ID与用户ID确定（batch_analysis_id），save_many 按ID覆盖写入，
+重写同一块不会产生重复行。
+"""
+
+import time
+from dataclasses import dataclass, field, asdict
+from typing import Dict, Any, Optional, Callable, List
+from uuid import UUID, uuid5
+import logging
+
+from src.domain.fortune.repositories import BirthDataRepository, FortuneAnalysisRepository
+from src.domain.fortune.services import FortuneCalculationService
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 500
+CHECKPOINT_TTL = 7 * 86400
+# 批量分析结果ID的命名空间
+BATCH_ANALYSIS_NAMESPACE = UUID("6f1c1a52-3b7e-4f0e-9a43-5b8d2f0c7e91")
+
+
+def batch_analysis_id(job_id: str, user_id: UUID) -> UUID:
+    """批量作业中某用户分析结果的确定性ID（同一作业重算同一用户时ID不变）"""
+    return uuid5(BATCH_ANALYSIS_NAMESPACE, f"{job_id}:{user_id}")
+
+
+@dataclass
+class BatchJobProgress:
+    """批量作业进度（作为检查点持久化，也作为任务进度上报）"""
+    job_id: str
+    total: int
+    next_offset: int = 0  # 下一个待处理块在用户ID列表中的起始位置
+    succeeded: int = 0
+    failed: int = 0
+    missing: int = 0  # 未登记出生信息的用户数
+    elapsed_seconds: float = 0.0  # 累计计算耗时（跨重启累加）
+    completed: bool = False
+    failures: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def processed(self) -> int:
+        return self.succeeded + self.failed + self.missing
+
+    @property
+    def throughput(self) -> float:
+        """每秒处理的用户数"""
+        return round(self.processed / self.elapsed_seconds, 2) if self.elapsed_seconds else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**asdict(self), "processed": self.processed, "throughput": self.throughput}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "BatchJobProgress":
+        fields = cls.__dataclass_fields__
+        return cls(**{k: v for k, v in data.items() if k in fields})
+
+
+class FortuneBatchAppService:
+    """按块执行批量命理分析并维护可恢复的进度检查点"""
+
+    def __init__(self,
+                 fortune_service: FortuneCalculationService,
+                 birth_data_repository: BirthDataRepository,
+                 analysis_repository: FortuneAnalysisRepository,
+                 checkpoint_store: Optional[Any] = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 max_recorded_failures: int = 1000):
+        self.fortune_service = fortune_service
+        self.birth_data_repo = birth_data_repository
+        self.analysis_repo = analysis_repository
+        self.checkpoint_store = checkpoint_store  # 需提供 get(key) / set(key, value, ttl=)
+        self.chunk_size = chunk_size
+        self.max_recorded_failures = max_recorded_failures
+
+    def run(self,
+            job_id: str,
+            user_ids: List[UUID],
+            analysis_types: Optional[List[str]] = None,
+            on_progress: Optional[Callable[[BatchJobProgress], None]] = None) -> BatchJobProgress:
+        """执行（或从检查点恢复）批量分析作业，每完成一块回调一次进度"""
+        progress = self._load_checkpoint(job_id)
+        if progress is None or progress.total != len(user_ids):
+            progress = BatchJobProgress(job_id=job_id, total=len(user_ids))
+        elif progress.next_offset:
+            logger.info(f"Resuming fortune batch {job_id} at {progress.next_offset}/{progress.total}")
+
+        for offset in range(progress.next_offset, len(user_ids), self.chunk_size):
+            started = time.perf_counter()
+            chunk = user_ids[offset:offset + self.chunk_size]
+
+            births = self.birth_data_repo.find_by_user_ids(chunk)
+            batch = self.fortune_service.calculate_fortune_analysis_batch(births, analysis_types)
+            for analysis in batch.analyses:
+                analysis.id = batch_analysis_id(job_id, analysis.user_id)
+            # 按ID覆盖写入：上次在写入后、检查点前中断的块重写时不产生重复行
+            self.analysis_repo.save_many(batch.analyses)
+
+            progress.succeeded += len(batch.analyses)
+            progress.failed += len(batch.failed)
+            progress.missing += len(chunk) - len(births)
+            for user_id, reason in batch.failed.items():
+                if len(progress.failures) >= self.max_recorded_failures:
+                    break
+                progress.failures[str(user_id)] = reason
+            progress.next_offset = offset + len(chunk)
+            progress.elapsed_seconds += time.perf_counter() - started
+            self._save_checkpoint(progress)
+
+            logger.info(f"Fortune batch {job_id}: {progress.processed}/{progress.total} users, "
+                        f"{progress.throughput} users/s")
+            if on_progress:
+                on_progress(progress)
+
+        progress.completed = True
+        self._save_checkpoint(progress)
+        return progress
+
+    def _checkpoint_key(self, job_id: str) -> str:
+        return f"fortune_batch:checkpoint:{job_id}"
+
+    def _load_checkpoint(self, job_id: str) -> Optional[BatchJobProgress]:
+        if self.checkpoint_store is None:
+            return None
+        try:
+            data = self.checkpoint_store.get(self._checkpoint_key(job_id))
+        except Exception as e:
+            logger.warning(f"Failed to load checkpoint for fortune batch {job_id}: {e}")
+            return None
+        return BatchJobProgress.from_dict(data) if data else None
+
+    def _save_checkpoint(self, progress: BatchJobProgress) -> None:
+        if self.checkpoint_store is None:
+            return
+        try:
+            self.checkpoint_store.set(self._checkpoint_key(progress.job_id), asdict(progress), ttl=CHECKPOINT_TTL)
+        except Exception as e:
+            # 检查点写入失败只影响重启后的恢复位置，不中断作业
+            logger.warning(f"Failed to save checkpoint for fortune batch {progress.job_id}: {e}")
@@ -0,0 +1,61 @@
+# src/application/tasks/fortune_tasks.py
+"""
+命理分析异步任务
+批量分析任务在消息确认前执行完毕（acks_late），工作进程意外退出时消息重新投递，
+同一 job_id 从进度检查点继续，已完成的块不会重复计算。
+"""
+
+from typing import Dict, Any, Optional, Callable, List
+from uuid import UUID
+import logging
+
+from celery import shared_task
+
+from src.application.services.fortune_batch_app_service import FortuneBatchAppService, BatchJobProgress
+from src.domain.fortune.services import FortuneCalculationService
+
+logger = logging.getLogger(__name__)
+
+_batch_service_factory: Optional[Callable[[], FortuneBatchAppService]] = None
+
+
+def configure_fortune_tasks(batch_service_factory: Callable[[], FortuneBatchAppService]) -> None:
+    """
+    工作进程启动时注册批量分析服务的构造方法（依赖仓库与缓存在工作进程内创建）。
+    各次构造应共用进程内同一个动态配置服务，worker 启动时预加载的配置快照才能被任务读取
+    """
+    global _batch_service_factory
+    _batch_service_factory = batch_service_factory
+
+
+def configured_fortune_service() -> Optional[FortuneCalculationService]:
+    """已注册批量分析服务时返回其命理计算服务（worker进程启动时预加载配置），否则返回None"""
+    if _batch_service_factory is None:
+        return None
+    return _batch_service_factory().fortune_service
+
+
+@shared_task(bind=True,
+             name="fortune.calculate_analysis_batch",
+             acks_late=True,
+             reject_on_worker_lost=True,
+             autoretry_for=(ConnectionError, TimeoutError),
+             retry_backoff=True,
+             max_retries=5)
+def calculate_fortune_analysis_batch(self,
+                                     job_id: str,
+                                     user_ids: List[str],
+                                     analysis_types: Optional[List[str]] = None) -> Dict[str, Any]:
+    """批量命理分析：按块计算并写入结果，通过任务状态上报进度与吞吐量"""
+    if _batch_service_factory is None:
+        raise RuntimeError("Fortune tasks are not configured, call configure_fortune_tasks at worker startup")
+
+    def report(progress: BatchJobProgress) -> None:
+        self.update_state(state="PROGRESS", meta=progress.to_dict())
+
+    progress = _batch_service_factory().run(job_id, [UUID(u) for u in user_ids], analysis_types,
+                                            on_progress=report)
+    logger.info(f"Fortune batch {job_id} completed: {progress.succeeded} succeeded, "
+                f"{progress.failed} failed, {progress.missing} without birth data, "
+                f"{progress.throughput} users/s")
+    return progress.to_dict()
@@ -0,0 +1,129 @@
+# src/config/constants_compiler.py
+"""
+常量编译
+构建阶段将 constants.yaml 编译为可直接导入的 constants_compiled.py：
+列表冻结为元组，并预先生成干支/五行编码查找表、五行关系矩阵与十神矩阵，
+同时写入常量内容摘要（缓存键使用）与 YAML 源文件摘要（检测编译产物是否过期）。
+
+    python -m src.config.constants_compiler
+"""
+
+import hashlib
+import logging
+import os
+import pprint
+from typing import Dict, Any, Tuple
+
+logger = logging.getLogger(__name__)
+
+CONFIG_DIR = os.path.dirname(os.path.abspath(__file__))
+SOURCE_PATH = os.path.join(CONFIG_DIR, "constants.yaml")
+OUTPUT_PATH = os.path.join(CONFIG_DIR, "constants_compiled.py")
+
+# 五行编码顺序（木火土金水，相邻即相生）
+ELEMENTS: Tuple[str, ...] = ("木", "火", "土", "金", "水")
+
+
+def source_digest(path: str = SOURCE_PATH) -> str:
+    """YAML 源文件字节的SHA-256"""
+    with open(path, "rb") as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+def freeze(value: Any) -> Any:
+    """列表递归冻结为元组（字典保持为dict，值递归冻结）"""
+    if isinstance(value, dict):
+        return {k: freeze(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+def _element_relation(relations: Dict[str, Dict[str, str]], a: str, b: str) -> str:
+    if a == b:
+        return "比和"
+    if relations[a]["生"] == b:
+        return "相生"
+    if relations[a]["克"] == b:
+        return "相克"
+    if relations[b]["生"] == a:
+        return "被生"
+    if relations[b]["克"] == a:
+        return "被克"
+    return "平"
+
+
+def compile_tables(constants: Dict[str, Any]) -> Dict[str, Any]:
+    """由常量生成编码查找表（均为元组），天干0-9、地支0-11、五行按 ELEMENTS 编码"""
+    stems = list(constants["HEAVENLY_STEMS"])
+    branches = list(constants["EARTHLY_BRANCHES"])
+    element_codes = {e: i for i, e in enumerate(ELEMENTS)}
+    stem_codes = {s: i for i, s in enumerate(stems)}
+    wuxing_map = constants["WUXING_MAP"]
+    relations = constants["WUXING_RELATIONS"]
+
+    ten_god_names = tuple(constants["TEN_GODS_MAP"].keys())
+    ten_gods = [[-1] * 10 for _ in range(10)]
+    for g, name in enumerate(ten_god_names):
+        for pair in constants["TEN_GODS_MAP"][name]:
+            ten_gods[stem_codes[pair[0]]][stem_codes[pair[1]]] = g
+
+    hidden_stems = tuple(
+        tuple((stem_codes[stem], float(weight)) for stem, weight in constants["BRANCH_HIDDEN_STEMS"][b])
+        for b in branches
+    )
+
+    return {
+        "ELEMENTS": ELEMENTS,
+        "STEM_ELEMENT": tuple(element_codes[wuxing_map[s]] for s in stems),
+        "BRANCH_ELEMENT": tuple(element_codes[wuxing_map[b]] for b in branches),
+        "ELEMENT_GENERATES": tuple(element_codes[relations[e]["生"]] for e in ELEMENTS),
+        "ELEMENT_CONTROLS": tuple(element_codes[relations[e]["克"]] for e in ELEMENTS),
+        "ELEMENT_GENERATED_BY": tuple(element_codes[relations[e]["被生"]] for e in ELEMENTS),
+        "ELEMENT_CONTROLLED_BY": tuple(element_codes[relations[e]["被克"]] for e in ELEMENTS),
+        "ELEMENT_RELATION": tuple(tuple(_element_relation(relations, a, b) for b in ELEMENTS) for a in ELEMENTS),
+        "BRANCH_HIDDEN_STEMS": hidden_stems,
+        "TEN_GOD_NAMES": ten_god_names,
+        "TEN_GODS": tuple(tuple(row) for row in ten_gods)
+    }
+
+
+def render_module(constants: Dict[str, Any], digest: str, src_digest: str) -> str:
+    """生成 constants_compiled.py 源码"""
+    def literal(value: Any) -> str:
+        return pprint.pformat(value, width=110, sort_dicts=False)
+
+    return "\n".join([
+        "# src/config/constants_compiled.py",
+        '"""由 constants.yaml 编译生成，请勿手工修改（python -m src.config.constants_compiler）"""',
+        "",
+        f"SOURCE_DIGEST = {src_digest!r}",
+        f"CONSTANTS_DIGEST = {digest!r}",
+        "",
+        f"CONSTANTS = {literal(freeze(constants))}",
+        "",
+        f"TABLES = {literal(compile_tables(constants))}",
+        ""
+    ])
+
+
+def compile_constants(source_path: str = SOURCE_PATH, output_path: str = OUTPUT_PATH) -> str:
+    """编译 YAML 常量并写入输出模块，返回常量内容摘要"""
+    import yaml
+    from src.config.loader import constants_digest
+
+    with open(source_path, "r", encoding="utf-8") as file:
+        constants = yaml.safe_load(file)
+    digest = constants_digest(constants)
+
+    tmp_path = output_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        file.write(render_module(constants, digest, source_digest(source_path)))
+    os.replace(tmp_path, output_path)
+    logger.info(f"Compiled {source_path} to {output_path}, constants digest {digest[:12]}")
+    return digest
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    compile_constants()
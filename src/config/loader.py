@@ -1,10 +1,24 @@
 # src/config/loader.py
+"""
+常量加载
+运行时优先导入构建阶段由 constants.yaml 编译生成的 constants_compiled
+（见 constants_compiler），不再在每次进程启动时解析YAML。
+编译产物不存在，或与当前 constants.yaml 不一致（开发环境修改了YAML）时回退为解析YAML。
+"""
+
 import os
-import yaml
-from typing import Dict, List, Any
+import json
+import hashlib
+import logging
+from typing import Dict, List, Any, Tuple
+
+logger = logging.getLogger(__name__)
+
 
 def load_constants() -> Dict[str, Any]:
     """加载YAML配置文件中的常量"""
+    import yaml
+
     config_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'config', 'constants.yaml')
     try:
         with open(config_path, 'r', encoding='utf-8') as file:
@@ -16,5 +30,35 @@ def load_constants() -> Dict[str, Any]:
         print(f"错误: 解析YAML文件失败: {e}")
         return {}
 
-# 全局常量对象
-CONSTANTS = load_constants()
\ No newline at end of file
+def constants_digest(constants: Dict[str, Any]) -> str:
+    """常量内容摘要（规范化JSON的SHA-256），常量变化时随之变化，用于缓存键"""
+    canonical = json.dumps(constants, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+def _load_compiled() -> Tuple[Dict[str, Any], str, Dict[str, Any]]:
+    """返回 (常量, 常量摘要, 编码查找表)，优先使用编译产物"""
+    from src.config import constants_compiler
+
+    try:
+        from src.config import constants_compiled as compiled
+    except ImportError:
+        compiled = None
+
+    if compiled is not None:
+        try:
+            stale = constants_compiler.source_digest() != compiled.SOURCE_DIGEST
+        except FileNotFoundError:
+            # 部署镜像中可以只保留编译产物
+            stale = False
+        if not stale:
+            return compiled.CONSTANTS, compiled.CONSTANTS_DIGEST, compiled.TABLES
+        logger.warning("constants_compiled is out of date with constants.yaml, loading YAML "
+                       "(run python -m src.config.constants_compiler)")
+
+    constants = load_constants()
+    tables = constants_compiler.compile_tables(constants) if constants else {}
+    return constants_compiler.freeze(constants), constants_digest(constants), tables
+
+
+# 全局常量对象（列表已冻结为元组）、常量内容摘要与预生成的编码查找表
+CONSTANTS, CONSTANTS_DIGEST, CONSTANT_TABLES = _load_compiled()
@@ -27,9 +27,9 @@ class AggregateRoot(ABC):
 # 将 DomainEvent 移出 AggregateRoot 类，使其成为顶级类
 @dataclass
 class DomainEvent(ABC):
-    """领域事件基类"""
-    event_id: UUID = field(default_factory=uuid4)
-    occurrence_time: str = field(default_factory=lambda: str(datetime.datetime.now()))
+    """领域事件基类（公共字段只能按关键字传入，子类可声明无默认值的字段）"""
+    event_id: UUID = field(default_factory=uuid4, kw_only=True)
+    occurrence_time: str = field(default_factory=lambda: str(datetime.datetime.now()), kw_only=True)
 
     @property
     @abstractmethod
@@ -22,4 +22,14 @@ class AlgorithmNotFoundError(DomainException):
 class ConfigNotFoundError(DomainException):
     """配置未找到异常"""
     def __init__(self, config_key: str):
-        super().__init__(f"Configuration with key {config_key} not found")
\ No newline at end of file
+        super().__init__(f"Configuration with key {config_key} not found")
+
+class EphemerisUnavailableError(DomainException):
+    """星历表存储不可用异常"""
+    def __init__(self, path: str, reason: str):
+        super().__init__(f"Ephemeris store at {path} unavailable: {reason}")
+
+class AlgorithmTimeoutError(DomainException):
+    """算法计算超时异常"""
+    def __init__(self, algorithm_name: str, timeout: float):
+        super().__init__(f"Algorithm {algorithm_name} timed out after {timeout}s")
\ No newline at end of file
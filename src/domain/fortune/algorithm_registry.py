@@ -0,0 +1,150 @@
+# src/domain/fortune/algorithm_registry.py
+"""
+进程级算法注册表
+同一进程内的所有 FortuneCalculationService 实例共享已加载的算法模块，
+只在首次使用时解析一次元数据并导入模块。Web应用与Celery工作进程启动时调用 warm_up()
+（见 monitoring.algorithm_warm_up）预先导入全部启用的算法版本并各计算一张预置命盘，
+填充节气表、干支查找表、安星表和星历页缓存。
+/readyz 通过 readiness() 报告预热状态：启动钩子登记预热（expect_warm_up）后，
+预热完成前、模块导入失败或预置命盘计算失败均视为未就绪；未登记预热的进程直接视为就绪。
+"""
+
+import importlib
+import threading
+import time
+from typing import Dict, Any, Optional, List
+import logging
+
+from src.domain.core.exceptions import AlgorithmNotFoundError
+from src.domain.fortune.repositories import AlgorithmRepository
+
+logger = logging.getLogger(__name__)
+
+# 预置命盘输入，用于预热
+CANNED_BIRTH_DATA = {
+    "birth_datetime": "1990-05-01T08:30:00",
+    "timezone": "Asia/Shanghai",
+    "gender": "male",
+    "location": {"longitude": 116.4074, "latitude": 39.9042}
+}
+CANNED_INPUTS = {
+    "bazi": CANNED_BIRTH_DATA,
+    "ziwei": {"birth_data": CANNED_BIRTH_DATA, "location_data": CANNED_BIRTH_DATA["location"]}
+}
+
+
+class AlgorithmRegistry:
+    """已加载算法模块的进程级注册表"""
+
+    def __init__(self):
+        self._modules: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._warmed = False
+        self._warm_up_expected = False
+        self._warm_up_seconds: Optional[float] = None
+        self._errors: Dict[str, str] = {}
+
+    def get(self, algorithm_type: str, version: str, algorithm_repo: AlgorithmRepository) -> Any:
+        """返回指定类型和版本的算法模块，未加载时经算法仓库解析元数据后导入"""
+        algorithm_key = f"{algorithm_type}_{version}"
+        module = self._modules.get(algorithm_key)
+        if module is not None:
+            return module
+
+        with self._lock:
+            if algorithm_key not in self._modules:
+                metadata = algorithm_repo.get_algorithm_metadata(algorithm_type, version)
+                if not metadata:
+                    raise AlgorithmNotFoundError(algorithm_type, version)
+                self._modules[algorithm_key] = self._import(algorithm_type, version, metadata.module_path)
+            return self._modules[algorithm_key]
+
+    def evict(self, algorithm_type: str, version: str) -> None:
+        """移除已加载的算法版本（停用时调用）"""
+        with self._lock:
+            self._modules.pop(f"{algorithm_type}_{version}", None)
+
+    def loaded(self) -> List[str]:
+        return sorted(self._modules)
+
+    def expect_warm_up(self) -> None:
+        """登记启动预热：此后预热完成前 readiness() 报告未就绪"""
+        with self._lock:
+            self._warm_up_expected = True
+
+    def warm_up(self, algorithm_repo: Optional[AlgorithmRepository] = None) -> Dict[str, Any]:
+        """预导入全部启用的算法版本，并对每个版本计算预置命盘；未传算法仓库时只预热内置算法"""
+        started = time.perf_counter()
+        errors = {}
+
+        try:
+            _warm_builtin_tables()
+        except Exception as e:
+            logger.error(f"Built-in table warm-up failed: {e}")
+            errors["builtin"] = str(e)
+
+        for metadata in (algorithm_repo.list_algorithms() if algorithm_repo is not None else []):
+            if not metadata.is_active:
+                continue
+            algorithm_key = f"{metadata.algorithm_type}_{metadata.version}"
+            try:
+                module = self.get(metadata.algorithm_type, metadata.version, algorithm_repo)
+            except AlgorithmNotFoundError as e:
+                errors[algorithm_key] = str(e)
+                continue
+
+            canned = CANNED_INPUTS.get(metadata.algorithm_type)
+            if canned is not None:
+                try:
+                    module.calculate(canned)
+                except Exception as e:
+                    # 模块能导入但算不出预置命盘，同样不能接收流量
+                    logger.error(f"Canned chart failed for {algorithm_key}: {e}")
+                    errors[algorithm_key] = f"Canned chart failed: {e}"
+
+        with self._lock:
+            self._errors = errors
+            self._warmed = True
+            self._warm_up_seconds = time.perf_counter() - started
+        logger.info(f"Algorithm registry warmed in {self._warm_up_seconds:.2f}s, "
+                    f"loaded: {', '.join(self.loaded()) or 'none'}")
+        return self.readiness()
+
+    def readiness(self) -> Dict[str, Any]:
+        """预热状态：已完成预热（或未登记预热）且没有导入失败的算法即为就绪"""
+        return {
+            "ready": (self._warmed or not self._warm_up_expected) and not self._errors,
+            "warmed": self._warmed,
+            "warm_up_seconds": round(self._warm_up_seconds, 3) if self._warm_up_seconds is not None else None,
+            "loaded": self.loaded(),
+            "errors": dict(self._errors)
+        }
+
+    def _import(self, algorithm_type: str, version: str, module_path: str) -> Any:
+        try:
+            module = importlib.import_module(module_path)
+        except ImportError as e:
+            logger.error(f"Failed to import algorithm module: {module_path}, Error: {e}")
+            raise AlgorithmNotFoundError(algorithm_type, version)
+        if not hasattr(module, 'calculate'):
+            raise AlgorithmNotFoundError(f"Algorithm module {module_path} missing 'calculate' function")
+        logger.info(f"Loaded {algorithm_type} algorithm version {version} from module: {module_path}")
+        return module
+
+
+def _warm_builtin_tables() -> None:
+    """加载节气表、干支查找表、安星表与星历存储，并各计算一张预置八字、紫微命盘"""
+    from src.domain.fortune.algorithms.bazi import calculate_bazi
+    from src.domain.fortune.algorithms.ziwei import get_ziwei_calculator
+
+    calculate_bazi(CANNED_BIRTH_DATA)
+    # 紫微排盘经过真太阳时、日月星历、安星表与命盘图全部步骤
+    get_ziwei_calculator().calculate(CANNED_BIRTH_DATA, CANNED_BIRTH_DATA["location"])
+
+
+algorithm_registry = AlgorithmRegistry()
+
+
+def warm_up(algorithm_repo: Optional[AlgorithmRepository] = None) -> Dict[str, Any]:
+    """进程启动钩子"""
+    return algorithm_registry.warm_up(algorithm_repo)
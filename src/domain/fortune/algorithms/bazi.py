@@ -1,11 +1,18 @@
-from typing import Dict, Any, Tuple, List
+from typing import Dict, Any, Tuple, List, Optional
 import datetime
 import pytz
-import ephem
-import lunardate
-import numpy as np
-from collections import Counter
 from src.config.loader import CONSTANTS
+from src.domain.fortune.algorithms import calendar_index
+from src.domain.fortune.algorithms.lunar import solar_to_lunar
+from src.domain.fortune.algorithms.luck_pillars import calculate_luck_pillars
+from src.domain.fortune.algorithms.solar_terms import (
+    get_term_instant, last_term_index, find_nearest_jie
+)
+from src.domain.fortune.algorithms.ganzhi import (
+    STEM_CODES, BRANCH_CODES, STEM_ELEMENT, BRANCH_HIDDEN_STEMS as BRANCH_HIDDEN_STEM_CODES, ELEMENTS,
+    MONTH_STEM_START, HOUR_STEM_START, CYCLE_STEM, CYCLE_BRANCH, TEN_GODS, TEN_GOD_NAMES, UNKNOWN_GOD,
+    is_yang_stem
+)
 
 # # 天干地支映射
 # HEAVENLY_STEMS = ["甲", "乙", "丙", "丁", "戊", "己", "庚", "辛", "壬", "癸"]
@@ -28,6 +35,7 @@ from src.config.loader import CONSTANTS
 #     "金": {"生": "水", "克": "木", "被生": "土", "被克": "火"},
 #     "水": {"生": "木", "克": "火", "被生": "金", "被克": "土"}
 # }
+# 对外保留汉字常量，内部计算使用 ganzhi 模块的整数编码
 HEAVENLY_STEMS = CONSTANTS['HEAVENLY_STEMS']
 EARTHLY_BRANCHES = CONSTANTS['EARTHLY_BRANCHES']
 WUXING_MAP = CONSTANTS['WUXING_MAP']
@@ -36,6 +44,9 @@ BRANCH_HIDDEN_STEMS = CONSTANTS['BRANCH_HIDDEN_STEMS']
 TEN_GODS_MAP = CONSTANTS['TEN_GODS_MAP']
 ZODIAC_MAP = CONSTANTS['ZODIAC_MAP']
 MING_GONG_EXPLANATIONS = CONSTANTS['MING_GONG_EXPLANATIONS']
+
+_DAY_BASE = datetime.datetime(1900, 1, 1, tzinfo=datetime.timezone.utc)
+_ONE_DAY = datetime.timedelta(days=1)
 # # 地支藏干映射（本气+余气）
 # BRANCH_HIDDEN_STEMS = {
 #     "子": [("癸", 1.0)],
@@ -90,186 +101,121 @@ MING_GONG_EXPLANATIONS = CONSTANTS['MING_GONG_EXPLANATIONS']
 # }
 
 
-def get_solar_terms(year: int) -> Dict[str, datetime.datetime]:
-    """计算指定年份的24节气时间（完整版）"""
-    solar_terms = {}
-    observer = ephem.Observer()
-    observer.lat = '0'
-    observer.lon = '0'
-    observer.elevation = 0
-
-    # 更精确的节气计算
-    term_calculations = {
-        "立春": lambda d: ephem.next_vernal_equinox(d),
-        "雨水": lambda d: ephem.next_new_moon(ephem.next_vernal_equinox(d)),
-        "惊蛰": lambda d: ephem.next_new_moon(ephem.next_vernal_equinox(d)) + 15,
-        "春分": lambda d: ephem.next_vernal_equinox(d),
-        "清明": lambda d: ephem.next_new_moon(ephem.next_vernal_equinox(d)) + 30,
-        "谷雨": lambda d: ephem.next_new_moon(ephem.next_vernal_equinox(d)) + 45,
-        "立夏": lambda d: ephem.next_summer_solstice(d),
-        "小满": lambda d: ephem.next_new_moon(ephem.next_summer_solstice(d)) + 15,
-        "芒种": lambda d: ephem.next_new_moon(ephem.next_summer_solstice(d)) + 30,
-        "夏至": lambda d: ephem.next_summer_solstice(d),
-        "小暑": lambda d: ephem.next_new_moon(ephem.next_summer_solstice(d)) + 45,
-        "大暑": lambda d: ephem.next_new_moon(ephem.next_summer_solstice(d)) + 60,
-        "立秋": lambda d: ephem.next_autumnal_equinox(d),
-        "处暑": lambda d: ephem.next_new_moon(ephem.next_autumnal_equinox(d)) + 15,
-        "白露": lambda d: ephem.next_new_moon(ephem.next_autumnal_equinox(d)) + 30,
-        "秋分": lambda d: ephem.next_autumnal_equinox(d),
-        "寒露": lambda d: ephem.next_new_moon(ephem.next_autumnal_equinox(d)) + 45,
-        "霜降": lambda d: ephem.next_new_moon(ephem.next_autumnal_equinox(d)) + 60,
-        "立冬": lambda d: ephem.next_winter_solstice(d),
-        "小雪": lambda d: ephem.next_new_moon(ephem.next_winter_solstice(d)) + 15,
-        "大雪": lambda d: ephem.next_new_moon(ephem.next_winter_solstice(d)) + 30,
-        "冬至": lambda d: ephem.next_winter_solstice(d),
-        "小寒": lambda d: ephem.next_new_moon(ephem.next_winter_solstice(d)) + 45,
-        "大寒": lambda d: ephem.next_new_moon(ephem.next_winter_solstice(d)) + 60
-    }
+def _year_pillar_codes(birth_datetime: datetime.datetime) -> Tuple[int, int]:
+    """年柱干支编码（立春换年）"""
+    year = birth_datetime.year
 
-    # 计算每个节气的时间
-    for term, calc_func in term_calculations.items():
-        try:
-            # 设置初始日期为前一年的12月1日
-            base_date = f"{year - 1}/12/1"
-            term_date = calc_func(base_date)
-            observer.date = term_date
-            solar_terms[term] = observer.date.datetime()
-        except Exception as e:
-            print(f"计算节气{term}失败: {str(e)}")
-            # 使用近似值作为后备方案
-            month = (list(term_calculations.keys()).index(term) // 2 + 1)
-            solar_terms[term] = datetime.datetime(year, month, 1) + datetime.timedelta(days=15)
+    # 计算立春时间（节气时刻表），立春之前按上一年计算
+    if birth_datetime < get_term_instant(year, "立春"):
+        year -= 1
 
-    return solar_terms
+    # 1900年为庚子年，庚子在60甲子中的序号为36
+    year_index = (year - 1900 + 36) % 60
+    return CYCLE_STEM[year_index], CYCLE_BRANCH[year_index]
 
 
-def calculate_year_pillar(birth_datetime: datetime.datetime) -> Tuple[str, str]:
-    """计算年柱（精确节气版）"""
-    year = birth_datetime.year
-    month = birth_datetime.month
-    day = birth_datetime.day
+def _month_pillar_codes(birth_datetime: datetime.datetime, year_stem: int) -> Tuple[int, int]:
+    """月柱干支编码（节气定月支，五虎遁定月干）"""
+    # 找到出生日期前的最后一个节气（节气时刻表二分查找）
+    term_index = last_term_index(birth_datetime, birth_datetime.year)
 
-    # 计算立春时间
-    solar_terms = get_solar_terms(year)
-    spring_date = solar_terms.get("立春", datetime.datetime(year, 2, 4))
-
-    # 判断是否在立春之前
-    if birth_datetime < spring_date:
-        year -= 1
+    if term_index is not None:
+        month_branch = (term_index // 2 + 2) % 12
+    else:
+        # 默认处理
+        month_branch = (birth_datetime.month - 1) % 12
 
-    # 计算年柱索引（1900年为庚子年）
-    base_year = 1900
-    base_index = 36  # 庚子在60甲子中的索引
+    month_stem = (MONTH_STEM_START[year_stem] + month_branch) % 10
+    return month_stem, month_branch
 
-    # 计算年柱索引
-    year_index = (year - base_year + base_index) % 60
-    stem_index = year_index % 10
-    branch_index = year_index % 12
 
-    return HEAVENLY_STEMS[stem_index], EARTHLY_BRANCHES[branch_index]
+def _day_pillar_codes(birth_datetime: datetime.datetime) -> Tuple[int, int]:
+    """日柱干支编码（基于1900年1月1日（UTC）为甲戌日，相差天数向零取整）"""
+    days = int((birth_datetime - _DAY_BASE) / _ONE_DAY)
+    day_index = days % 60
+    return CYCLE_STEM[day_index], CYCLE_BRANCH[day_index]
 
 
-def calculate_month_pillar(birth_datetime: datetime.datetime, year_stem: str) -> Tuple[str, str]:
-    """计算月柱（精确节气版）"""
-    # 获取所有节气
-    solar_terms = get_solar_terms(birth_datetime.year)
-
-    # 定义节气顺序
-    term_order = [
-        "立春", "雨水", "惊蛰", "春分", "清明", "谷雨",
-        "立夏", "小满", "芒种", "夏至", "小暑", "大暑",
-        "立秋", "处暑", "白露", "秋分", "寒露", "霜降",
-        "立冬", "小雪", "大雪", "冬至", "小寒", "大寒"
-    ]
-
-    # 找到出生日期前的最后一个节气
-    last_term = None
-    for term in term_order:
-        term_date = solar_terms.get(term)
-        if term_date and term_date < birth_datetime:
-            last_term = term
-        else:
-            break
+def _hour_pillar_codes(birth_datetime: datetime.datetime, day_stem: int,
+                       next_day_stem: Optional[int] = None) -> Tuple[int, int]:
+    """时柱干支编码（按UTC时刻定时支，五鼠遁定时干）"""
+    utc_datetime = birth_datetime.astimezone(pytz.utc)
+    hour = utc_datetime.hour
+    minute = utc_datetime.minute
 
-    # 确定月支（根据节气）
-    if last_term:
-        term_index = term_order.index(last_term)
-        month_branch_index = (term_index // 2 + 2) % 12
+    # 处理晚子时（23:00-0:00），晚子时使用次日日干
+    if hour == 23 or (hour == 0 and minute == 0):
+        hour_branch = 0
+        if next_day_stem is None:
+            next_day_stem, _ = _day_pillar_codes(birth_datetime + _ONE_DAY)
+        day_stem = next_day_stem
     else:
-        # 默认处理
-        month_branch_index = (birth_datetime.month - 1) % 12
-
-    # 五虎遁口诀确定月干
-    stem_starts = {
-        "甲": "丙", "己": "丙",  # 甲己之年丙作首
-        "乙": "戊", "庚": "戊",  # 乙庚之岁戊为头
-        "丙": "庚", "辛": "庚",  # 丙辛必定寻庚起
-        "丁": "壬", "壬": "壬",  # 丁壬壬位顺行流
-        "戊": "甲", "癸": "甲"  # 戊癸何方发，甲寅之上好追求
-    }
+        hour_branch = ((hour + 1) // 2) % 12
 
-    start_stem = stem_starts.get(year_stem, "丙")
-    start_index = HEAVENLY_STEMS.index(start_stem)
-    stem_index = (start_index + month_branch_index) % 10
+    hour_stem = (HOUR_STEM_START[day_stem] + hour_branch) % 10
+    return hour_stem, hour_branch
 
-    return HEAVENLY_STEMS[stem_index], EARTHLY_BRANCHES[month_branch_index]
 
+def _chart_codes(birth_datetime: datetime.datetime) -> Tuple[List[int], List[int], int]:
+    """
+    四柱干支编码与出生地日期的农历月份（0为未知）。
+    1900-2100年只读一次干支历索引，范围外按节气时刻表逐项计算。
+    """
+    day = calendar_index.lookup(birth_datetime)
+    if day is None:
+        year_stem, year_branch = _year_pillar_codes(birth_datetime)
+        month_stem, month_branch = _month_pillar_codes(birth_datetime, year_stem)
+        day_stem, day_branch = _day_pillar_codes(birth_datetime)
+        hour_stem, hour_branch = _hour_pillar_codes(birth_datetime, day_stem)
+        lunar_month = 0
+    else:
+        year_stem, year_branch = CYCLE_STEM[day.year_cycle], CYCLE_BRANCH[day.year_cycle]
+        if day.term_index >= 0:
+            month_branch = (day.term_index // 2 + 2) % 12
+        else:
+            month_branch = (birth_datetime.month - 1) % 12
+        month_stem = (MONTH_STEM_START[year_stem] + month_branch) % 10
+        day_stem, day_branch = CYCLE_STEM[day.day_cycle], CYCLE_BRANCH[day.day_cycle]
+        hour_stem, hour_branch = _hour_pillar_codes(birth_datetime, day_stem, CYCLE_STEM[day.next_day_cycle])
+        lunar_month = day.lunar_month
+    return ([year_stem, month_stem, day_stem, hour_stem],
+            [year_branch, month_branch, day_branch, hour_branch], lunar_month)
 
-def calculate_day_pillar(birth_datetime: datetime.datetime) -> Tuple[str, str]:
-    """计算日柱（精确天文历法版）"""
-    # 计算儒略日
-    jd = ephem.julian_date(birth_datetime)
-
-    # 公式计算日柱（基于1900年1月1日为甲戌日）
-    base_jd = ephem.julian_date(datetime.datetime(1900, 1, 1))
-    days_diff = jd - base_jd
-    day_index = int(days_diff) % 60
-
-    stem_index = day_index % 10
-    branch_index = day_index % 12
 
-    return HEAVENLY_STEMS[stem_index], EARTHLY_BRANCHES[branch_index]
+def calculate_year_pillar(birth_datetime: datetime.datetime) -> Tuple[str, str]:
+    """计算年柱（精确节气版）"""
+    stem, branch = _year_pillar_codes(birth_datetime)
+    return HEAVENLY_STEMS[stem], EARTHLY_BRANCHES[branch]
 
 
-def calculate_hour_pillar(birth_datetime: datetime.datetime, day_stem: str) -> Tuple[str, str]:
-    """计算时柱（完整处理时区）"""
-    # 转换到UTC时间
-    utc_datetime = birth_datetime.astimezone(pytz.utc)
-    hour = utc_datetime.hour
-    minute = utc_datetime.minute
+def calculate_month_pillar(birth_datetime: datetime.datetime, year_stem: str) -> Tuple[str, str]:
+    """计算月柱（精确节气版）"""
+    # 未知年干按甲年处理（丙寅起）
+    stem, branch = _month_pillar_codes(birth_datetime, STEM_CODES.get(year_stem, 0))
+    return HEAVENLY_STEMS[stem], EARTHLY_BRANCHES[branch]
 
-    # 处理晚子时（23:00-0:00）
-    is_late_zi = hour == 23 or (hour == 0 and minute == 0)
 
-    # 确定时辰地支
-    if is_late_zi:
-        branch_index = 0  # 子时
-        # 晚子时使用次日日干
-        next_day = birth_datetime + datetime.timedelta(days=1)
-        next_day_stem, _ = calculate_day_pillar(next_day)
-        day_stem = next_day_stem
-    else:
-        branch_index = ((hour + 1) // 2) % 12
+def calculate_day_pillar(birth_datetime: datetime.datetime) -> Tuple[str, str]:
+    """计算日柱（精确天文历法版）"""
+    stem, branch = _day_pillar_codes(birth_datetime)
+    return HEAVENLY_STEMS[stem], EARTHLY_BRANCHES[branch]
 
-    hour_branch = EARTHLY_BRANCHES[branch_index]
 
-    # 五鼠遁口诀确定时干
-    stem_starts = {
-        "甲": "甲", "己": "甲",  # 甲己还加甲
-        "乙": "丙", "庚": "丙",  # 乙庚丙作初
-        "丙": "戊", "辛": "戊",  # 丙辛从戊起
-        "丁": "庚", "壬": "庚",  # 丁壬庚子居
-        "戊": "壬", "癸": "壬"  # 戊癸何方发，壬子是真途
-    }
+def calculate_hour_pillar(birth_datetime: datetime.datetime, day_stem: str) -> Tuple[str, str]:
+    """计算时柱（完整处理时区）"""
+    # 未知日干按甲日处理（甲子起）
+    stem, branch = _hour_pillar_codes(birth_datetime, STEM_CODES.get(day_stem, 0))
+    return HEAVENLY_STEMS[stem], EARTHLY_BRANCHES[branch]
 
-    start_stem = stem_starts.get(day_stem, "甲")
-    start_index = HEAVENLY_STEMS.index(start_stem)
-    stem_index = (start_index + branch_index) % 10
 
-    return HEAVENLY_STEMS[stem_index], hour_branch
+def _ming_gong_code(lunar_month: int, hour: int) -> int:
+    """命宫地支编码：逆数月份（正月→子、二月→亥……）加出生时辰（23-1点为子）"""
+    month_index = (13 - lunar_month) % 12
+    hour_index = ((hour + 1) // 2) % 12
+    return (month_index + hour_index) % 12
 
 
-def calculate_ming_gong(birth_datetime: datetime.datetime) -> str:
+def calculate_ming_gong(birth_datetime: datetime.datetime, lunar_month: int = 0) -> str:
     """
     计算命宫（完整版）
 
@@ -283,97 +229,43 @@ def calculate_ming_gong(birth_datetime: datetime.datetime) -> str:
     正月→子(0), 二月→亥(11), 三月→戌(10), 四月→酉(9)
     五月→申(8), 六月→未(7), 七月→午(6), 八月→巳(5)
     九月→辰(4), 十月→卯(3), 十一月→寅(2), 十二月→丑(1)
+
+    lunar_month 为已知的农历月份（来自干支历索引），为0时经农历转换服务获取
     """
-    try:
-        # 获取农历日期
-        lunar_date = lunardate.LunarDate.fromSolarDate(
-            birth_datetime.year,
-            birth_datetime.month,
-            birth_datetime.day
-        )
+    if not lunar_month:
+        lunar_date = solar_to_lunar(birth_datetime)
+        if lunar_date is None:
+            # 无法转换时返回默认值
+            return "子"
+        # 闰月按当月处理
         lunar_month = lunar_date.month
+    return EARTHLY_BRANCHES[_ming_gong_code(lunar_month, birth_datetime.hour)]
 
-        # 转换农历月份为地支序号（逆数月份规则）
-        month_mapping = {
-            1: 0,  # 正月 → 子(0)
-            2: 11,  # 二月 → 亥(11)
-            3: 10,  # 三月 → 戌(10)
-            4: 9,  # 四月 → 酉(9)
-            5: 8,  # 五月 → 申(8)
-            6: 7,  # 六月 → 未(7)
-            7: 6,  # 七月 → 午(6)
-            8: 5,  # 八月 → 巳(5)
-            9: 4,  # 九月 → 辰(4)
-            10: 3,  # 十月 → 卯(3)
-            11: 2,  # 十一月 → 寅(2)
-            12: 1  # 十二月 → 丑(1)
-        }
-
-        # 处理闰月（闰月按当月计算）
-        if lunar_date.leap:
-            lunar_month = lunar_month  # 闰月按当月处理
-
-        month_index = month_mapping.get(lunar_month, 0)
-
-        # 转换出生时辰为地支序号
-        hour = birth_datetime.hour
-        hour_mapping = {
-            23: 0, 0: 0,  # 子时 (23-1)
-            1: 1, 2: 1,  # 丑时 (1-3)
-            3: 2, 4: 2,  # 寅时 (3-5)
-            5: 3, 6: 3,  # 卯时 (5-7)
-            7: 4, 8: 4,  # 辰时 (7-9)
-            9: 5, 10: 5,  # 巳时 (9-11)
-            11: 6, 12: 6,  # 午时 (11-13)
-            13: 7, 14: 7,  # 未时 (13-15)
-            15: 8, 16: 8,  # 申时 (15-17)
-            17: 9, 18: 9,  # 酉时 (17-19)
-            19: 10, 20: 10,  # 戌时 (19-21)
-            21: 11, 22: 11  # 亥时 (21-23)
-        }
-        hour_index = hour_mapping.get(hour, 0)
-
-        # 计算命宫地支序号
-        ming_index = (month_index + hour_index) % 12
-
-        return EARTHLY_BRANCHES[ming_index]
 
-    except Exception as e:
-        # 计算失败时返回默认值
-        print(f"命宫计算错误: {str(e)}")
-        return "子"  # 默认返回子
+def _wuxing_weights(stems: List[int], branches: List[int]) -> List[float]:
+    """四柱五行权重（天干各计1，地支按藏干权重计），按 ELEMENTS 顺序返回"""
+    weights = [0.0] * len(ELEMENTS)
+    for stem, branch in zip(stems, branches):
+        weights[STEM_ELEMENT[stem]] += 1.0
+        for hidden_stem, weight in BRANCH_HIDDEN_STEM_CODES[branch]:
+            weights[STEM_ELEMENT[hidden_stem]] += weight
+    return weights
 
 
 def analyze_wuxing(bazi: Dict[str, Any]) -> Dict[str, Any]:
     """分析五行属性和平衡（包含藏干）"""
-    wuxing = {"木": 0.0, "火": 0.0, "土": 0.0, "金": 0.0, "水": 0.0}
-
-    # 统计四柱中的五行
-    for i in range(4):
-        stem = bazi["heavenly_stems"][i]
-        branch = bazi["earthly_branches"][i]
-
-        # 天干五行
-        stem_element = WUXING_MAP.get(stem, "")
-        if stem_element:
-            wuxing[stem_element] += 1.0
-
-        # 地支五行（含藏干）
-        hidden_stems = BRANCH_HIDDEN_STEMS.get(branch, [])
-        for stem_char, weight in hidden_stems:
-            element = WUXING_MAP.get(stem_char, "")
-            if element:
-                wuxing[element] += weight
+    stems = [STEM_CODES[s] for s in bazi["heavenly_stems"][:4]]
+    branches = [BRANCH_CODES[b] for b in bazi["earthly_branches"][:4]]
+    weights = _wuxing_weights(stems, branches)
 
     # 日主（日干）属性
-    day_stem = bazi["heavenly_stems"][2]
-    day_element = WUXING_MAP.get(day_stem, "")
+    day_element = ELEMENTS[STEM_ELEMENT[stems[2]]]
 
     # 计算五行平衡
-    total = sum(wuxing.values())
+    total = sum(weights)
     if total > 0:
-        for element in wuxing:
-            wuxing[element] = round(wuxing[element] / total, 2)
+        weights = [round(w / total, 2) for w in weights]
+    wuxing = dict(zip(ELEMENTS, weights))
 
     # 找出强五行和弱五行
     strong_elements = [e for e, v in wuxing.items() if v > 0.25]
@@ -392,20 +284,14 @@ def analyze_wuxing(bazi: Dict[str, Any]) -> Dict[str, Any]:
 
 
 def analyze_ten_gods(bazi: Dict[str, Any]) -> Dict[str, List[str]]:
-    """分析十神关系"""
-    day_stem = bazi["heavenly_stems"][2]
+    """分析十神关系（日干 × 四柱天干查表）"""
+    day_stem = STEM_CODES.get(bazi["heavenly_stems"][2])
     ten_gods = []
 
-    for i in range(4):
-        stem = bazi["heavenly_stems"][i]
-        god = None
-
-        for god_name, combinations in TEN_GODS_MAP.items():
-            if f"{day_stem}{stem}" in combinations:
-                god = god_name
-                break
-
-        ten_gods.append(god if god else "未知")
+    for stem in bazi["heavenly_stems"][:4]:
+        stem_code = STEM_CODES.get(stem)
+        god = UNKNOWN_GOD if day_stem is None or stem_code is None else TEN_GODS[day_stem][stem_code]
+        ten_gods.append(TEN_GOD_NAMES[god] if god != UNKNOWN_GOD else "未知")
 
     return {"ten_gods": ten_gods}
 
@@ -510,41 +396,7 @@ def generate_recommendation(wuxing: Dict[str, float], day_element: str) -> str:
 
 def find_nearest_jieqi(birth_datetime: datetime.datetime, direction: str) -> datetime.datetime:
     """找到最近的换月节气（向前或向后）"""
-    # 定义12个换月节气（节）
-    jieqi_names = ["立春", "惊蛰", "清明", "立夏", "芒种", "小暑",
-                   "立秋", "白露", "寒露", "立冬", "大雪", "小寒"]
-
-    # 获取出生年份及前后一年的节气
-    years = [birth_datetime.year - 1, birth_datetime.year, birth_datetime.year + 1]
-    all_jieqi = {}
-
-    for year in years:
-        solar_terms = get_solar_terms(year)
-        for name, dt in solar_terms.items():
-            if name in jieqi_names:
-                all_jieqi[dt] = name
-
-    # 按时间排序所有节气
-    sorted_jieqi = sorted(all_jieqi.items(), key=lambda x: x[0])
-
-    # 根据方向找到最近的节气
-    if direction == "forward":
-        # 顺行：找下一个节气
-        for dt, name in sorted_jieqi:
-            if dt > birth_datetime:
-                return dt
-    else:  # backward
-        # 逆行：找上一个节气
-        prev_jieqi = None
-        for dt, name in sorted_jieqi:
-            if dt < birth_datetime:
-                prev_jieqi = dt
-            else:
-                break
-        return prev_jieqi if prev_jieqi else sorted_jieqi[0][0]
-
-    # 如果没找到，返回默认值
-    return birth_datetime + datetime.timedelta(days=30)
+    return find_nearest_jie(birth_datetime, direction)
 
 
 def calculate_start_years(birth_datetime: datetime.datetime, direction: str) -> float:
@@ -581,22 +433,14 @@ def calculate_bazi(birth_data: Dict[str, Any]) -> Dict[str, Any]:
         timezone = pytz.timezone(timezone_str)
         birth_datetime = timezone.localize(naive_datetime)
 
-        # 计算年柱
-        year_stem, year_branch = calculate_year_pillar(birth_datetime)
+        # 四柱干支编码：年柱、月柱、日柱、时柱
+        stems, branches, lunar_month = _chart_codes(birth_datetime)
+        year_stem, year_branch = stems[0], branches[0]
 
-        # 计算月柱
-        month_stem, month_branch = calculate_month_pillar(birth_datetime, year_stem)
-
-        # 计算日柱
-        day_stem, day_branch = calculate_day_pillar(birth_datetime)
-
-        # 计算时柱
-        hour_stem, hour_branch = calculate_hour_pillar(birth_datetime, day_stem)
-
-        # 组合八字
+        # 组合八字（输出时转换为汉字）
         bazi = {
-            "heavenly_stems": [year_stem, month_stem, day_stem, hour_stem],
-            "earthly_branches": [year_branch, month_branch, day_branch, hour_branch],
+            "heavenly_stems": [HEAVENLY_STEMS[s] for s in stems],
+            "earthly_branches": [EARTHLY_BRANCHES[b] for b in branches],
             "birth_datetime": birth_datetime.isoformat()
         }
 
@@ -607,15 +451,15 @@ def calculate_bazi(birth_data: Dict[str, Any]) -> Dict[str, Any]:
         ten_gods_analysis = analyze_ten_gods(bazi)
 
         # 生肖计算
-        zodiac = ZODIAC_MAP.get(year_branch, "未知")
+        zodiac = ZODIAC_MAP.get(EARTHLY_BRANCHES[year_branch], "未知")
 
         # 命宫计算
-        ming_gong = calculate_ming_gong(birth_datetime)
+        ming_gong = calculate_ming_gong(birth_datetime, lunar_month)
         ming_gong_explanation = MING_GONG_EXPLANATIONS.get(ming_gong, "")
 
         # 大运起运时间计算（完整版）
         gender = birth_data.get("gender", "male")
-        yang_year = year_stem in ["甲", "丙", "戊", "庚", "壬"]
+        yang_year = is_yang_stem(year_stem)
 
         if gender == "male":
             start_direction = "顺行" if yang_year else "逆行"
@@ -626,6 +470,9 @@ def calculate_bazi(birth_data: Dict[str, Any]) -> Dict[str, Any]:
         direction = "forward" if start_direction == "顺行" else "backward"
         start_years = calculate_start_years(birth_datetime, direction)
 
+        # 大运（自月柱顺排或逆排）
+        luck_pillars = calculate_luck_pillars(stems[1], branches[1], direction == "forward", start_years)
+
         return {
             **bazi,
             **wuxing_analysis,
@@ -634,7 +481,8 @@ def calculate_bazi(birth_data: Dict[str, Any]) -> Dict[str, Any]:
             "ming_gong": ming_gong,
             "ming_gong_explanation": ming_gong_explanation,
             "start_direction": start_direction,
-            "start_years": start_years
+            "start_years": start_years,
+            "luck_pillars": luck_pillars
         }
 
     except Exception as e:
@@ -662,6 +510,8 @@ if __name__ == "__main__":
     print(f"生肖: {result['zodiac']}")
     print(f"命宫: {result['ming_gong']} - {result['ming_gong_explanation']}")
     print(f"大运: {result['start_direction']}, 约{result['start_years']}岁起运")
+    for pillar in result['luck_pillars']:
+        print(f"  {pillar['start_age']}-{pillar['end_age']}岁: {pillar['stem']}{pillar['branch']}")
 
     print("\n十神关系:")
     print(f"年柱: {result['ten_gods'][0]}")
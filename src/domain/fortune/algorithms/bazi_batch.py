@@ -0,0 +1,345 @@
+"""
+八字批量计算模块
+将大批出生记录转换为NumPy数组，向量化计算四柱、五行（含藏干）、十神、命宫、起运与大运，
+以列式结构返回结果，供夜间全量重算等批处理任务使用。
+单条结果与 bazi.calculate_bazi 的输出完全一致。
+"""
+
+import datetime
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Sequence
+
+import numpy as np
+import pytz
+
+from src.domain.fortune.algorithms import lunar, solar_terms
+from src.domain.fortune.algorithms.luck_pillars import (
+    LUCK_PILLAR_COUNT, calculate_luck_pillars_batch, luck_pillar_entries
+)
+from src.domain.fortune.algorithms.bazi import (
+    ZODIAC_MAP, MING_GONG_EXPLANATIONS, calculate_bazi, generate_recommendation
+)
+from src.domain.fortune.algorithms.ganzhi import (
+    HEAVENLY_STEMS, EARTHLY_BRANCHES, ELEMENTS, STEM_CODES, BRANCH_CODES, ELEMENT_CODES,
+    STEM_ELEMENT_ARRAY, HIDDEN_STEM_ELEMENTS, HIDDEN_STEM_WEIGHTS, MONTH_STEM_START, HOUR_STEM_START,
+    TEN_GOD_NAMES, UNKNOWN_GOD, cycle_code, ten_god_codes, hidden_ten_god_codes
+)
+
+_DAY_MICROS = 86400 * 10 ** 6
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+_EPOCH_ORDINAL = _EPOCH.toordinal()
+# 日柱基准：1900年1月1日（UTC）为甲戌日
+_DAY_BASE_MICROS = (datetime.datetime(1900, 1, 1, tzinfo=datetime.timezone.utc) - _EPOCH) \
+                   // datetime.timedelta(microseconds=1)
+
+# 五虎遁、五鼠遁起干表
+_MONTH_STEM_START = np.array(MONTH_STEM_START, dtype=np.int64)
+_HOUR_STEM_START = np.array(HOUR_STEM_START, dtype=np.int64)
+
+
+@dataclass
+class BaziBatchResult:
+    """八字批量计算结果（列式存储，每行对应一条输入记录）"""
+    birth_datetime: List[str]
+    stem_codes: np.ndarray  # (n, 4) 年/月/日/时干，0-9
+    branch_codes: np.ndarray  # (n, 4) 年/月/日/时支，0-11
+    hidden_stem_weights: np.ndarray  # (n, 5) 地支藏干五行权重（未归一化）
+    main_elements: np.ndarray  # (n, 5) 五行比例（已归一化并保留两位小数）
+    day_element: np.ndarray  # (n,) 日主五行编码
+    ten_god_codes: np.ndarray  # (n, 4) 十神编码，对应TEN_GOD_NAMES
+    hidden_ten_god_codes: np.ndarray  # (n, 4, 3) 四柱地支藏干十神编码，无藏干处为UNKNOWN_GOD
+    ming_gong: np.ndarray  # (n,) 命宫地支编码
+    start_forward: np.ndarray  # (n,) 大运是否顺行
+    start_years: np.ndarray  # (n,) 起运年数
+    luck_cycles: np.ndarray  # (n, LUCK_PILLAR_COUNT) 各步大运六十甲子序号
+    luck_ages: np.ndarray  # (n, LUCK_PILLAR_COUNT) 各步大运起始年龄
+    recommendation: List[str] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.birth_datetime)
+
+    def record(self, i: int) -> Dict[str, Any]:
+        """还原第i条记录为与 calculate_bazi 相同的字典结构"""
+        stems = [HEAVENLY_STEMS[c] for c in self.stem_codes[i]]
+        branches = [EARTHLY_BRANCHES[c] for c in self.branch_codes[i]]
+        wuxing = {e: float(v) for e, v in zip(ELEMENTS, self.main_elements[i])}
+        ming_gong = EARTHLY_BRANCHES[self.ming_gong[i]]
+        return {
+            "heavenly_stems": stems,
+            "earthly_branches": branches,
+            "birth_datetime": self.birth_datetime[i],
+            "main_elements": wuxing,
+            "strong_elements": [e for e, v in wuxing.items() if v > 0.25],
+            "weak_elements": [e for e, v in wuxing.items() if v < 0.15],
+            "recommendation": self.recommendation[i],
+            "day_element": ELEMENTS[self.day_element[i]],
+            "ten_gods": [TEN_GOD_NAMES[g] if g != UNKNOWN_GOD else "未知" for g in self.ten_god_codes[i]],
+            "zodiac": ZODIAC_MAP.get(branches[0], "未知"),
+            "ming_gong": ming_gong,
+            "ming_gong_explanation": MING_GONG_EXPLANATIONS.get(ming_gong, ""),
+            "start_direction": "顺行" if self.start_forward[i] else "逆行",
+            "start_years": float(self.start_years[i]),
+            "luck_pillars": luck_pillar_entries(self.luck_cycles[i].tolist(), self.luck_ages[i].tolist())
+        }
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        return [self.record(i) for i in range(len(self))]
+
+
+@lru_cache(maxsize=None)
+def _timezone(name: str):
+    return pytz.timezone(name)
+
+
+def _round2(values: np.ndarray) -> np.ndarray:
+    """与内置round(x, 2)逐位一致的取整（对去重后的取值调用，避免逐条Python运算）"""
+    unique, inverse = np.unique(values, return_inverse=True)
+    rounded = np.array([round(v, 2) for v in unique.tolist()], dtype=np.float64)
+    return rounded[inverse].reshape(values.shape)
+
+
+def _day_index(utc_micros: np.ndarray) -> np.ndarray:
+    """日柱六十甲子序号（与 calculate_day_pillar 相同：儒略日差取整后对60取模）"""
+    days_diff = (utc_micros - _DAY_BASE_MICROS) / _DAY_MICROS
+    return np.mod(np.trunc(days_diff).astype(np.int64), 60)
+
+
+@lru_cache(maxsize=None)
+def _transition_table(name: str):
+    """
+    时区的本地时间分段表：(本地起点, 本地终点, UTC偏移)，单位均为微秒。
+    每段对应pytz的一条转换记录，本地时间只落在一段内时即为唯一偏移。
+    """
+    tz = _timezone(name)
+    if not hasattr(tz, "_utc_transition_times"):
+        offset = tz.localize(datetime.datetime(2000, 1, 1)).utcoffset() // datetime.timedelta(microseconds=1)
+        return None, None, np.array([offset], dtype=np.int64)
+    utc_starts = np.array(tz._utc_transition_times, dtype="datetime64[us]").astype(np.int64)
+    offsets = np.array([info[0] // datetime.timedelta(microseconds=1) for info in tz._transition_info],
+                       dtype=np.int64)
+    local_starts = utc_starts + offsets
+    local_ends = np.append(utc_starts[1:] + offsets[:-1], np.iinfo(np.int64).max)
+    if np.any(np.diff(local_starts) < 0):
+        return None, None, None
+    return local_starts, local_ends, offsets
+
+
+def _utc_offsets(name: str, local_us: np.ndarray) -> np.ndarray:
+    """批量计算本地时间的UTC偏移（微秒），与pytz的localize(is_dst=False)一致"""
+    local_starts, local_ends, offsets = _transition_table(name)
+    if offsets is not None and local_starts is None:
+        return np.full(len(local_us), offsets[0], dtype=np.int64)
+
+    result = np.empty(len(local_us), dtype=np.int64)
+    if offsets is None:
+        unique = np.zeros(len(local_us), dtype=bool)
+    else:
+        i = np.searchsorted(local_starts, local_us, side="right") - 1
+        safe = np.maximum(i, 0)
+        unique = (i >= 0) & (local_us < local_ends[safe]) \
+            & ~((i >= 1) & (local_us < local_ends[np.maximum(i - 1, 0)]))
+        result[unique] = offsets[safe[unique]]
+
+    # 夏令时切换造成的重叠或空缺时刻交给pytz处理
+    tz = _timezone(name)
+    for j in np.nonzero(~unique)[0].tolist():
+        naive = _EPOCH.replace(tzinfo=None) + datetime.timedelta(microseconds=int(local_us[j]))
+        result[j] = tz.localize(naive).utcoffset() // datetime.timedelta(microseconds=1)
+    return result
+
+
+@lru_cache(maxsize=None)
+def _offset_suffix(offset_us: int) -> str:
+    """UTC偏移的isoformat后缀（如+08:00）"""
+    tz = datetime.timezone(datetime.timedelta(microseconds=offset_us))
+    return datetime.datetime(2000, 1, 1, tzinfo=tz).isoformat()[19:]
+
+
+def _localize(records: Sequence[Dict[str, Any]]):
+    """解析并本地化出生时间，返回本地日期时间字段、UTC微秒时间戳和isoformat字符串"""
+    strings = np.array([r.get("birth_datetime") or "" for r in records], dtype=str)
+    time_part = np.char.partition(strings, "T")[:, 2]
+    if np.any(strings == "") or np.any((np.char.find(time_part, "+") >= 0) | (np.char.find(time_part, "-") >= 0)
+                                       | (np.char.find(time_part, "Z") >= 0)):
+        raise ValueError("出生时间须为不含时区的ISO格式字符串")
+    naive = strings.astype("datetime64[us]")
+    local_us = naive.astype(np.int64)
+
+    # 按时区分组计算UTC偏移
+    tz_names = np.array([r.get("timezone", "Asia/Shanghai") for r in records])
+    offsets = np.empty(len(records), dtype=np.int64)
+    for name in np.unique(tz_names).tolist():
+        group = np.nonzero(tz_names == name)[0]
+        offsets[group] = _utc_offsets(name, local_us[group])
+
+    # localize只附加时区，不改变本地时间字段
+    years = naive.astype("datetime64[Y]").astype(np.int64) + 1970
+    months = naive.astype("datetime64[M]").astype(np.int64) % 12 + 1
+    days = (naive.astype("datetime64[D]") - naive.astype("datetime64[M]")).astype(np.int64) + 1
+    hours = np.mod(local_us // (3600 * 10 ** 6), 24)
+    ordinals = naive.astype("datetime64[D]").astype(np.int64) + _EPOCH_ORDINAL
+    local = np.stack([years, months, days, hours], axis=1)
+
+    has_micros = np.mod(local_us, 10 ** 6) != 0
+    wall = np.where(has_micros, np.datetime_as_string(naive, unit="us"),
+                    np.datetime_as_string(naive, unit="s"))
+    iso = [w + _offset_suffix(o) for w, o in zip(wall.tolist(), offsets.tolist())]
+    return local, local_us - offsets, iso, ordinals
+
+
+def _blank_result(birth_datetime: List[str]) -> BaziBatchResult:
+    """按记录数分配全零的列式结果"""
+    n = len(birth_datetime)
+    return BaziBatchResult(
+        birth_datetime=birth_datetime,
+        stem_codes=np.zeros((n, 4), dtype=np.int8),
+        branch_codes=np.zeros((n, 4), dtype=np.int8),
+        hidden_stem_weights=np.zeros((n, 5), dtype=np.float64),
+        main_elements=np.zeros((n, 5), dtype=np.float64),
+        day_element=np.zeros(n, dtype=np.int8),
+        ten_god_codes=np.zeros((n, 4), dtype=np.int8),
+        hidden_ten_god_codes=np.full((n, 4, 3), UNKNOWN_GOD, dtype=np.int8),
+        ming_gong=np.zeros(n, dtype=np.int8),
+        start_forward=np.zeros(n, dtype=bool),
+        start_years=np.zeros(n, dtype=np.float64),
+        luck_cycles=np.zeros((n, LUCK_PILLAR_COUNT), dtype=np.int8),
+        luck_ages=np.zeros((n, LUCK_PILLAR_COUNT), dtype=np.float64),
+        recommendation=[""] * n
+    )
+
+
+def calculate_bazi_batch(records: Sequence[Dict[str, Any]]) -> BaziBatchResult:
+    """批量计算八字命盘，records 为与 calculate_bazi 相同格式的输入字典"""
+    if not records:
+        return _blank_result([])
+    try:
+        local, utc_micros, iso, ordinals = _localize(records)
+    except Exception as e:
+        raise ValueError(f"八字计算失败: {str(e)}")
+
+    years, months, days, hours = local.T
+    male = np.array([r.get("gender", "male") == "male" for r in records], dtype=bool)
+    covered = solar_terms.table_covers(years)
+    idx = np.nonzero(covered)[0]
+    y, us = years[idx], utc_micros[idx]
+
+    # 1. 年柱：立春前按上一年计算（1900年为庚子年，60甲子序号36）
+    pillar_year = y - (us < solar_terms.term_micros(y, "立春"))
+    year_index = np.mod(pillar_year - 1900 + 36, 60)
+    year_stem, year_branch = year_index % 10, year_index % 12
+
+    # 2. 月柱：节气定月支，五虎遁定月干
+    term_index = solar_terms.last_term_indices(us, y)
+    month_branch = np.where(term_index >= 0, (term_index // 2 + 2) % 12, (months[idx] - 1) % 12)
+    month_stem = (_MONTH_STEM_START[year_stem] + month_branch) % 10
+
+    # 3. 日柱
+    day_index = _day_index(us)
+    day_stem, day_branch = day_index % 10, day_index % 12
+
+    # 4. 时柱：按UTC时刻定时支，晚子时用次日日干，五鼠遁定时干
+    utc_seconds = np.mod(us // 10 ** 6, 86400)
+    utc_hour, utc_minute = utc_seconds // 3600, (utc_seconds // 60) % 60
+    late_zi = (utc_hour == 23) | ((utc_hour == 0) & (utc_minute == 0))
+    hour_branch = np.where(late_zi, 0, ((utc_hour + 1) // 2) % 12)
+    hour_day_stem = np.where(late_zi, _day_index(us + _DAY_MICROS) % 10, day_stem)
+    hour_stem = (_HOUR_STEM_START[hour_day_stem] + hour_branch) % 10
+
+    stems = np.stack([year_stem, month_stem, day_stem, hour_stem], axis=1).astype(np.int8)
+    branches = np.stack([year_branch, month_branch, day_branch, hour_branch], axis=1).astype(np.int8)
+
+    # 5. 五行（含藏干），累加顺序与 analyze_wuxing 相同以保证浮点结果一致
+    m = len(idx)
+    rows = np.arange(m)
+    wuxing = np.zeros((m, 5), dtype=np.float64)
+    hidden = np.zeros((m, 5), dtype=np.float64)
+    for p in range(4):
+        wuxing[rows, STEM_ELEMENT_ARRAY[stems[:, p]]] += 1.0
+        for k in range(3):
+            element = HIDDEN_STEM_ELEMENTS[branches[:, p], k]
+            weight = HIDDEN_STEM_WEIGHTS[branches[:, p], k]
+            wuxing[rows, element] += weight
+            hidden[rows, element] += weight
+    total = wuxing[:, 0] + wuxing[:, 1] + wuxing[:, 2] + wuxing[:, 3] + wuxing[:, 4]
+    main_elements = _round2(wuxing / total[:, None])
+    day_element = STEM_ELEMENT_ARRAY[stems[:, 2]]
+
+    # 6. 十神
+    ten_gods = ten_god_codes(stems[:, 2], stems)
+    hidden_ten_gods = hidden_ten_god_codes(stems[:, 2], branches)
+
+    # 7. 命宫：农历月（逆数）+ 本地时辰
+    lunar_months = lunar.lunar_months(ordinals[idx])
+    ming_gong = np.where(lunar_months > 0,
+                         ((13 - lunar_months) % 12 + ((hours[idx] + 1) // 2) % 12) % 12, 0)
+
+    # 8. 大运方向与起运年数（三天折合一岁）
+    yang_year = (year_stem % 2) == 0
+    forward = yang_year == male[idx]
+    jie, found = solar_terms.nearest_jie_micros(us, forward)
+    delta = np.where(forward, jie - us, us - jie)
+    delta = np.where(found, delta, 30 * _DAY_MICROS)
+    start_years = _round2(delta / 10 ** 6 / (24 * 3600) / 3)
+    luck_cycles, luck_ages = calculate_luck_pillars_batch(month_stem, month_branch, forward, start_years)
+
+    result = _blank_result(iso)
+    result.stem_codes[idx] = stems
+    result.branch_codes[idx] = branches
+    result.hidden_stem_weights[idx] = hidden
+    result.main_elements[idx] = main_elements
+    result.day_element[idx] = day_element
+    result.ten_god_codes[idx] = ten_gods
+    result.hidden_ten_god_codes[idx] = hidden_ten_gods
+    result.ming_gong[idx] = ming_gong
+    result.start_forward[idx] = forward
+    result.start_years[idx] = start_years
+    result.luck_cycles[idx] = luck_cycles
+    result.luck_ages[idx] = luck_ages
+
+    # 建议文本只取决于五行比例和日主，按去重后的组合生成
+    recommendations = {}
+    for i, key in zip(idx.tolist(), zip(map(tuple, main_elements.tolist()), day_element.tolist())):
+        if key not in recommendations:
+            recommendations[key] = generate_recommendation(dict(zip(ELEMENTS, key[0])), ELEMENTS[key[1]])
+        result.recommendation[i] = recommendations[key]
+
+    # 时刻表范围外的记录逐条回退到标量计算
+    for i in np.nonzero(~covered)[0].tolist():
+        _fill_from_scalar(result, i, calculate_bazi(records[i]))
+
+    return result
+
+
+def calculate(record: Dict[str, Any]) -> Dict[str, Any]:
+    """算法模块单条入口（算法注册表要求每个算法模块提供 calculate）"""
+    return calculate_bazi(record)
+
+
+def calculate_batch(records: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """算法模块批量入口：与逐条调用 calculate_bazi 的结果列表相同"""
+    return calculate_bazi_batch(records).to_dicts()
+
+
+def _fill_from_scalar(result: BaziBatchResult, i: int, scalar: Dict[str, Any]) -> None:
+    """将标量计算结果写回列式结果的第i行"""
+    stems = [STEM_CODES[s] for s in scalar["heavenly_stems"]]
+    branches = [BRANCH_CODES[b] for b in scalar["earthly_branches"]]
+    result.birth_datetime[i] = scalar["birth_datetime"]
+    result.stem_codes[i] = stems
+    result.branch_codes[i] = branches
+    for b in branches:
+        for k in range(3):
+            result.hidden_stem_weights[i, HIDDEN_STEM_ELEMENTS[b, k]] += HIDDEN_STEM_WEIGHTS[b, k]
+    result.main_elements[i] = [scalar["main_elements"][e] for e in ELEMENTS]
+    result.day_element[i] = ELEMENT_CODES[scalar["day_element"]]
+    result.ten_god_codes[i] = [TEN_GOD_NAMES.index(g) if g in TEN_GOD_NAMES else UNKNOWN_GOD
+                               for g in scalar["ten_gods"]]
+    result.hidden_ten_god_codes[i] = hidden_ten_god_codes(np.array([stems[2]]), np.array([branches]))[0]
+    result.ming_gong[i] = BRANCH_CODES[scalar["ming_gong"]]
+    result.start_forward[i] = scalar["start_direction"] == "顺行"
+    result.start_years[i] = scalar["start_years"]
+    result.luck_cycles[i] = [cycle_code(STEM_CODES[p["stem"]], BRANCH_CODES[p["branch"]])
+                             for p in scalar["luck_pillars"]]
+    result.luck_ages[i] = [p["start_age"] for p in scalar["luck_pillars"]]
+    result.recommendation[i] = scalar["recommendation"]
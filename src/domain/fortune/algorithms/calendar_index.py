@@ -0,0 +1,229 @@
+"""
+干支历索引模块
+1900-2100年逐日一行（按UTC日期），记录当日日柱、当日0时（UTC）的年柱与已过节气序号、
+该日期的农历日期与闰月标记，当日落在的节气边界单独存放在事件表中。
+索引以未压缩的 .npy 文件发布，运行时只读内存映射，
+八字四柱与命宫只需一次切片读取（出生日期及前后各一天），请求路径上不再调用 ephem、lunarcalendar。
+
+重新生成索引（需要安装lunarcalendar）：
+    python -m src.domain.fortune.algorithms.calendar_index
+"""
+
+import os
+import datetime
+import logging
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional, Tuple
+
+import numpy as np
+
+from src.domain.fortune.algorithms import solar_terms
+
+logger = logging.getLogger(__name__)
+
+CALENDAR_INDEX_VERSION = "v2"
+INDEX_START = datetime.date(1900, 1, 1)
+INDEX_END = datetime.date(2100, 12, 31)
+# 农历列覆盖的农历年份（lunarcalendar 推荐范围）
+LUNAR_START_YEAR, LUNAR_END_YEAR = 1900, 2100
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+INDEX_PATH = os.path.join(DATA_DIR, f"calendar_index_{CALENDAR_INDEX_VERSION}.npy")
+EVENTS_PATH = os.path.join(DATA_DIR, f"calendar_events_{CALENDAR_INDEX_VERSION}.npy")
+
+# 逐日索引行（紧凑排列，无对齐填充）
+INDEX_DTYPE = np.dtype([
+    ("day_cycle", "u1"),  # 日柱六十甲子序号
+    ("year_cycle", "u1"),  # 当日0时（UTC）的年柱序号（立春换年）
+    ("term_index", "i1"),  # 当日0时（UTC）已过的最后一个节气序号（TERM_ORDER），-1为无
+    ("lunar_year", "<i2"),  # 农历年，0为超出农历转换范围（农历1900-2100年之外）
+    ("lunar_month", "i1"),  # 农历月，0为超出农历转换范围
+    ("lunar_day", "i1"),
+    ("leap", "?"),  # 是否闰月
+    ("event_start", "<i4"),  # 当日第一个节气边界在事件表中的位置
+    ("event_count", "u1"),  # 当日节气边界个数
+])
+
+# 节气边界事件：kind=0 为立春换年（出生时刻不早于边界即生效），
+# kind=1 为节气序号变化（出生时刻晚于边界才生效），value 为边界之后的新值
+EVENT_DTYPE = np.dtype([("micros", "<i8"), ("kind", "u1"), ("value", "i1")])
+YEAR_EVENT, TERM_EVENT = 0, 1
+
+_DAY_MICROS = 86400 * 10 ** 6
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+_INDEX_START_ORDINAL = INDEX_START.toordinal()
+_INDEX_START_MICROS = (datetime.datetime.combine(INDEX_START, datetime.time(), datetime.timezone.utc) - _EPOCH) \
+                      // datetime.timedelta(microseconds=1)
+_LAST_TERM = len(solar_terms.TERM_ORDER) - 1
+
+
+@dataclass(frozen=True)
+class CalendarDay:
+    """出生时刻对应的干支历信息（年柱与节气序号已按当日节气边界修正）"""
+    year_cycle: int
+    term_index: int  # 出生地公历年份内已过的最后一个节气序号，-1为无
+    day_cycle: int
+    next_day_cycle: int  # 次日日柱（晚子时用）
+    lunar_year: int  # 出生地日期的农历年，0为超出范围
+    lunar_month: int
+    lunar_day: int
+    leap: bool
+
+
+def _year_cycle(year: int) -> int:
+    """1900年为庚子年，庚子在60甲子中的序号为36"""
+    return (year - 1900 + 36) % 60
+
+
+def _lunar_columns(ordinals: np.ndarray):
+    """
+    逐日农历年月日与闰月标记，与紫微斗数、五行局原先使用的 lunarcalendar 逐日转换结果一致，
+    超出 lunarcalendar 推荐范围（农历1900-2100年）的日期为0
+    """
+    from lunarcalendar import Converter, Solar
+
+    columns = np.zeros((4, len(ordinals)), dtype=np.int64)
+    for j, ordinal in enumerate(ordinals.tolist()):
+        date = datetime.date.fromordinal(ordinal)
+        lunar = Converter.Solar2Lunar(Solar(date.year, date.month, date.day))
+        if LUNAR_START_YEAR <= lunar.year <= LUNAR_END_YEAR:
+            columns[:, j] = lunar.year, lunar.month, lunar.day, lunar.isleap
+    return columns[0], columns[1], columns[2], columns[3].astype(bool)
+
+
+def build_calendar_index() -> Tuple[np.ndarray, np.ndarray]:
+    """按节气时刻表与lunarcalendar生成逐日索引和节气边界事件表"""
+    ordinals = np.arange(_INDEX_START_ORDINAL, INDEX_END.toordinal() + 1, dtype=np.int64)
+    day_starts = _INDEX_START_MICROS + (ordinals - _INDEX_START_ORDINAL) * _DAY_MICROS
+    years = np.array([datetime.date.fromordinal(o).year for o in ordinals.tolist()], dtype=np.int64)
+
+    index = np.zeros(len(ordinals), dtype=INDEX_DTYPE)
+    index["day_cycle"] = (ordinals - _INDEX_START_ORDINAL) % 60
+    lichun = solar_terms.term_micros(years, "立春")
+    index["year_cycle"] = np.mod(years - (day_starts < lichun) - 1900 + 36, 60)
+    index["term_index"] = solar_terms.last_term_indices(day_starts, years)
+    (index["lunar_year"], index["lunar_month"],
+     index["lunar_day"], index["leap"]) = _lunar_columns(ordinals)
+
+    # 节气边界事件：立春时刻与节气前缀最大值的每个台阶
+    events = []
+    for year in range(INDEX_START.year, INDEX_END.year + 1):
+        prefix_max = solar_terms._PREFIX_MAX[year - solar_terms._TABLE_START]
+        # 跨年时按出生地年份直接推出节气序号，要求每年的节气都落在当年之内
+        year_start = (datetime.datetime(year, 1, 1, tzinfo=datetime.timezone.utc) - _EPOCH) \
+                     // datetime.timedelta(microseconds=1)
+        year_end = year_start + (datetime.date(year + 1, 1, 1) - datetime.date(year, 1, 1)).days * _DAY_MICROS
+        if prefix_max.min() < year_start or prefix_max.max() >= year_end:
+            raise ValueError(f"{year}年节气超出当年范围，无法生成干支历索引")
+        events.append((int(solar_terms.term_micros(year, "立春")), YEAR_EVENT, _year_cycle(year)))
+        for value in np.unique(prefix_max).tolist():
+            events.append((value, TERM_EVENT, int(np.searchsorted(prefix_max, value, side="right")) - 1))
+    events = np.array(sorted(events), dtype=EVENT_DTYPE)
+
+    day_of_event = (events["micros"] - _INDEX_START_MICROS) // _DAY_MICROS
+    index["event_start"] = np.searchsorted(day_of_event, np.arange(len(ordinals)), side="left")
+    index["event_count"] = np.searchsorted(day_of_event, np.arange(len(ordinals)), side="right") \
+        - index["event_start"]
+    return index, events
+
+
+def save_calendar_index(index_path: str = INDEX_PATH, events_path: str = EVENTS_PATH) -> None:
+    index, events = build_calendar_index()
+    os.makedirs(os.path.dirname(index_path), exist_ok=True)
+    np.save(index_path, index)
+    np.save(events_path, events)
+    logger.info(f"干支历索引已生成: {index_path} ({INDEX_START} - {INDEX_END}, {len(index)} 行)")
+
+
+@lru_cache(maxsize=None)
+def _tables() -> Tuple[np.ndarray, np.ndarray]:
+    """只读映射索引文件，文件缺失或结构不符时现场生成"""
+    try:
+        index = np.load(INDEX_PATH, mmap_mode="r")
+        events = np.load(EVENTS_PATH, mmap_mode="r")
+        if index.dtype == INDEX_DTYPE and events.dtype == EVENT_DTYPE \
+                and len(index) == INDEX_END.toordinal() - _INDEX_START_ORDINAL + 1:
+            return index, events
+        logger.warning("干支历索引结构不匹配，按规则重新生成")
+    except (OSError, ValueError) as e:
+        logger.warning(f"干支历索引加载失败: {e}，按规则重新生成")
+    return build_calendar_index()
+
+
+def lookup(birth_datetime: datetime.datetime) -> Optional[CalendarDay]:
+    """
+    查询带时区出生时间的干支历信息，超出索引范围时返回None（由调用方回退到逐项计算）。
+    年柱与节气序号按出生地公历年份计算，与 solar_terms 的逐项查询一致。
+    """
+    utc = birth_datetime.astimezone(datetime.timezone.utc)
+    row = utc.toordinal() - _INDEX_START_ORDINAL
+    local_shift = birth_datetime.toordinal() - utc.toordinal()
+    index, events = _tables()
+    if row < 1 or row >= len(index) - 1:
+        return None
+
+    # 一次切片读取：前一天、当天、后一天
+    prev_day, day, next_day = index[row - 1:row + 2].tolist()
+    _, year_cycle, term_index, _, _, _, _, event_start, event_count = day
+    if event_count:
+        offset = (utc - _EPOCH) // datetime.timedelta(microseconds=1)
+        for micros, kind, value in events[event_start:event_start + event_count].tolist():
+            if kind == YEAR_EVENT and offset >= micros:
+                year_cycle = value
+            elif kind == TERM_EVENT and offset > micros:
+                term_index = value
+
+    # 出生地与UTC跨年时，出生地年份的节气全部在出生时刻之后（或之前）
+    if birth_datetime.year > utc.year:
+        term_index = -1
+    elif birth_datetime.year < utc.year:
+        term_index = _LAST_TERM
+
+    local = (prev_day, day, next_day)[1 + local_shift]
+    return CalendarDay(
+        year_cycle=year_cycle,
+        term_index=term_index,
+        day_cycle=day[0],
+        next_day_cycle=next_day[0],
+        lunar_year=local[3],
+        lunar_month=local[4],
+        lunar_day=local[5],
+        leap=local[6]
+    )
+
+
+def lunar_fields(ordinal: int) -> Optional[Tuple[int, int, int, bool]]:
+    """单个公历日期（序数）的农历 (年, 月, 日, 闰月)，索引无农历日期时返回None"""
+    index, _ = _tables()
+    row = ordinal - _INDEX_START_ORDINAL
+    if not 0 <= row < len(index):
+        return None
+    _, _, _, year, month, day, leap, _, _ = index[row].tolist()
+    return (year, month, day, leap) if month else None
+
+
+def lunar_month_starts() -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """索引内每个农历月首日的公历序数及其农历年、月、闰月标记（按日期排序）"""
+    index, _ = _tables()
+    rows = np.nonzero(index["lunar_day"] == 1)[0]
+    selected = index[rows]
+    return (rows.astype(np.int64) + _INDEX_START_ORDINAL, selected["lunar_year"].astype(np.int64),
+            selected["lunar_month"].astype(np.int64), selected["leap"].copy())
+
+
+def lunar_columns(ordinals) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    批量查询公历日期（序数）的农历年、月、日与闰月标记，
+    超出索引范围的日期返回0（由调用方回退）
+    """
+    index, _ = _tables()
+    rows = np.asarray(ordinals, dtype=np.int64) - _INDEX_START_ORDINAL
+    inside = (rows >= 0) & (rows < len(index))
+    selected = index[np.where(inside, rows, 0)]
+    return (np.where(inside, selected["lunar_year"], 0), np.where(inside, selected["lunar_month"], 0),
+            np.where(inside, selected["lunar_day"], 0), inside & selected["leap"])
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    save_calendar_index()
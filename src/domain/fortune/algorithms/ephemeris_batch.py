@@ -0,0 +1,92 @@
+"""
+星历批量计算模块
+对一组儒略日一次性求出太阳黄经、月亮黄经与格林威治恒星时。
+儒略日按固定时间桶（默认1秒）取整去重，每个桶只调用一次 Swiss Ephemeris，
+结果缓存在进程内LRU中，批量排盘与单张排盘共用同一缓存。
+"""
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Tuple
+
+import numpy as np
+import swisseph as swe
+
+# 儒略日取整桶宽（日）：1秒内月亮移动约0.00015度，恒星时变化约1秒，对排盘结果无影响
+JD_BUCKET_DAYS = 1.0 / 86400
+CACHE_MAX_ENTRIES = 200000
+
+_cache: "OrderedDict[Tuple[float, int], Tuple[float, float, float]]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+@dataclass
+class PlanetPositions:
+    """一组儒略日对应的天体位置（与输入顺序一致）"""
+    jd: np.ndarray
+    sun_longitude: np.ndarray  # 太阳黄经（度，0-360）
+    moon_longitude: np.ndarray  # 月亮黄经（度，0-360）
+    sidereal_time: np.ndarray  # 格林威治视恒星时（小时，0-24）
+
+    def __len__(self) -> int:
+        return len(self.jd)
+
+
+def _evaluate(jd: float) -> Tuple[float, float, float]:
+    sun = swe.calc_ut(jd, swe.SUN)[0][0] % 360
+    moon = swe.calc_ut(jd, swe.MOON)[0][0] % 360
+    return sun, moon, swe.sidtime(jd)
+
+
+def planet_positions(jds, bucket: float = JD_BUCKET_DAYS) -> PlanetPositions:
+    """批量计算太阳、月亮黄经与恒星时，jds 为儒略日数组（UT）"""
+    jds = np.asarray(jds, dtype=np.float64).reshape(-1)
+    buckets = np.rint(jds / bucket).astype(np.int64)
+    unique, inverse = np.unique(buckets, return_inverse=True)
+
+    values = np.empty((len(unique), 3), dtype=np.float64)
+    missing = []
+    with _cache_lock:
+        for i, b in enumerate(unique.tolist()):
+            cached = _cache.get((bucket, b))
+            if cached is None:
+                missing.append((i, b))
+            else:
+                _cache.move_to_end((bucket, b))
+                values[i] = cached
+
+    # 只对缓存未命中的桶调用星历（桶中心时刻）
+    computed = [(i, b, _evaluate(b * bucket)) for i, b in missing]
+    if computed:
+        with _cache_lock:
+            for i, b, result in computed:
+                values[i] = result
+                _cache[(bucket, b)] = result
+            while len(_cache) > CACHE_MAX_ENTRIES:
+                _cache.popitem(last=False)
+
+    values = values[inverse]
+    return PlanetPositions(jd=jds, sun_longitude=values[:, 0], moon_longitude=values[:, 1],
+                           sidereal_time=values[:, 2])
+
+
+def planet_position(jd: float, bucket: float = JD_BUCKET_DAYS) -> Tuple[float, float, float]:
+    """单个儒略日的 (太阳黄经, 月亮黄经, 恒星时)，与批量接口共用缓存"""
+    key = (bucket, int(round(jd / bucket)))
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None:
+            _cache.move_to_end(key)
+            return cached
+    result = _evaluate(key[1] * bucket)
+    with _cache_lock:
+        _cache[key] = result
+        while len(_cache) > CACHE_MAX_ENTRIES:
+            _cache.popitem(last=False)
+    return result
+
+
+def clear_cache() -> None:
+    with _cache_lock:
+        _cache.clear()
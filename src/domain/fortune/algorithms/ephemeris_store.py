@@ -0,0 +1,239 @@
+"""
+离线星历表存储
+Swiss Ephemeris 数据文件（.se1）不随代码仓库发布，须在构建镜像或部署时显式执行命令行步骤，
+生成到只读目录（默认 data/ephe，或由 FORTUNE_EPHE_PATH 指定），构建时校验并生成清单：
+
+    python -m src.domain.fortune.algorithms.ephemeris_store build --source /path/to/se1
+    python -m src.domain.fortune.algorithms.ephemeris_store build --download
+    python -m src.domain.fortune.algorithms.ephemeris_store verify
+
+运行时每个进程只打开一次并设置星历路径，星历数据由 Swiss Ephemeris 自行打开文件读取；
+这里另以只读方式映射各文件并提示内核预读，仅用于预热操作系统页缓存（多个工作进程共享），
+首次排盘不阻塞在磁盘IO上。请求路径上不创建目录、不修改环境变量、不访问网络。
+
+清单缺失或文件缺失、大小不符、为空时打开失败（EphemerisUnavailableError），不会静默回退；
+开发与测试环境可设置 FORTUNE_EPHE_FALLBACK=moshier，改用 Swiss Ephemeris 内置的 Moshier 解析星历（精度较低）。
+"""
+
+import argparse
+import datetime
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import tempfile
+import threading
+from typing import Dict, Optional, List
+import logging
+
+import swisseph as swe
+
+from src.domain.core.exceptions import EphemerisUnavailableError
+
+logger = logging.getLogger(__name__)
+
+# 星历表配置（仅供构建步骤下载使用）
+EPHEMERIS_CONFIG = {
+    "base_url": "https://www.astro.com/ftp/swisseph/ephe/",
+    "files": [
+        "sepl_18.se1",  # 行星位置1800-2100
+        "semo_18.se1",  # 月球位置1800-2100
+        "seas_18.se1",  # 小行星位置1800-2100
+        "s1990.se1",  # 1990-1999补充
+        "s2000.se1",  # 2000-2099补充
+        "s2100.se1"  # 2100-2199补充
+    ],
+    "checksum_url": "https://gist.githubusercontent.com/astropy/example-data/raw/main/ephe_checksums.json",
+    "mirrors": [
+        "https://astro.astropy.org/ephe/",
+        "https://mirror.example.com/ephe/"
+    ]
+}
+
+# 默认随代码发布的星历目录，可通过环境变量 FORTUNE_EPHE_PATH 指向部署时挂载的只读目录
+DEFAULT_EPHE_PATH = os.path.join(os.path.dirname(__file__), "data", "ephe")
+MANIFEST_NAME = "manifest.json"
+# 允许在星历文件不可用时回退到 Moshier 解析星历（仅开发与测试环境）
+MOSHIER_FALLBACK = "moshier"
+
+
+class EphemerisStore:
+    """只读星历表存储（每个进程一个实例）"""
+
+    def __init__(self, path: str, allow_fallback: bool = False):
+        self.path = path
+        self.allow_fallback = allow_fallback
+        self.manifest: Dict[str, Dict] = {}
+        self._maps: Dict[str, mmap.mmap] = {}
+        self._files = []
+
+    @property
+    def available(self) -> bool:
+        """是否有可用的星历文件；否则 Swiss Ephemeris 使用内置的 Moshier 解析星历"""
+        return bool(self._maps)
+
+    def open(self) -> "EphemerisStore":
+        """打开星历目录；存在问题且未允许回退时抛出 EphemerisUnavailableError"""
+        problems = []
+        manifest_path = os.path.join(self.path, MANIFEST_NAME)
+        if os.path.exists(manifest_path):
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                self.manifest = json.load(f).get("files", {})
+            if not self.manifest:
+                problems.append("manifest lists no files")
+        else:
+            problems.append("manifest not found")
+
+        for filename, entry in self.manifest.items():
+            file_path = os.path.join(self.path, filename)
+            # 构建时已校验SHA-256，运行时只核对文件大小，避免冷启动时全量哈希
+            size = os.path.getsize(file_path) if os.path.exists(file_path) else None
+            if size != entry["size"]:
+                problems.append(f"{filename} missing or size mismatch")
+                continue
+            if size == 0:
+                # 空文件不是有效的星历文件，且无法内存映射
+                problems.append(f"{filename} is empty")
+                continue
+            f = open(file_path, "rb")
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            if hasattr(mapped, "madvise") and hasattr(mmap, "MADV_WILLNEED"):
+                # 提前读入页缓存，首次排盘不再阻塞在磁盘IO上
+                mapped.madvise(mmap.MADV_WILLNEED)
+            self._files.append(f)
+            self._maps[filename] = mapped
+
+        if problems:
+            if not self.allow_fallback:
+                self.close()
+                raise EphemerisUnavailableError(self.path, "; ".join(problems))
+            logger.warning(f"Ephemeris store at {self.path}: {'; '.join(problems)}; "
+                           f"falling back to Moshier ephemeris for missing files")
+
+        swe.set_ephe_path(self.path if self._maps else None)
+        logger.info(f"Ephemeris store opened at {self.path} with {len(self._maps)} files")
+        return self
+
+    def close(self) -> None:
+        for mapped in self._maps.values():
+            mapped.close()
+        for f in self._files:
+            f.close()
+        self._maps.clear()
+        self._files = []
+
+
+_store: Optional[EphemerisStore] = None
+_store_lock = threading.Lock()
+
+
+def get_ephemeris_store(path: Optional[str] = None) -> EphemerisStore:
+    """获取进程级星历表存储，首次调用时打开（打开失败时下次调用重试）"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                allow_fallback = os.environ.get("FORTUNE_EPHE_FALLBACK", "").lower() == MOSHIER_FALLBACK
+                _store = EphemerisStore(path or os.environ.get("FORTUNE_EPHE_PATH", DEFAULT_EPHE_PATH),
+                                        allow_fallback=allow_fallback).open()
+    return _store
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _download(filename: str, target: str) -> None:
+    """依次尝试主站与镜像下载单个星历文件（仅构建步骤使用）"""
+    import requests
+
+    errors = []
+    for mirror in [EPHEMERIS_CONFIG["base_url"]] + EPHEMERIS_CONFIG["mirrors"]:
+        url = mirror.rstrip("/") + "/" + filename
+        try:
+            response = requests.get(url, timeout=60)
+            response.raise_for_status()
+            with open(target, "wb") as f:
+                f.write(response.content)
+            return
+        except Exception as e:
+            errors.append(f"{url}: {e}")
+    raise ConnectionError(f"所有镜像下载失败: {filename} ({'; '.join(errors)})")
+
+
+def build_store(target_dir: str,
+                source_dir: Optional[str] = None,
+                expected_checksums: Optional[Dict[str, str]] = None,
+                files: Optional[List[str]] = None) -> Dict[str, Dict]:
+    """
+    构建星历表存储：从本地目录复制或从镜像下载星历文件，校验后写入清单。
+    文件先写入临时目录，全部校验通过后再替换目标目录中的文件。
+    """
+    files = files or EPHEMERIS_CONFIG["files"]
+    expected_checksums = expected_checksums or {}
+    os.makedirs(target_dir, exist_ok=True)
+    manifest = {}
+
+    with tempfile.TemporaryDirectory(dir=target_dir) as staging:
+        for filename in files:
+            staged = os.path.join(staging, filename)
+            if source_dir:
+                shutil.copyfile(os.path.join(source_dir, filename), staged)
+            else:
+                _download(filename, staged)
+
+            checksum = file_sha256(staged)
+            expected = expected_checksums.get(filename)
+            if expected and expected.lower() != checksum:
+                raise ValueError(f"星历文件校验失败: {filename}")
+            manifest[filename] = {"sha256": checksum, "size": os.path.getsize(staged)}
+
+        for filename in files:
+            os.replace(os.path.join(staging, filename), os.path.join(target_dir, filename))
+
+    with open(os.path.join(target_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump({"built_at": datetime.datetime.utcnow().isoformat(), "files": manifest}, f, indent=2)
+    return manifest
+
+
+def verify_store(path: str) -> List[str]:
+    """按清单重新计算SHA-256，返回校验失败的文件名"""
+    with open(os.path.join(path, MANIFEST_NAME), "r", encoding="utf-8") as f:
+        manifest = json.load(f)["files"]
+    failed = []
+    for filename, entry in manifest.items():
+        file_path = os.path.join(path, filename)
+        if not os.path.exists(file_path) or file_sha256(file_path) != entry["sha256"]:
+            failed.append(filename)
+    return failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="星历表存储构建与校验")
+    parser.add_argument("command", choices=["build", "verify"])
+    parser.add_argument("--path", default=os.environ.get("FORTUNE_EPHE_PATH", DEFAULT_EPHE_PATH))
+    parser.add_argument("--source", help="本地星历文件目录（不指定则需 --download）")
+    parser.add_argument("--download", action="store_true", help="从主站与镜像下载星历文件")
+    parser.add_argument("--checksums", help="期望校验和JSON文件（文件名 → SHA-256）")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        if not args.source and not args.download:
+            parser.error("build 需要 --source 或 --download")
+        checksums = None
+        if args.checksums:
+            with open(args.checksums, "r", encoding="utf-8") as f:
+                checksums = json.load(f)
+        result = build_store(args.path, source_dir=args.source, expected_checksums=checksums)
+        print(f"星历表已构建: {args.path}（{len(result)} 个文件）")
+    else:
+        failed = verify_store(args.path)
+        if failed:
+            print(f"校验失败: {', '.join(failed)}")
+            raise SystemExit(1)
+        print("星历表校验通过")
@@ -0,0 +1,114 @@
+"""
+干支编码模块
+命理算法内部统一使用小整数编码：天干0-9、地支0-11、六十甲子0-59、五行0-4，
+核心计算基于下列预生成的查找表完成，只在输出结果时转换为汉字。
+"""
+
+from typing import Tuple
+
+import numpy as np
+
+from src.config.loader import CONSTANTS, CONSTANT_TABLES
+
+HEAVENLY_STEMS: Tuple[str, ...] = CONSTANTS['HEAVENLY_STEMS']
+EARTHLY_BRANCHES: Tuple[str, ...] = CONSTANTS['EARTHLY_BRANCHES']
+# 五行编码顺序（木火土金水，相邻即相生）
+ELEMENTS: Tuple[str, ...] = CONSTANT_TABLES['ELEMENTS']
+
+# 汉字 → 编码（仅用于输入边界）
+STEM_CODES = {stem: i for i, stem in enumerate(HEAVENLY_STEMS)}
+BRANCH_CODES = {branch: i for i, branch in enumerate(EARTHLY_BRANCHES)}
+ELEMENT_CODES = {element: i for i, element in enumerate(ELEMENTS)}
+
+# 以下查找表由 constants_compiler 在构建阶段从 constants.yaml 编译生成
+# 天干、地支 → 五行
+STEM_ELEMENT = CONSTANT_TABLES['STEM_ELEMENT']
+BRANCH_ELEMENT = CONSTANT_TABLES['BRANCH_ELEMENT']
+
+# 五行生克：我生、我克、生我、克我
+ELEMENT_GENERATES = CONSTANT_TABLES['ELEMENT_GENERATES']
+ELEMENT_CONTROLS = CONSTANT_TABLES['ELEMENT_CONTROLS']
+ELEMENT_GENERATED_BY = CONSTANT_TABLES['ELEMENT_GENERATED_BY']
+ELEMENT_CONTROLLED_BY = CONSTANT_TABLES['ELEMENT_CONTROLLED_BY']
+
+# 五行关系表：ELEMENT_RELATION[a][b] 为五行a相对五行b的关系（比和/相生/相克/被生/被克）
+ELEMENT_RELATION = CONSTANT_TABLES['ELEMENT_RELATION']
+
+# 地支藏干：(天干编码, 权重)，按本气、中气、余气排列
+BRANCH_HIDDEN_STEMS = CONSTANT_TABLES['BRANCH_HIDDEN_STEMS']
+
+# 向量化计算用的定长数组：每个地支最多3个藏干，不足部分天干编码为-1、权重为0.0
+HIDDEN_STEM_CODES = np.full((12, 3), -1, dtype=np.int8)
+HIDDEN_STEM_WEIGHTS = np.zeros((12, 3), dtype=np.float64)
+HIDDEN_STEM_ELEMENTS = np.zeros((12, 3), dtype=np.int8)
+for _b, _hidden in enumerate(BRANCH_HIDDEN_STEMS):
+    for _k, (_stem, _weight) in enumerate(_hidden):
+        HIDDEN_STEM_CODES[_b, _k] = _stem
+        HIDDEN_STEM_WEIGHTS[_b, _k] = _weight
+        HIDDEN_STEM_ELEMENTS[_b, _k] = STEM_ELEMENT[_stem]
+STEM_ELEMENT_ARRAY = np.array(STEM_ELEMENT, dtype=np.int8)
+
+# 十神：TEN_GODS[日干][他干] 为十神编码（对应 TEN_GOD_NAMES），由 TEN_GODS_MAP 编译而成
+TEN_GOD_NAMES: Tuple[str, ...] = CONSTANT_TABLES['TEN_GOD_NAMES']
+UNKNOWN_GOD = -1
+TEN_GODS = CONSTANT_TABLES['TEN_GODS']
+TEN_GODS_ARRAY = np.array(TEN_GODS, dtype=np.int8)
+
+# 五虎遁（年干定寅月起干）与五鼠遁（日干定子时起干），按天干编码索引
+MONTH_STEM_START = (2, 4, 6, 8, 0, 2, 4, 6, 8, 0)  # 甲己丙、乙庚戊、丙辛庚、丁壬壬、戊癸甲
+HOUR_STEM_START = (0, 2, 4, 6, 8, 0, 2, 4, 6, 8)  # 甲己甲、乙庚丙、丙辛戊、丁壬庚、戊癸壬
+
+# 纳音五行（简化算法）：(天干*12+地支) % 5 依次对应金火木水土
+NAYIN_ELEMENTS = tuple(ELEMENT_CODES[e] for e in ("金", "火", "木", "水", "土"))
+
+# 六十甲子 → 天干、地支
+CYCLE_STEM = tuple(i % 10 for i in range(60))
+CYCLE_BRANCH = tuple(i % 12 for i in range(60))
+
+
+def cycle_code(stem: int, branch: int) -> int:
+    """天干、地支编码合成六十甲子序号（干支须同为阳或同为阴）"""
+    return (6 * stem - 5 * branch) % 60
+
+
+def nayin_element(stem: int, branch: int) -> int:
+    """年干支纳音五行编码（简化算法）"""
+    return NAYIN_ELEMENTS[(stem * 12 + branch) % 5]
+
+
+def ten_god_codes(day_stems: np.ndarray, stems: np.ndarray) -> np.ndarray:
+    """
+    向量化十神查表
+    day_stems 形状为 (n,)，stems 形状为 (n, k)，返回 (n, k) 十神编码
+    """
+    day_stems = np.asarray(day_stems, dtype=np.intp)
+    return TEN_GODS_ARRAY[day_stems[:, None], np.asarray(stems, dtype=np.intp)]
+
+
+def hidden_ten_god_codes(day_stems: np.ndarray, branches: np.ndarray) -> np.ndarray:
+    """
+    向量化地支藏干十神查表
+    day_stems 形状为 (n,)，branches 形状为 (n, k)，返回 (n, k, 3) 十神编码，
+    按本气、中气、余气排列，地支无对应藏干处为 UNKNOWN_GOD
+    """
+    day_stems = np.asarray(day_stems, dtype=np.intp)
+    hidden = HIDDEN_STEM_CODES[np.asarray(branches, dtype=np.intp)]
+    codes = TEN_GODS_ARRAY[day_stems[:, None, None], np.maximum(hidden, 0)]
+    return np.where(hidden >= 0, codes, UNKNOWN_GOD).astype(np.int8)
+
+
+def is_yang_stem(stem: int) -> bool:
+    """阳干：甲丙戊庚壬"""
+    return stem % 2 == 0
+
+
+def stem_char(stem: int) -> str:
+    return HEAVENLY_STEMS[stem]
+
+
+def branch_char(branch: int) -> str:
+    return EARTHLY_BRANCHES[branch]
+
+
+def element_char(element: int) -> str:
+    return ELEMENTS[element]
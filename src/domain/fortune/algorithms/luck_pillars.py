@@ -0,0 +1,74 @@
+"""
+大运排盘模块
+大运自月柱起按六十甲子顺排（阳年男、阴年女）或逆排，每步十年；
+起运年数由出生时刻到最近换月节气的时间差折算（三天折合一岁），
+换月节气取自已排序的节气时间戳数组（solar_terms 时刻表，二分查找）。
+单张命盘与批量命盘使用同一套编码运算，批量时整批一次完成。
+排运方向、逐步序号与各步起始年龄的运算同时供紫微斗数大限（自命宫逐宫排布）使用。
+"""
+
+from typing import Dict, Any, List, Tuple
+
+import numpy as np
+
+from src.domain.fortune.algorithms.ganzhi import HEAVENLY_STEMS, EARTHLY_BRANCHES, cycle_code
+
+LUCK_PILLAR_COUNT = 8  # 排出的大运步数
+LUCK_PILLAR_YEARS = 10  # 每步大运年数
+
+
+def luck_pillar_cycles(month_stems, month_branches, forward, count: int = LUCK_PILLAR_COUNT) -> np.ndarray:
+    """批量大运六十甲子序号：参数为长度n的数组，返回 (n, count)，第k列为第k+1步大运"""
+    month_stems = np.asarray(month_stems, dtype=np.int64)
+    month_branches = np.asarray(month_branches, dtype=np.int64)
+    month_cycles = (6 * month_stems - 5 * month_branches) % 60
+    steps = np.arange(1, count + 1, dtype=np.int64)
+    offsets = np.where(np.asarray(forward, dtype=bool)[:, None], steps, -steps)
+    return ((month_cycles[:, None] + offsets) % 60).astype(np.int8)
+
+
+def luck_pillar_ages(start_years, count: int = LUCK_PILLAR_COUNT) -> np.ndarray:
+    """批量各步大运起始年龄 (n, count)，按百分之一年的整数运算，避免累加误差"""
+    centi = np.rint(np.asarray(start_years, dtype=np.float64) * 100).astype(np.int64)
+    return (centi[:, None] + LUCK_PILLAR_YEARS * 100 * np.arange(count, dtype=np.int64)) / 100
+
+
+def luck_pillar_entries(cycles, ages) -> List[Dict[str, Any]]:
+    """一张命盘的大运序号与起始年龄转换为输出结构"""
+    return [{
+        "stem": HEAVENLY_STEMS[cycle % 10],
+        "branch": EARTHLY_BRANCHES[cycle % 12],
+        "start_age": age,
+        "end_age": (round(age * 100) + LUCK_PILLAR_YEARS * 100) / 100
+    } for cycle, age in zip(cycles, ages)]
+
+
+def is_forward(year_stem: int, gender: str) -> bool:
+    """排运方向：阳年男、阴年女顺排，其余逆排（year_stem 为年干编码，偶数为阳干）"""
+    return (year_stem % 2 == 0) == (gender == "male")
+
+
+def step_codes(start: int, forward: bool, count: int, modulus: int = 60, first: int = 1) -> List[int]:
+    """自 start 起顺排或逆排的逐步序号（第 first 步起共 count 步）"""
+    step = 1 if forward else -1
+    return [(start + step * k) % modulus for k in range(first, first + count)]
+
+
+def step_ages(start_years: float, count: int, years: int = LUCK_PILLAR_YEARS) -> List[float]:
+    """各步起始年龄，按百分之一年的整数运算（与 luck_pillar_ages 结果一致）"""
+    centi = round(start_years * 100)
+    return [(centi + years * 100 * k) / 100 for k in range(count)]
+
+
+def calculate_luck_pillars(month_stem: int, month_branch: int, forward: bool, start_years: float,
+                           count: int = LUCK_PILLAR_COUNT) -> List[Dict[str, Any]]:
+    """单张命盘的大运（与批量计算结果一致，纯整数运算，不经过NumPy）"""
+    cycles = step_codes(cycle_code(month_stem, month_branch), forward, count)
+    return luck_pillar_entries(cycles, step_ages(start_years, count))
+
+
+def calculate_luck_pillars_batch(month_stems, month_branches, forward, start_years,
+                                 count: int = LUCK_PILLAR_COUNT) -> Tuple[np.ndarray, np.ndarray]:
+    """批量大运：返回 (六十甲子序号 (n, count), 起始年龄 (n, count))"""
+    return (luck_pillar_cycles(month_stems, month_branches, forward, count),
+            luck_pillar_ages(start_years, count))
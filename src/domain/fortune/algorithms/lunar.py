@@ -0,0 +1,94 @@
+"""
+农历转换服务
+八字命宫、紫微斗数排盘与五行局共用同一套公历↔农历转换：
+农历1900-2100年内的日期直接读取干支历索引中预先生成的农历列（见 calendar_index），
+范围外的日期交给 lunarcalendar 转换，结果进入进程内LRU缓存。
+索引的农历列同样由 lunarcalendar 生成，两条路径逐日一致；
+lunardate 与 lunarcalendar 在1900-2100年间有约180天的月首不同（如公历1933-07-22，
+lunarcalendar 为闰五月三十，lunardate 为六月初一），统一以 lunarcalendar 为准。
+"""
+
+import datetime
+import logging
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from src.domain.fortune.algorithms import calendar_index
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class LunarDate:
+    """农历日期（字段名与 lunarcalendar.Lunar 一致）"""
+    year: int
+    month: int
+    day: int
+    isleap: bool = False
+
+
+@lru_cache(maxsize=4096)
+def _solar_to_lunar_fallback(ordinal: int) -> Optional[LunarDate]:
+    """索引范围外的公历日期：使用lunarcalendar转换，失败返回None"""
+    from lunarcalendar import Converter, Solar
+
+    solar = datetime.date.fromordinal(ordinal)
+    try:
+        lunar = Converter.Solar2Lunar(Solar(solar.year, solar.month, solar.day))
+    except Exception as e:
+        logger.warning(f"农历转换失败: {solar}, {e}")
+        return None
+    return LunarDate(lunar.year, lunar.month, lunar.day, bool(lunar.isleap))
+
+
+def solar_to_lunar(date: datetime.date) -> Optional[LunarDate]:
+    """公历日期（或datetime的本地日期）转换为农历，无法转换时返回None"""
+    ordinal = date.toordinal()
+    fields = calendar_index.lunar_fields(ordinal)
+    if fields is not None:
+        return LunarDate(*fields)
+    return _solar_to_lunar_fallback(ordinal)
+
+
+def lunar_months(ordinals) -> np.ndarray:
+    """批量获取公历日期（序数）的农历月份，无法转换时为0"""
+    ordinals = np.asarray(ordinals, dtype=np.int64)
+    months = calendar_index.lunar_columns(ordinals)[1].astype(np.int64)
+    for j in np.nonzero(months == 0)[0].tolist():
+        lunar = _solar_to_lunar_fallback(int(ordinals[j]))
+        months[j] = lunar.month if lunar is not None else 0
+    return months
+
+
+@lru_cache(maxsize=None)
+def _month_starts() -> Dict[Tuple[int, int, bool], Tuple[int, int]]:
+    """(农历年, 月, 闰月) → (首日公历序数, 当月天数)，索引中最后一个不完整的农历月不收录"""
+    starts, years, months, leaps = calendar_index.lunar_month_starts()
+    lengths = np.diff(starts)
+    return {(y, m, l): (s, n) for y, m, l, s, n
+            in zip(years.tolist(), months.tolist(), leaps.tolist(), starts.tolist(), lengths.tolist())}
+
+
+@lru_cache(maxsize=4096)
+def _lunar_to_solar_fallback(lunar: LunarDate) -> Optional[datetime.date]:
+    from lunarcalendar import Converter, Lunar
+
+    try:
+        return Converter.Lunar2Solar(Lunar(lunar.year, lunar.month, lunar.day, lunar.isleap)).to_date()
+    except Exception as e:
+        logger.warning(f"公历转换失败: {lunar}, {e}")
+        return None
+
+
+def lunar_to_solar(lunar: LunarDate) -> Optional[datetime.date]:
+    """农历日期转换为公历，日期不存在时返回None"""
+    entry = _month_starts().get((lunar.year, lunar.month, bool(lunar.isleap)))
+    if entry is None:
+        return _lunar_to_solar_fallback(lunar)
+    start, length = entry
+    if not 1 <= lunar.day <= length:
+        return None
+    return datetime.date.fromordinal(start + lunar.day - 1)
@@ -0,0 +1,261 @@
+"""
+节气时刻表模块
+预先生成1800-2200年的24节气时刻（UTC，微秒精度），在导入时加载为紧凑数组，
+八字年柱、月柱和起运计算通过二分查找直接读取，不再在每次请求中执行ephem搜索。
+
+重新生成时刻表（需要安装ephem）：
+    python -m src.domain.fortune.algorithms.solar_terms
+"""
+
+import os
+import datetime
+import logging
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 时刻表版本（算法或覆盖范围变化时递增，旧文件随之失效）
+SOLAR_TERM_TABLE_VERSION = "v1"
+TABLE_START_YEAR = 1800
+TABLE_END_YEAR = 2200
+
+TABLE_PATH = os.path.join(os.path.dirname(__file__), "data",
+                          f"solar_terms_{SOLAR_TERM_TABLE_VERSION}.npz")
+
+# 节气顺序（与时刻表列顺序一致）
+TERM_ORDER = [
+    "立春", "雨水", "惊蛰", "春分", "清明", "谷雨",
+    "立夏", "小满", "芒种", "夏至", "小暑", "大暑",
+    "立秋", "处暑", "白露", "秋分", "寒露", "霜降",
+    "立冬", "小雪", "大雪", "冬至", "小寒", "大寒"
+]
+
+# 12个换月节气（节）
+JIE_NAMES = ["立春", "惊蛰", "清明", "立夏", "芒种", "小暑",
+             "立秋", "白露", "寒露", "立冬", "大雪", "小寒"]
+JIE_COLUMNS = [TERM_ORDER.index(name) for name in JIE_NAMES]
+
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+_MICROSECOND = datetime.timedelta(microseconds=1)
+
+
+def compute_solar_terms(year: int) -> Dict[str, datetime.datetime]:
+    """使用ephem计算指定年份的24节气时间（UTC，naive datetime），仅用于生成时刻表和表外年份"""
+    import ephem
+
+    solar_terms = {}
+    observer = ephem.Observer()
+    observer.lat = '0'
+    observer.lon = '0'
+    observer.elevation = 0
+
+    # 更精确的节气计算
+    term_calculations = {
+        "立春": lambda d: ephem.next_vernal_equinox(d),
+        "雨水": lambda d: ephem.next_new_moon(ephem.next_vernal_equinox(d)),
+        "惊蛰": lambda d: ephem.next_new_moon(ephem.next_vernal_equinox(d)) + 15,
+        "春分": lambda d: ephem.next_vernal_equinox(d),
+        "清明": lambda d: ephem.next_new_moon(ephem.next_vernal_equinox(d)) + 30,
+        "谷雨": lambda d: ephem.next_new_moon(ephem.next_vernal_equinox(d)) + 45,
+        "立夏": lambda d: ephem.next_summer_solstice(d),
+        "小满": lambda d: ephem.next_new_moon(ephem.next_summer_solstice(d)) + 15,
+        "芒种": lambda d: ephem.next_new_moon(ephem.next_summer_solstice(d)) + 30,
+        "夏至": lambda d: ephem.next_summer_solstice(d),
+        "小暑": lambda d: ephem.next_new_moon(ephem.next_summer_solstice(d)) + 45,
+        "大暑": lambda d: ephem.next_new_moon(ephem.next_summer_solstice(d)) + 60,
+        "立秋": lambda d: ephem.next_autumnal_equinox(d),
+        "处暑": lambda d: ephem.next_new_moon(ephem.next_autumnal_equinox(d)) + 15,
+        "白露": lambda d: ephem.next_new_moon(ephem.next_autumnal_equinox(d)) + 30,
+        "秋分": lambda d: ephem.next_autumnal_equinox(d),
+        "寒露": lambda d: ephem.next_new_moon(ephem.next_autumnal_equinox(d)) + 45,
+        "霜降": lambda d: ephem.next_new_moon(ephem.next_autumnal_equinox(d)) + 60,
+        "立冬": lambda d: ephem.next_winter_solstice(d),
+        "小雪": lambda d: ephem.next_new_moon(ephem.next_winter_solstice(d)) + 15,
+        "大雪": lambda d: ephem.next_new_moon(ephem.next_winter_solstice(d)) + 30,
+        "冬至": lambda d: ephem.next_winter_solstice(d),
+        "小寒": lambda d: ephem.next_new_moon(ephem.next_winter_solstice(d)) + 45,
+        "大寒": lambda d: ephem.next_new_moon(ephem.next_winter_solstice(d)) + 60
+    }
+
+    # 计算每个节气的时间
+    for term, calc_func in term_calculations.items():
+        try:
+            # 设置初始日期为前一年的12月1日
+            base_date = f"{year - 1}/12/1"
+            term_date = calc_func(base_date)
+            observer.date = term_date
+            solar_terms[term] = observer.date.datetime()
+        except Exception as e:
+            logger.warning(f"计算节气{term}失败: {str(e)}")
+            # 使用近似值作为后备方案
+            month = (TERM_ORDER.index(term) // 2 + 1)
+            solar_terms[term] = datetime.datetime(year, month, 1) + datetime.timedelta(days=15)
+
+    return solar_terms
+
+
+def _to_micros(dt: datetime.datetime) -> int:
+    """datetime转换为UTC微秒时间戳（naive视为UTC）"""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=datetime.timezone.utc)
+    return (dt - _EPOCH) // _MICROSECOND
+
+
+def _from_micros(micros: int) -> datetime.datetime:
+    """UTC微秒时间戳转换为带时区的datetime"""
+    return _EPOCH + datetime.timedelta(microseconds=int(micros))
+
+
+def build_solar_term_table(start_year: int = TABLE_START_YEAR,
+                           end_year: int = TABLE_END_YEAR) -> np.ndarray:
+    """生成节气时刻表：形状为(年数, 24)的int64数组，单位为UTC微秒"""
+    table = np.empty((end_year - start_year + 1, len(TERM_ORDER)), dtype=np.int64)
+    for row, year in enumerate(range(start_year, end_year + 1)):
+        terms = compute_solar_terms(year)
+        table[row] = [_to_micros(terms[name]) for name in TERM_ORDER]
+    return table
+
+
+def save_solar_term_table(path: str = TABLE_PATH,
+                          start_year: int = TABLE_START_YEAR,
+                          end_year: int = TABLE_END_YEAR) -> None:
+    """生成并保存节气时刻表"""
+    table = build_solar_term_table(start_year, end_year)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    np.savez_compressed(path, terms=table, start_year=np.int64(start_year),
+                        version=np.array(SOLAR_TERM_TABLE_VERSION))
+    logger.info(f"节气时刻表已生成: {path} ({start_year}-{end_year})")
+
+
+def _load_table(path: str = TABLE_PATH):
+    """加载节气时刻表，文件缺失或版本不符时返回None（回退到ephem逐年计算）"""
+    try:
+        with np.load(path) as data:
+            if str(data["version"]) != SOLAR_TERM_TABLE_VERSION:
+                logger.warning(f"节气时刻表版本不匹配: {data['version']}，回退到实时计算")
+                return None, TABLE_START_YEAR
+            return data["terms"], int(data["start_year"])
+    except (OSError, KeyError) as e:
+        logger.warning(f"节气时刻表加载失败: {e}，回退到实时计算")
+        return None, TABLE_START_YEAR
+
+
+_TABLE, _TABLE_START = _load_table()
+if _TABLE is not None:
+    # 节气顺序并非严格按时间递增，月柱按"前缀全部早于出生时间"的规则取节气，
+    # 对每年的前缀最大值做二分查找即可得到同样的结果
+    _PREFIX_MAX = np.maximum.accumulate(_TABLE, axis=1)
+    _JIE_INSTANTS = np.unique(_TABLE[:, JIE_COLUMNS])
+    _TABLE_END = _TABLE_START + len(_TABLE) - 1
+else:
+    _PREFIX_MAX = None
+    _JIE_INSTANTS = None
+    _TABLE_END = _TABLE_START - 1
+
+
+@lru_cache(maxsize=64)
+def _computed_row(year: int) -> tuple:
+    """表外年份：使用ephem计算并缓存一年的节气微秒时间戳"""
+    terms = compute_solar_terms(year)
+    return tuple(_to_micros(terms[name]) for name in TERM_ORDER)
+
+
+def _term_row(year: int):
+    """获取一年的节气微秒时间戳（按TERM_ORDER排列）"""
+    if _TABLE_START <= year <= _TABLE_END:
+        return _TABLE[year - _TABLE_START]
+    return _computed_row(year)
+
+
+def get_solar_terms(year: int) -> Dict[str, datetime.datetime]:
+    """获取指定年份的24节气时间（UTC，带时区）"""
+    row = _term_row(year)
+    return {name: _from_micros(row[i]) for i, name in enumerate(TERM_ORDER)}
+
+
+def get_term_instant(year: int, term: str) -> datetime.datetime:
+    """获取指定年份某个节气的时间（UTC，带时区）"""
+    return _from_micros(_term_row(year)[TERM_ORDER.index(term)])
+
+
+def last_term_index(birth_datetime: datetime.datetime, year: int) -> Optional[int]:
+    """
+    返回指定年份中出生时间之前的最后一个节气序号（按TERM_ORDER顺序依次比较，
+    遇到第一个不早于出生时间的节气即停止），没有则返回None
+    """
+    micros = _to_micros(birth_datetime)
+    if _TABLE_START <= year <= _TABLE_END:
+        count = int(np.searchsorted(_PREFIX_MAX[year - _TABLE_START], micros, side="left"))
+    else:
+        prefix_max = np.maximum.accumulate(np.asarray(_computed_row(year), dtype=np.int64))
+        count = int(np.searchsorted(prefix_max, micros, side="left"))
+    return count - 1 if count > 0 else None
+
+
+def _jie_instants_around(year: int) -> List[int]:
+    """表外年份：出生年份及前后一年的换月节气时间戳（已排序去重）"""
+    instants = set()
+    for y in (year - 1, year, year + 1):
+        row = _term_row(y)
+        instants.update(int(row[col]) for col in JIE_COLUMNS)
+    return sorted(instants)
+
+
+def find_nearest_jie(birth_datetime: datetime.datetime, direction: str) -> datetime.datetime:
+    """找到最近的换月节气（forward: 之后的第一个；backward: 之前的最后一个）"""
+    micros = _to_micros(birth_datetime)
+    year = birth_datetime.year
+    if _TABLE_START < year < _TABLE_END:
+        instants = _JIE_INSTANTS
+    else:
+        instants = _jie_instants_around(year)
+
+    if direction == "forward":
+        idx = int(np.searchsorted(instants, micros, side="right"))
+        if idx < len(instants):
+            return _from_micros(instants[idx])
+        # 如果没找到，返回默认值
+        return birth_datetime + datetime.timedelta(days=30)
+
+    idx = int(np.searchsorted(instants, micros, side="left"))
+    return _from_micros(instants[idx - 1] if idx > 0 else instants[0])
+
+
+# === 批量（向量化）查询 ===
+def table_covers(years: np.ndarray) -> np.ndarray:
+    """判断年份是否可以完全由时刻表回答（含前后一年的换月节气）"""
+    years = np.asarray(years)
+    return (years > _TABLE_START) & (years < _TABLE_END)
+
+
+def term_micros(years: np.ndarray, term: str) -> np.ndarray:
+    """批量获取指定节气的UTC微秒时间戳（年份须在时刻表范围内）"""
+    return _TABLE[np.asarray(years) - _TABLE_START, TERM_ORDER.index(term)]
+
+
+def last_term_indices(micros: np.ndarray, years: np.ndarray) -> np.ndarray:
+    """批量版last_term_index：返回节气序号数组，没有节气时为-1"""
+    rows = _PREFIX_MAX[np.asarray(years) - _TABLE_START]
+    return (rows < np.asarray(micros)[:, None]).sum(axis=1) - 1
+
+
+def nearest_jie_micros(micros: np.ndarray, forward: np.ndarray):
+    """
+    批量版find_nearest_jie：forward为True取之后的第一个换月节气，否则取之前的最后一个；
+    返回(节气时间戳数组, 是否找到)，顺行超出时刻表末尾时未找到（由调用方按默认值处理）
+    """
+    micros = np.asarray(micros)
+    after = np.searchsorted(_JIE_INSTANTS, micros, side="right")
+    before = np.searchsorted(_JIE_INSTANTS, micros, side="left") - 1
+    last = len(_JIE_INSTANTS) - 1
+    next_jie = _JIE_INSTANTS[np.minimum(after, last)]
+    prev_jie = _JIE_INSTANTS[np.maximum(before, 0)]
+    found = np.where(forward, after <= last, True)
+    return np.where(forward, next_jie, prev_jie), found
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    save_solar_term_table()
@@ -0,0 +1,114 @@
+"""
+均时差与真太阳时模块
+均时差公式与 ZiWeiCalculator 原有实现一致，提供三种用法：
+标量公式、NumPy 向量化公式，以及1800-2200年逐日预计算表（线性插值，实时排盘只需一次数组查找）。
+真太阳时偏移 = 经度时差（经度/15小时）+ 均时差 + (经度-120)*4 分钟。
+"""
+
+import datetime
+import math
+from functools import lru_cache
+
+import numpy as np
+
+# 逐日均时差表范围：1800-01-01 至 2200-01-01（0h UT）
+EOT_TABLE_START_JD = 2378496.5
+EOT_TABLE_END_JD = 2524593.5
+UNIX_EPOCH_JD = 2440587.5
+_DAY_MICROS = 86400 * 10 ** 6
+
+
+def equation_of_time(jd: float) -> float:
+    """计算均时差（太阳时与平太阳时的差异，单位：分钟）"""
+    # 简化算法：实际应使用天文公式计算
+    # 参考：https://en.wikipedia.org/wiki/Equation_of_time
+    t = (jd - 2451545.0) / 36525.0  # 儒略世纪数
+    g = (357.5291 + 0.98560028 * t) % 360  # 太阳几何中心的平近点角
+    q = 280.459 + 0.98564736 * t  # 平太阳的赤经
+    e = 23.439 - 0.00000036 * t  # 黄赤交角
+
+    # 计算太阳的真近点角
+    l = q + 1.9146 * math.sin(math.radians(g)) + 0.0199 * math.sin(math.radians(2 * g))
+
+    # 计算太阳的赤经
+    ra = math.degrees(math.atan2(
+        math.cos(math.radians(e)) * math.sin(math.radians(l)),
+        math.cos(math.radians(l))
+    ))
+    ra = (ra + 360) % 360
+
+    # 均时差 = 平太阳时角 - 真太阳时角
+    equation = q - ra
+    return equation * 4  # 转换为分钟
+
+
+def equation_of_time_array(jds) -> np.ndarray:
+    """向量化均时差（分钟），与 equation_of_time 逐项对应"""
+    t = (np.asarray(jds, dtype=np.float64) - 2451545.0) / 36525.0
+    g = np.mod(357.5291 + 0.98560028 * t, 360)
+    q = 280.459 + 0.98564736 * t
+    e = 23.439 - 0.00000036 * t
+    l = q + 1.9146 * np.sin(np.radians(g)) + 0.0199 * np.sin(np.radians(2 * g))
+    ra = np.degrees(np.arctan2(np.cos(np.radians(e)) * np.sin(np.radians(l)), np.cos(np.radians(l))))
+    ra = np.mod(ra + 360, 360)
+    return (q - ra) * 4
+
+
+@lru_cache(maxsize=None)
+def _eot_table() -> np.ndarray:
+    """逐日均时差表（每日0h UT），多出一项供末日插值"""
+    days = int(EOT_TABLE_END_JD - EOT_TABLE_START_JD) + 1
+    table = equation_of_time_array(EOT_TABLE_START_JD + np.arange(days, dtype=np.float64))
+    table.setflags(write=False)
+    return table
+
+
+def equation_of_time_lookup(jd: float) -> float:
+    """查表求均时差（分钟），表外回退到公式计算"""
+    if not EOT_TABLE_START_JD <= jd < EOT_TABLE_END_JD:
+        return equation_of_time(jd)
+    table = _eot_table()
+    offset = jd - EOT_TABLE_START_JD
+    day = int(offset)
+    frac = offset - day
+    return table[day] + (table[day + 1] - table[day]) * frac
+
+
+def equation_of_time_lookup_array(jds) -> np.ndarray:
+    """向量化查表求均时差（分钟），表外回退到公式计算"""
+    jds = np.asarray(jds, dtype=np.float64)
+    inside = (jds >= EOT_TABLE_START_JD) & (jds < EOT_TABLE_END_JD)
+    result = np.empty(jds.shape, dtype=np.float64)
+    if inside.any():
+        table = _eot_table()
+        offset = jds[inside] - EOT_TABLE_START_JD
+        day = offset.astype(np.int64)
+        frac = offset - day
+        result[inside] = table[day] + (table[day + 1] - table[day]) * frac
+    if not inside.all():
+        result[~inside] = equation_of_time_array(jds[~inside])
+    return result
+
+
+def true_solar_offset_minutes(equation: float, longitude: float) -> float:
+    """真太阳时相对出生时刻的偏移（分钟）"""
+    return longitude / 15.0 * 60 + equation + (longitude - 120) * 4
+
+
+def true_solar_offsets(utc_micros, longitudes) -> np.ndarray:
+    """
+    向量化真太阳时偏移
+    utc_micros 为出生时刻的UTC微秒时间戳数组，longitudes 为经度数组，
+    返回与出生时刻相加的偏移（微秒，int64）
+    """
+    utc_micros = np.asarray(utc_micros, dtype=np.int64)
+    jds = UNIX_EPOCH_JD + utc_micros / _DAY_MICROS
+    minutes = true_solar_offset_minutes(equation_of_time_lookup_array(jds),
+                                        np.asarray(longitudes, dtype=np.float64))
+    return np.rint(minutes * 60 * 10 ** 6).astype(np.int64)
+
+
+def true_solar_time(dt: datetime.datetime, longitude: float, jd: float) -> datetime.datetime:
+    """标量真太阳时：查表均时差加经度时差，jd 为出生时刻的儒略日"""
+    minutes = true_solar_offset_minutes(equation_of_time_lookup(jd), longitude)
+    return dt + datetime.timedelta(minutes=minutes)
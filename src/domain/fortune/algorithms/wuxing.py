@@ -4,8 +4,11 @@
 """
 
 from typing import List, Dict, Tuple, Optional
-from lunarcalendar import Lunar
 from src.config.loader import CONSTANTS
+from src.domain.fortune.algorithms.ganzhi import (
+    ELEMENT_CODES, ELEMENT_RELATION, nayin_element
+)
+from src.domain.fortune.algorithms.lunar import LunarDate
 
 # 天干地支和五行映射
 # HEAVENLY_STEMS = ["甲", "乙", "丙", "丁", "戊", "己", "庚", "辛", "壬", "癸"]
@@ -22,11 +25,14 @@ HEAVENLY_STEMS = CONSTANTS['HEAVENLY_STEMS']
 EARTHLY_BRANCHES = CONSTANTS['EARTHLY_BRANCHES']
 WUXING_MAP = CONSTANTS['WUXING_MAP']
 
+# 五行局，按五行编码（木火土金水）索引
+WUXING_BUREAUS = ("木三局", "火六局", "土五局", "金四局", "水二局")
+
 
 class WuxingCalculator:
     """紫微斗数五行算法计算器"""
 
-    def calculate_wuxing_bureau(self, lunar: Lunar, major_stars: Dict[str, List[str]]) -> str:
+    def calculate_wuxing_bureau(self, lunar: LunarDate, major_stars: Dict[str, List[str]]) -> str:
         """
         计算五行局
         1. 结合年干支纳音五行
@@ -34,7 +40,7 @@ class WuxingCalculator:
         """
         # 1. 计算年干支纳音五行
         year_stem = self._get_lunar_year_stem(lunar.year)
-        year_branch = EARTHLY_BRANCHES[(lunar.year - 1900) % 12]
+        year_branch = (lunar.year - 1900) % 12
         nayin_wuxing = self._get_nayin_wuxing(year_stem, year_branch)
 
         # 2. 计算命宫主星五行
@@ -42,31 +48,20 @@ class WuxingCalculator:
         life_stars = major_stars[life_palace]
         star_wuxing = self._get_star_wuxing(life_stars)
 
-        # 3. 综合确定五行局
-        bureau_map = {
-            "水": "水二局", "木": "木三局", "金": "金四局",
-            "土": "土五局", "火": "火六局"
-        }
-
-        # 优先以纳音五行为主，命宫主星五行为辅
+        # 3. 综合确定五行局：优先以纳音五行为主，命宫主星五行为辅
         main_wuxing = nayin_wuxing
-        if not main_wuxing:
-            main_wuxing = star_wuxing
+        if main_wuxing is None:
+            main_wuxing = ELEMENT_CODES.get(star_wuxing)
 
-        return bureau_map.get(main_wuxing, "土五局")
+        return WUXING_BUREAUS[main_wuxing] if main_wuxing is not None else "土五局"
 
-    def _get_lunar_year_stem(self, lunar_year: int) -> str:
-        """获取农历年干"""
-        stem_idx = (lunar_year - 1900) % 10
-        return HEAVENLY_STEMS[stem_idx]
+    def _get_lunar_year_stem(self, lunar_year: int) -> int:
+        """获取农历年干编码"""
+        return (lunar_year - 1900) % 10
 
-    def _get_nayin_wuxing(self, stem: str, branch: str) -> str:
-        """获取年干支纳音五行（简化算法）"""
-        stem_idx = HEAVENLY_STEMS.index(stem)
-        branch_idx = EARTHLY_BRANCHES.index(branch)
-        nayin_index = (stem_idx * 12 + branch_idx) % 5
-        wuxing_list = ["金", "火", "木", "水", "土"]
-        return wuxing_list[nayin_index]
+    def _get_nayin_wuxing(self, stem: int, branch: int) -> int:
+        """获取年干支纳音五行编码（简化算法）"""
+        return nayin_element(stem, branch)
 
     def _get_star_wuxing(self, stars: List[str]) -> str:
         """获取主星五行属性"""
@@ -86,21 +81,4 @@ class WuxingCalculator:
         if not year_wuxing or not bureau_wuxing:
             return "平"
 
-        wuxing_relations = CONSTANTS['WUXING_RELATIONS']
-
-        if year_wuxing == bureau_wuxing:
-            return "比和"  # 五行相同
-
-        if wuxing_relations[year_wuxing]["生"] == bureau_wuxing:
-            return "相生"  # 流年五行生五行局
-
-        if wuxing_relations[year_wuxing]["克"] == bureau_wuxing:
-            return "相克"  # 流年五行克五行局
-
-        if wuxing_relations[bureau_wuxing]["生"] == year_wuxing:
-            return "被生"  # 五行局生流年五行
-
-        if wuxing_relations[bureau_wuxing]["克"] == year_wuxing:
-            return "被克"  # 五行局克流年五行
-
-        return "平"
\ No newline at end of file
+        return ELEMENT_RELATION[ELEMENT_CODES[year_wuxing]][ELEMENT_CODES[bureau_wuxing]]
\ No newline at end of file
@@ -1,24 +1,34 @@
 """
 紫微斗数计算系统 - 完整实现
-包含星历表自动更新和紫微斗数核心算法
+使用离线星历表存储（见 ephemeris_store）与紫微斗数核心算法
 融合八字命理计算逻辑优化天体位置和五行分析
 """
 
-import os
 import sys
-import math
-import requests
-import hashlib
-import zipfile
-import shutil
 import json
-from datetime import datetime
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import List
 
-import self
-from dateutil.relativedelta import relativedelta
+import numpy as np
+import pytz
 import swisseph as swe
-from lunarcalendar import Converter, Solar, Lunar
 from src.config.loader import CONSTANTS
+from src.domain.fortune.algorithms.ganzhi import (
+    ELEMENTS, ELEMENT_CODES, ELEMENT_RELATION, STEM_ELEMENT, nayin_element
+)
+from src.domain.fortune.algorithms.wuxing import WUXING_BUREAUS
+from src.domain.fortune.algorithms.lunar import LunarDate, solar_to_lunar
+from src.domain.fortune.algorithms.ephemeris_store import get_ephemeris_store
+from src.domain.fortune.algorithms.ephemeris_batch import planet_position, planet_positions
+from src.domain.fortune.algorithms.luck_pillars import step_codes, step_ages
+from src.domain.fortune.algorithms.ziwei_tables import (
+    HOUR_STARS, MONTH_STARS, major_star_masks, masks_to_palaces, hour_star_palaces, month_star_palaces
+)
+from src.domain.fortune.algorithms import ziwei_chart
+from src.domain.fortune.algorithms.solar_time import (
+    UNIX_EPOCH_JD, equation_of_time, true_solar_time, true_solar_offsets
+)
 
 # 引入八字计算中的天干地支和五行映射（用于紫微斗数五行分析）
 # HEAVENLY_STEMS = ["甲", "乙", "丙", "丁", "戊", "己", "庚", "辛", "壬", "癸"]
@@ -34,23 +44,7 @@ HEAVENLY_STEMS = CONSTANTS['HEAVENLY_STEMS']
 EARTHLY_BRANCHES = CONSTANTS['EARTHLY_BRANCHES']
 WUXING_MAP = CONSTANTS['WUXING_MAP']
 
-# 星历表配置
-EPHEMERIS_CONFIG = {
-    "base_url": "https://www.astro.com/ftp/swisseph/ephe/",
-    "files": [
-        "sepl_18.se1",  # 行星位置1800-2100
-        "semo_18.se1",  # 月球位置1800-2100
-        "seas_18.se1",  # 小行星位置1800-2100
-        "s1990.se1",  # 1990-1999补充
-        "s2000.se1",  # 2000-2099补充
-        "s2100.se1"  # 2100-2199补充
-    ],
-    "checksum_url": "https://gist.githubusercontent.com/astropy/example-data/raw/main/ephe_checksums.json",
-    "mirrors": [
-        "https://astro.astropy.org/ephe/",
-        "https://mirror.example.com/ephe/"
-    ]
-}
+_EPOCH = pytz.utc.localize(datetime(1970, 1, 1))
 
 # 紫微斗数配置
 ZIWEI_CONFIG = {
@@ -64,84 +58,40 @@ ZIWEI_CONFIG = {
                     "地空", "地劫"]
 }
 
-
-class EphemerisUpdater:
-    """星历表自动更新系统（优化网络请求和缓存策略）"""
-
-    def __init__(self, data_dir="ephe_data", auto_update=True):
-        self.data_dir = data_dir
-        self.ephe_path = os.path.join(data_dir, "ephe")
-        self.auto_update = auto_update
-
-        # 确保目录存在
-        os.makedirs(self.ephe_path, exist_ok=True)
-
-        # 设置环境变量
-        os.environ["SE_EPHE_PATH"] = self.ephe_path
-        swe.set_ephe_path(self.ephe_path)
-
-        if auto_update:
-            self.update_ephemeris_data()
-
-    def update_ephemeris_data(self, force=False):
-        """优化的星历表更新逻辑，增加重试机制和进度显示"""
-        try:
-            # 检查是否需要更新
-            if not force and not self._needs_update():
-                return
-
-            print("开始更新星历表数据...")
-            checksums = self._download_checksums()
-
-            # 下载并验证文件（增加重试次数）
-            for filename in EPHEMERIS_CONFIG["files"]:
-                local_path = os.path.join(self.ephe_path, filename)
-                retry_count = 3
-
-                while retry_count > 0:
-                    try:
-                        # 已存在且校验通过则跳过
-                        if os.path.exists(local_path) and filename in checksums:
-                            if self._verify_file(local_path, checksums[filename]):
-                                print(f"文件已验证: {filename}")
-                                break
-
-                        # 多镜像下载
-                        for mirror in [EPHEMERIS_CONFIG["base_url"]] + EPHEMERIS_CONFIG["mirrors"]:
-                            remote_url = mirror.rstrip('/') + '/' + filename
-                            try:
-                                self._download_file(remote_url, local_path)
-                                if filename in checksums and self._verify_file(local_path, checksums[filename]):
-                                    print(f"成功下载: {filename}")
-                                    retry_count = 0
-                                    break
-                            except Exception as e:
-                                print(f"镜像 {remote_url} 下载失败: {str(e)}")
-                                retry_count -= 1
-
-                        if retry_count == 0:
-                            raise ConnectionError(f"所有镜像下载失败: {filename}")
-
-                    except Exception as e:
-                        print(f"下载文件 {filename} 失败，剩余重试次数: {retry_count}")
-                        retry_count -= 1
-
-            self._update_last_modified()
-            print("星历表数据更新完成")
-
-        except Exception as e:
-            print(f"星历表更新失败: {str(e)}")
-            if not self._validate_cache():
-                raise RuntimeError("无可用星历表数据")
-
-    # 其他方法保持不变...
+# 宫位名称 → 宫位序号
+PALACE_INDEX = {palace: i for i, palace in enumerate(ZIWEI_CONFIG["palaces"])}
+
+# 以下按天干编码索引的起宫表
+ZIWEI_START = (11, 6, 2, 9, 3, 0, 8, 4, 7, 1)  # 紫微：甲亥、乙午、丙寅、丁酉、戊卯、己子、庚申、辛辰、壬未、癸丑
+WENCHANG_START = (0, 5, 10, 3, 8, 1, 6, 11, 4, 9)
+TIANKUI_PALACE = (11, 10, 1, 0, 11, 10, 5, 4, 3, 2)
+TIANYUE_PALACE = (1, 0, 11, 10, 1, 0, 7, 6, 5, 4)
+LUCUN_START = (2, 3, 5, 6, 5, 6, 8, 9, 11, 0)  # 禄存：甲寅、乙卯、丙戊巳、丁己午、庚申、辛酉、壬亥、癸子
+# 以下按地支编码索引（年支三合局定起宫）
+TIANMA_PALACE = (2, 11, 8, 5, 2, 11, 8, 5, 2, 11, 8, 5)  # 天马：申子辰马在寅，寅午戌在申，巳酉丑在亥，亥卯未在巳
+HUOXING_START = (2, 3, 1, 9, 2, 3, 1, 9, 2, 3, 1, 9)  # 火星：申子辰起寅，巳酉丑起卯，寅午戌起丑，亥卯未起酉
+LINGXING_START = (10, 10, 3, 10, 10, 10, 3, 10, 10, 10, 3, 10)  # 铃星：寅午戌起卯，其余起戌
+
+# 流年运势评分：煞星、吉星（主星与辅星）及流年五行与五行局关系的分值
+SHA_STARS = ("擎羊", "陀罗", "火星", "铃星", "地空", "地劫")
+AUSPICIOUS_STARS = ("紫微", "天府", "太阳", "太阴", "天同", "天梁", "天相",
+                    "文昌", "文曲", "左辅", "右弼", "天魁", "天钺", "禄存")
+WUXING_RELATION_SCORES = {"相生": 2, "被生": 1, "比和": 1, "平": 0, "被克": -1, "相克": -2}
+# (最低分, 运势等级)，按分值从高到低
+FORTUNE_LEVELS = ((4, "大吉"), (2, "吉"), (0, "平"), (-2, "凶"))
+LOWEST_FORTUNE_LEVEL = "大凶"
+
+# 大限：各五行局的起限基准年龄与每步大限年数
+LIMIT_START_AGES = {"水二局": 4, "木三局": 6, "金四局": 8, "土五局": 10, "火六局": 12}
+LIMIT_DURATIONS = {"水二局": 6, "木三局": 7, "金四局": 8, "土五局": 9, "火六局": 10}
 
 
 class ZiWeiCalculator:
     """紫微斗数计算器（融合八字算法优化核心逻辑）"""
 
-    def __init__(self, auto_update_ephe=True):
-        self.updater = EphemerisUpdater(auto_update=auto_update_ephe)
+    def __init__(self, ephe_path: str = None):
+        # 星历表为部署包内的只读存储，进程内只打开一次；更新须执行 ephemeris_store 命令行步骤
+        self.ephemeris = get_ephemeris_store(ephe_path)
         self.swe = swe
         self.bazi_wuxing = WUXING_MAP  # 引入八字五行映射
 
@@ -185,8 +135,9 @@ class ZiWeiCalculator:
             # 6. 计算主星分布（完整紫微排盘规则）
             major_stars = self._calculate_major_stars(jd, life_palace, lunar_date, longitude, latitude)
 
-            # 7. 计算辅星分布（细化辅星排盘逻辑）
-            minor_stars = self._calculate_minor_stars(jd, lunar_date, life_palace)
+            # 7. 计算辅星分布（细化辅星排盘逻辑，时辰按出生地当地时间）
+            hour_branch = self._get_hour_branch(birth_datetime)
+            minor_stars = self._calculate_minor_stars(jd, lunar_date, life_palace, hour_branch)
 
             # 8. 计算五行局（结合八字五行分析）
             wuxing_bureau = self._calculate_wuxing_bureau(lunar_date, major_stars)
@@ -198,7 +149,7 @@ class ZiWeiCalculator:
             fortune_trend = self._analyze_fortune_trend(major_stars, minor_stars, jd, wuxing_bureau)
 
             # 11. 生成命盘图
-            chart = self._generate_chart(life_palace, major_stars, minor_stars)
+            chart = self._generate_chart(life_palace, major_stars, minor_stars, body_palace)
 
             return {
                 "basic_info": {
@@ -225,48 +176,56 @@ class ZiWeiCalculator:
         except Exception as e:
             raise ValueError(f"紫微斗数计算失败: {str(e)}") from e
 
+    def calculate_cohort(self, records: List[dict]) -> List[dict]:
+        """
+        批量排盘：records 中每项为 {"birth_data": ..., "location_data": ...}，
+        location_data 可省略，与单张排盘一样使用默认经纬度。
+        先对全部命盘的儒略日一次性求出日月黄经与恒星时并写入星历缓存，
+        逐张排盘时不再单独调用星历。
+        """
+        utc_micros, longitudes = [], []
+        for record in records:
+            birth_data, location_data = record["birth_data"], record.get("location_data") or {}
+            birth_datetime = birth_data.get("birth_datetime")
+            if not birth_datetime:
+                raise ValueError("缺少出生日期信息")
+            if not isinstance(birth_datetime, datetime):
+                birth_datetime = datetime.fromisoformat(birth_datetime)
+            birth_datetime = pytz.timezone(birth_data.get("timezone", "Asia/Shanghai")).localize(birth_datetime)
+            utc_micros.append((birth_datetime - _EPOCH) // timedelta(microseconds=1))
+            longitudes.append(location_data.get("longitude", 120.0))
+
+        # 向量化真太阳时，再一次性求出全部命盘的日月黄经与恒星时
+        true_solar_micros = np.asarray(utc_micros, dtype=np.int64) + true_solar_offsets(utc_micros, longitudes)
+        planet_positions(UNIX_EPOCH_JD + true_solar_micros / (86400 * 10 ** 6))
+        return [self.calculate(r["birth_data"], r.get("location_data") or {}) for r in records]
+
     # === 时间转换优化 ===
+    def _datetime_to_jd(self, dt: datetime) -> float:
+        """带时区的datetime转换为儒略日（UT）"""
+        if dt.tzinfo is not None:
+            dt = dt.astimezone(pytz.utc)
+        hour = dt.hour + dt.minute / 60.0 + (dt.second + dt.microsecond / 1e6) / 3600.0
+        return swe.julday(dt.year, dt.month, dt.day, hour)
+
     def _convert_to_true_solar_time(self, dt: datetime, longitude: float) -> datetime:
         """
         优化真太阳时计算：
         1. 考虑经度时差
-        2. 加入均时差修正（太阳时与平太阳时差异）
+        2. 加入均时差修正（逐日均时差表查表）
         """
-        # 1. 计算时区偏移（经度每15度=1小时）
-        timezone_offset = longitude / 15.0
-
-        # 2. 计算均时差（太阳时与平太阳时的差异，单位：分钟）
-        jd = self._datetime_to_jd(dt)
-        equation_of_time = self._calculate_equation_of_time(jd)  # 新增均时差计算
-
-        # 3. 真太阳时 = 平太阳时 + 均时差 + 经度时差
-        true_solar_minutes = equation_of_time + (longitude - 120) * 4
-        hours, minutes = divmod(true_solar_minutes, 60)
+        return true_solar_time(dt, longitude, self._datetime_to_jd(dt))
 
-        return dt + relativedelta(hours=timezone_offset + hours, minutes=minutes)
+    def _convert_to_lunar(self, dt: datetime) -> LunarDate:
+        """出生地日期转换为农历（与八字命宫共用农历转换服务）"""
+        lunar = solar_to_lunar(dt)
+        if lunar is None:
+            raise ValueError(f"农历转换失败: {dt.date()}")
+        return lunar
 
     def _calculate_equation_of_time(self, jd: float) -> float:
         """计算均时差（太阳时与平太阳时的差异，单位：分钟）"""
-        # 简化算法：实际应使用天文公式计算
-        # 参考：https://en.wikipedia.org/wiki/Equation_of_time
-        t = (jd - 2451545.0) / 36525.0  # 儒略世纪数
-        g = (357.5291 + 0.98560028 * t) % 360  # 太阳几何中心的平近点角
-        q = 280.459 + 0.98564736 * t  # 平太阳的赤经
-        e = 23.439 - 0.00000036 * t  # 黄赤交角
-
-        # 计算太阳的真近点角
-        l = q + 1.9146 * math.sin(math.radians(g)) + 0.0199 * math.sin(math.radians(2 * g))
-
-        # 计算太阳的赤经
-        ra = math.degrees(math.atan2(
-            math.cos(math.radians(e)) * math.sin(math.radians(l)),
-            math.cos(math.radians(l))
-        ))
-        ra = (ra + 360) % 360
-
-        # 均时差 = 平太阳时角 - 真太阳时角
-        equation = q - ra
-        return equation * 4  # 转换为分钟
+        return equation_of_time(jd)
 
     # === 命宫与身宫计算优化 ===
     def _calculate_life_palace(self, jd: float, longitude: float, ts_time: datetime) -> str:
@@ -276,7 +235,7 @@ class ZiWeiCalculator:
         2. 结合节气修正宫位起始点
         """
         # 1. 计算格林威治恒星时
-        gst = swe.sidtime(jd)
+        gst = planet_position(jd)[2]
 
         # 2. 转换为本地恒星时（LST = GST + 经度/15）
         lst = gst + longitude / 15.0
@@ -308,13 +267,13 @@ class ZiWeiCalculator:
         }
         return adjust_map.get(term, 1.5)  # 默认为春分修正值
 
-    def _calculate_body_palace(self, life_palace: str, lunar: Lunar, gender: str) -> str:
+    def _calculate_body_palace(self, life_palace: str, lunar: LunarDate, gender: str) -> str:
         """
         优化身宫计算：
         1. 结合性别调整身宫算法
         2. 考虑农历出生时辰
         """
-        life_idx = ZIWEI_CONFIG["palaces"].index(life_palace)
+        life_idx = PALACE_INDEX[life_palace]
         month = lunar.month
         hour = lunar.hour if hasattr(lunar, 'hour') else 12  # 默认为午时
 
@@ -326,7 +285,7 @@ class ZiWeiCalculator:
         return ZIWEI_CONFIG["palaces"][body_idx]
 
     # === 主星排盘算法完整实现 ===
-    def _calculate_major_stars(self, jd: float, life_palace: str, lunar: Lunar,
+    def _calculate_major_stars(self, jd: float, life_palace: str, lunar: LunarDate,
                                longitude: float, latitude: float) -> dict:
         """
         完整主星排盘算法（紫微斗数十四主星排盘规则）：
@@ -334,115 +293,55 @@ class ZiWeiCalculator:
         2. 天府星定位（与紫微星相对）
         3. 其他主星按固定规则排布
         """
-        # 初始化12宫位主星分布
-        stars_in_palaces = {palace: [] for palace in ZIWEI_CONFIG["palaces"]}
-
-        # 1. 计算紫微星位置（根据年干和月支）
+        # 1. 年干、月支、命宫定紫微、天府及其余十颗主星（查安星表）
         year_stem = self._get_lunar_year_stem(lunar.year)
-        month_branch = EARTHLY_BRANCHES[(lunar.month - 1) % 12]
-        ziwei_idx = self._calculate_ziwei_position(year_stem, month_branch)
-        stars_in_palaces[ZIWEI_CONFIG["palaces"][ziwei_idx]].append("紫微")
-
-        # 2. 天府星位置（与紫微星相差4宫）
-        tianfu_idx = (ziwei_idx + 4) % 12
-        stars_in_palaces[ZIWEI_CONFIG["palaces"][tianfu_idx]].append("天府")
-
-        # 3. 太阳系主星定位（太阳、太阴等）
-        sun_pos = self._get_planet_position(jd, swe.SUN)
-        moon_pos = self._get_planet_position(jd, swe.MOON)
-        sun_palace = self._position_to_palace(sun_pos, life_palace)
-        moon_palace = self._position_to_palace(moon_pos, life_palace)
-
-        stars_in_palaces[sun_palace].append("太阳")
-        stars_in_palaces[moon_palace].append("太阴")
-
-        # 4. 其他主星排布（按紫微斗数规则）
-        # 天机星：命宫起寅，顺时针排布
-        tianji_idx = (ZIWEI_CONFIG["palaces"].index(life_palace) + 2) % 12
-        stars_in_palaces[ZIWEI_CONFIG["palaces"][tianji_idx]].append("天机")
-
-        # 武曲星：命宫起辰，逆时针排布
-        wuqu_idx = (ZIWEI_CONFIG["palaces"].index(life_palace) + 5) % 12
-        stars_in_palaces[ZIWEI_CONFIG["palaces"][wuqu_idx]].append("武曲")
-
-        # 天同星：命宫起午，顺时针排布
-        tiantong_idx = (ZIWEI_CONFIG["palaces"].index(life_palace) + 7) % 12
-        stars_in_palaces[ZIWEI_CONFIG["palaces"][tiantong_idx]].append("天同")
+        month_branch = (lunar.month - 1) % 12
+        life_idx = PALACE_INDEX[life_palace]
 
-        # 廉贞星：与天同星同宫
-        stars_in_palaces[ZIWEI_CONFIG["palaces"][tiantong_idx]].append("廉贞")
+        # 2. 太阳、太阴按黄经定宫
+        sun_idx = PALACE_INDEX[self._position_to_palace(self._get_planet_position(jd, swe.SUN), life_palace)]
+        moon_idx = PALACE_INDEX[self._position_to_palace(self._get_planet_position(jd, swe.MOON), life_palace)]
 
-        # 贪狼星：紫微星起子，顺时针数至月支
-        tanlang_idx = self._calculate_tanlang_position(ziwei_idx, month_branch)
-        stars_in_palaces[ZIWEI_CONFIG["palaces"][tanlang_idx]].append("贪狼")
+        # 3. 宫位掩码还原为宫位星曜表（无主星为空宫）
+        masks = major_star_masks(year_stem, month_branch, life_idx, sun_idx, moon_idx)
+        return masks_to_palaces(masks)
 
-        # 巨门星：贪狼星+1宫
-        jumen_idx = (tanlang_idx + 1) % 12
-        stars_in_palaces[ZIWEI_CONFIG["palaces"][jumen_idx]].append("巨门")
-
-        # 天相星：天府星+1宫
-        tianxiang_idx = (tianfu_idx + 1) % 12
-        stars_in_palaces[ZIWEI_CONFIG["palaces"][tianxiang_idx]].append("天相")
-
-        # 天梁星：天相星+1宫
-        tianliang_idx = (tianxiang_idx + 1) % 12
-        stars_in_palaces[ZIWEI_CONFIG["palaces"][tianliang_idx]].append("天梁")
-
-        # 七杀星：紫微星对宫
-        qisha_idx = (ziwei_idx + 6) % 12
-        stars_in_palaces[ZIWEI_CONFIG["palaces"][qisha_idx]].append("七杀")
-
-        # 破军星：七杀星+1宫
-        pojun_idx = (qisha_idx + 1) % 12
-        stars_in_palaces[ZIWEI_CONFIG["palaces"][pojun_idx]].append("破军")
-
-        # 5. 处理空宫情况
-        for palace in stars_in_palaces:
-            if not stars_in_palaces[palace]:
-                stars_in_palaces[palace].append("空宫")
-
-        return stars_in_palaces
-
-    def _get_lunar_year_stem(self, lunar_year: int) -> str:
-        """获取农历年干（用于紫微星定位）"""
+    def _get_lunar_year_stem(self, lunar_year: int) -> int:
+        """获取农历年干编码（用于紫微星定位）"""
         # 简化算法：实际应使用干支转换
-        stem_idx = (lunar_year - 1900) % 10
-        return HEAVENLY_STEMS[stem_idx]
+        return (lunar_year - 1900) % 10
 
-    def _calculate_ziwei_position(self, year_stem: str, month_branch: str) -> int:
+    def _calculate_ziwei_position(self, year_stem: int, month_branch: int) -> int:
         """
         计算紫微星位置（根据年干和月支）：
         甲年起亥，乙年起午，丙年起寅，丁年起酉，
         戊年起卯，己年起子，庚年起申，辛年起辰，
         壬年起未，癸年起丑
         """
-        ziwei_map = {
-            "甲": 11, "乙": 6, "丙": 2, "丁": 9,
-            "戊": 3, "己": 0, "庚": 8, "辛": 4,
-            "壬": 7, "癸": 1
-        }
-        branch_idx = EARTHLY_BRANCHES.index(month_branch)
-        base_idx = ziwei_map.get(year_stem, 0)
-        return (base_idx + branch_idx) % 12
+        return (ZIWEI_START[year_stem] + month_branch) % 12
 
-    def _calculate_tanlang_position(self, ziwei_idx: int, month_branch: str) -> int:
+    def _calculate_tanlang_position(self, ziwei_idx: int, month_branch: int) -> int:
         """计算贪狼星位置（紫微星起子，顺时针数至月支）"""
-        branch_idx = EARTHLY_BRANCHES.index(month_branch)
-        return (ziwei_idx + branch_idx) % 12
+        return (ziwei_idx + month_branch) % 12
 
     def _get_planet_position(self, jd: float, planet: int) -> float:
         """获取行星黄经位置（单位：度）"""
-        _, pos = swe.calc_ut(jd, planet)
-        return pos % 360  # 转换为0-360度
+        # 日月位置走批量星历缓存
+        if planet == swe.SUN:
+            return planet_position(jd)[0]
+        if planet == swe.MOON:
+            return planet_position(jd)[1]
+        position, _ = swe.calc_ut(jd, planet)
+        return position[0] % 360  # 转换为0-360度
 
     def _position_to_palace(self, position: float, life_palace: str) -> str:
         """将黄经位置转换为紫微宫位"""
-        life_idx = ZIWEI_CONFIG["palaces"].index(life_palace)
+        life_idx = PALACE_INDEX[life_palace]
         palace_idx = int(position / 30) % 12  # 每30度一个宫位
         return ZIWEI_CONFIG["palaces"][(life_idx + palace_idx) % 12]
 
     # === 辅星排盘算法完整实现 ===
-    def _calculate_minor_stars(self, jd: float, lunar: Lunar, life_palace: str) -> dict:
+    def _calculate_minor_stars(self, jd: float, lunar: LunarDate, life_palace: str, hour_branch: int) -> dict:
         """
         完整辅星排盘算法：
         1. 文昌文曲（根据出生日干和时支）
@@ -455,35 +354,23 @@ class ZiWeiCalculator:
 
         # 1. 文昌文曲星（日干起子，顺时针排至时支）
         day_stem = self._get_lunar_day_stem(lunar)
-        hour_branch = EARTHLY_BRANCHES[(lunar.hour if hasattr(lunar, 'hour') else 12) // 2]
-
-        wenchang_idx = self._calculate_wenchang_position(day_stem, hour_branch)
-        minor_stars["文昌"] = ZIWEI_CONFIG["palaces"][wenchang_idx]
 
-        wenqu_idx = (wenchang_idx + 2) % 12
-        minor_stars["文曲"] = ZIWEI_CONFIG["palaces"][wenqu_idx]
+        for star, idx in zip(HOUR_STARS, hour_star_palaces(day_stem, hour_branch)):
+            minor_stars[star] = ZIWEI_CONFIG["palaces"][idx]
 
         # 2. 左辅右弼星（年干起子，左辅顺排，右弼逆排至月支）
-        year_stem = self._get_lunar_year_stem(lunar.year)
-        month_branch = EARTHLY_BRANCHES[(lunar.month - 1) % 12]
-
-        zuofu_idx = self._calculate_zuofu_position(year_stem, month_branch)
-        minor_stars["左辅"] = ZIWEI_CONFIG["palaces"][zuofu_idx]
-
-        youbi_idx = self._calculate_youbi_position(year_stem, month_branch)
-        minor_stars["右弼"] = ZIWEI_CONFIG["palaces"][youbi_idx]
-
         # 3. 天魁天钺星（年干对应贵人宫）
-        tiankui_idx, tianyue_idx = self._calculate_tiankui_tianyue(year_stem)
-        minor_stars["天魁"] = ZIWEI_CONFIG["palaces"][tiankui_idx]
-        minor_stars["天钺"] = ZIWEI_CONFIG["palaces"][tianyue_idx]
+        year_stem = self._get_lunar_year_stem(lunar.year)
+        month_branch = (lunar.month - 1) % 12
+        for star, idx in zip(MONTH_STARS, month_star_palaces(year_stem, month_branch)):
+            minor_stars[star] = ZIWEI_CONFIG["palaces"][idx]
 
         # 4. 禄存星（日干起寅，顺时针排至时支）
         luxun_idx = self._calculate_luxun_position(day_stem, hour_branch)
         minor_stars["禄存"] = ZIWEI_CONFIG["palaces"][luxun_idx]
 
         # 5. 天马星（根据出生年支）
-        year_branch = EARTHLY_BRANCHES[(lunar.year - 1900) % 12]
+        year_branch = (lunar.year - 1900) % 12
         tianma_idx = self._calculate_tianma_position(year_branch)
         minor_stars["天马"] = ZIWEI_CONFIG["palaces"][tianma_idx]
 
@@ -494,14 +381,14 @@ class ZiWeiCalculator:
         tuoluo_idx = (qingyang_idx + 1) % 12
         minor_stars["陀罗"] = ZIWEI_CONFIG["palaces"][tuoluo_idx]
 
-        huoxing_idx = self._calculate_huoxing_position(lunar)
+        huoxing_idx = self._calculate_huoxing_position(lunar, hour_branch)
         minor_stars["火星"] = ZIWEI_CONFIG["palaces"][huoxing_idx]
 
-        lingxing_idx = self._calculate_lingxing_position(lunar)
+        lingxing_idx = self._calculate_lingxing_position(lunar, hour_branch)
         minor_stars["铃星"] = ZIWEI_CONFIG["palaces"][lingxing_idx]
 
         # 7. 空劫星（地空地劫）
-        dikong_idx = self._calculate_dikong_position(lunar)
+        dikong_idx = self._calculate_dikong_position(hour_branch)
         minor_stars["地空"] = ZIWEI_CONFIG["palaces"][dikong_idx]
 
         dijie_idx = (dikong_idx + 6) % 12
@@ -509,43 +396,59 @@ class ZiWeiCalculator:
 
         return minor_stars
 
-    def _get_lunar_day_stem(self, lunar: Lunar) -> str:
-        """获取农历日干（简化算法，实际应使用干支纪日）"""
+    def _get_lunar_day_stem(self, lunar: LunarDate) -> int:
+        """获取农历日干编码（简化算法，实际应使用干支纪日）"""
         # 简化处理，实际应使用更精确的干支纪日算法
-        stem_idx = (lunar.day + lunar.month + lunar.year) % 10
-        return HEAVENLY_STEMS[stem_idx]
+        return (lunar.day + lunar.month + lunar.year) % 10
 
-    def _calculate_wenchang_position(self, day_stem: str, hour_branch: str) -> int:
+    def _calculate_wenchang_position(self, day_stem: int, hour_branch: int) -> int:
         """计算文昌星位置"""
-        stem_map = {"甲": 0, "乙": 5, "丙": 10, "丁": 3, "戊": 8,
-                    "己": 1, "庚": 6, "辛": 11, "壬": 4, "癸": 9}
-        branch_idx = EARTHLY_BRANCHES.index(hour_branch)
-        return (stem_map.get(day_stem, 0) + branch_idx) % 12
-
-    def _calculate_zuofu_position(self, year_stem: str, month_branch: str) -> int:
-        """计算左辅星位置（顺排）"""
-        stem_map = {"甲": 0, "乙": 1, "丙": 2, "丁": 3, "戊": 4,
-                    "己": 5, "庚": 6, "辛": 7, "壬": 8, "癸": 9}
-        branch_idx = EARTHLY_BRANCHES.index(month_branch)
-        return (stem_map.get(year_stem, 0) + branch_idx) % 12
-
-    def _calculate_youbi_position(self, year_stem: str, month_branch: str) -> int:
-        """计算右弼星位置（逆排）"""
-        stem_map = {"甲": 0, "乙": 11, "丙": 10, "丁": 9, "戊": 8,
-                    "己": 7, "庚": 6, "辛": 5, "壬": 4, "癸": 3}
-        branch_idx = EARTHLY_BRANCHES.index(month_branch)
-        return (stem_map.get(year_stem, 0) + branch_idx) % 12
-
-    def _calculate_tiankui_tianyue(self, year_stem: str) -> tuple:
+        return (WENCHANG_START[day_stem] + hour_branch) % 12
+
+    def _calculate_zuofu_position(self, year_stem: int, month_branch: int) -> int:
+        """计算左辅星位置（顺排，甲起0宫）"""
+        return (year_stem + month_branch) % 12
+
+    def _calculate_youbi_position(self, year_stem: int, month_branch: int) -> int:
+        """计算右弼星位置（逆排，甲起0宫）"""
+        return (-year_stem + month_branch) % 12
+
+    def _calculate_tiankui_tianyue(self, year_stem: int) -> tuple:
         """计算天魁天钺星位置（年干贵人）"""
-        tiankui_map = {"甲": 11, "乙": 10, "丙": 1, "丁": 0, "戊": 11,
-                       "己": 10, "庚": 5, "辛": 4, "壬": 3, "癸": 2}
-        tianyue_map = {"甲": 1, "乙": 0, "丙": 11, "丁": 10, "戊": 1,
-                       "己": 0, "庚": 7, "辛": 6, "壬": 5, "癸": 4}
-        return tiankui_map.get(year_stem, 0), tianyue_map.get(year_stem, 6)
+        return TIANKUI_PALACE[year_stem], TIANYUE_PALACE[year_stem]
+
+    def _calculate_luxun_position(self, day_stem: int, hour_branch: int) -> int:
+        """计算禄存星位置（日干禄位起，顺时针排至时支）"""
+        return (LUCUN_START[day_stem] + hour_branch) % 12
+
+    def _calculate_tianma_position(self, year_branch: int) -> int:
+        """计算天马星位置（年支三合局）"""
+        return TIANMA_PALACE[year_branch]
+
+    def _calculate_qingyang_position(self, lunar: LunarDate) -> int:
+        """计算擎羊星位置（年干禄位前一宫）"""
+        return (LUCUN_START[self._get_lunar_year_stem(lunar.year)] + 1) % 12
+
+    def _calculate_huoxing_position(self, lunar: LunarDate, hour_branch: int) -> int:
+        """计算火星位置（年支定起宫，顺时针排至时支）"""
+        year_branch = (lunar.year - 1900) % 12
+        return (HUOXING_START[year_branch] + hour_branch) % 12
+
+    def _calculate_lingxing_position(self, lunar: LunarDate, hour_branch: int) -> int:
+        """计算铃星位置（年支定起宫，顺时针排至时支）"""
+        year_branch = (lunar.year - 1900) % 12
+        return (LINGXING_START[year_branch] + hour_branch) % 12
+
+    def _calculate_dikong_position(self, hour_branch: int) -> int:
+        """计算地空星位置（亥宫起子时，逆时针排至时支）"""
+        return (11 - hour_branch) % 12
+
+    def _get_hour_branch(self, birth_time: datetime) -> int:
+        """出生时支编码（23-1点为子时）"""
+        return ((birth_time.hour + 1) // 2) % 12
 
     # === 五行局与大限计算优化 ===
-    def _calculate_wuxing_bureau(self, lunar: Lunar, major_stars: dict) -> str:
+    def _calculate_wuxing_bureau(self, lunar: LunarDate, major_stars: dict) -> str:
         """
         优化五行局计算：
         1. 结合年干支纳音五行
@@ -553,7 +456,7 @@ class ZiWeiCalculator:
         """
         # 1. 计算年干支纳音五行
         year_stem = self._get_lunar_year_stem(lunar.year)
-        year_branch = EARTHLY_BRANCHES[(lunar.year - 1900) % 12]
+        year_branch = (lunar.year - 1900) % 12
         nayin_wuxing = self._get_nayin_wuxing(year_stem, year_branch)
 
         # 2. 计算命宫主星五行
@@ -561,27 +464,17 @@ class ZiWeiCalculator:
         life_stars = major_stars[life_palace]
         star_wuxing = self._get_star_wuxing(life_stars)
 
-        # 3. 综合确定五行局
-        bureau_map = {
-            "水": "水二局", "木": "木三局", "金": "金四局",
-            "土": "土五局", "火": "火六局"
-        }
-
-        # 优先以纳音五行为主，命宫主星五行为辅
+        # 3. 综合确定五行局：优先以纳音五行为主，命宫主星五行为辅
         main_wuxing = nayin_wuxing
-        if not main_wuxing:
-            main_wuxing = star_wuxing
+        if main_wuxing is None:
+            main_wuxing = ELEMENT_CODES.get(star_wuxing)
 
-        return bureau_map.get(main_wuxing, "土五局")
+        return WUXING_BUREAUS[main_wuxing] if main_wuxing is not None else "土五局"
 
-    def _get_nayin_wuxing(self, stem: str, branch: str) -> str:
-        """获取年干支纳音五行（简化算法）"""
+    def _get_nayin_wuxing(self, stem: int, branch: int) -> int:
+        """获取年干支纳音五行编码（简化算法）"""
         # 实际应使用完整的纳音五行表
-        stem_idx = HEAVENLY_STEMS.index(stem)
-        branch_idx = EARTHLY_BRANCHES.index(branch)
-        nayin_index = (stem_idx * 12 + branch_idx) % 5
-        wuxing_list = ["金", "火", "木", "水", "土"]
-        return wuxing_list[nayin_index]
+        return nayin_element(stem, branch)
 
     def _get_star_wuxing(self, stars: list) -> str:
         """获取主星五行属性"""
@@ -596,153 +489,146 @@ class ZiWeiCalculator:
                 return star_wuxing_map[star]
         return ""
 
-
-def _calculate_major_limits(self, wuxing_bureau: str, life_palace: str,
-                            gender: str, lunar: Lunar) -> list:
-    """
-    精确大限计算：
-    1. 起限年龄根据五行局和出生日干
-    2. 大限宫位移动方向根据性别
-    3. 大限时长根据五行局
-    """
-    # 1. 计算起限年龄
-    start_age = self._calculate_limit_start_age(wuxing_bureau, lunar)
-
-    # 2. 确定大限宫位移动方向（男顺女逆）
-    direction = 1 if gender == "male" else -1
-
-    # 3. 确定大限时长（年）
-    duration_map = {
-        "水二局": 6, "木三局": 7, "金四局": 8,
-        "土五局": 9, "火六局": 10
-    }
-    duration = duration_map.get(wuxing_bureau, 9)
-
-    # 4. 计算大限宫位起始点
-    life_idx = ZIWEI_CONFIG["palaces"].index(life_palace)
-    current_idx = life_idx
-
-    # 5. 生成大限列表
-    major_limits = []
-    current_age = start_age
-
-    for i in range(12):
-        palace = ZIWEI_CONFIG["palaces"][current_idx]
-        major_limits.append({
-            "palace": palace,
-            "start_age": current_age,
-            "end_age": current_age + duration - 1,
+    def _calculate_major_limits(self, wuxing_bureau: str, life_palace: str,
+                                gender: str, lunar: LunarDate) -> list:
+        """
+        精确大限计算（逐宫序号与起始年龄走大运引擎 luck_pillars）：
+        1. 起限年龄根据五行局和出生日干
+        2. 大限宫位自命宫起，移动方向根据性别（男顺女逆）
+        3. 大限时长根据五行局
+        """
+        start_age = self._calculate_limit_start_age(wuxing_bureau, lunar)
+        forward = gender == "male"
+        duration = LIMIT_DURATIONS.get(wuxing_bureau, 9)
+
+        palaces = step_codes(PALACE_INDEX[life_palace], forward, 12, modulus=12, first=0)
+        ages = step_ages(start_age, 12, years=duration)
+        return [{
+            "palace": ZIWEI_CONFIG["palaces"][idx],
+            "start_age": int(age),
+            "end_age": int(age) + duration - 1,
             "duration": duration
-        })
-
-        current_age += duration
-        current_idx = (current_idx + direction) % 12
-
-    return major_limits
-
-
-def _calculate_limit_start_age(self, wuxing_bureau: str, lunar: Lunar) -> int:
-    """计算大限起限年龄（结合五行局和出生日干）"""
-    base_age_map = {
-        "水二局": 4, "木三局": 6, "金四局": 8,
-        "土五局": 10, "火六局": 12
-    }
-    base_age = base_age_map.get(wuxing_bureau, 10)
-
-    # 结合日干进一步调整
-    day_stem = self._get_lunar_day_stem(lunar)
-    stem_adj_map = {"甲": 0, "乙": 1, "丙": 2, "丁": 3, "戊": 4,
-                    "己": 0, "庚": 1, "辛": 2, "壬": 3, "癸": 4}
-    adj = stem_adj_map.get(day_stem, 0)
-
-    return base_age + adj
-
-
-# === 其他辅助方法 ===
-def _analyze_fortune_trend(self, major_stars: dict, minor_stars: dict, jd: float, wuxing_bureau: str) -> dict:
-    """
-    优化运势分析：
-    1. 结合主星和辅星吉凶
-    2. 考虑五行局与流年五行生克
-    3. 分析四化星影响
-    """
-    current_year = swe.revjul(jd)[0]
-    year_palace_idx = (current_year % 12)
-    year_palace = ZIWEI_CONFIG["palaces"][year_palace_idx]
-
-    # 1. 获取流年命宫主星
-    year_stars = major_stars.get(year_palace, [])
-
-    # 2. 获取流年命宫辅星
-    year_minor_stars = [star for star, loc in minor_stars.items()
-                        if loc == year_palace and star not in ["擎羊", "陀罗", "火星", "铃星", "地空", "地劫"]]
-    year_sha_stars = [star for star, loc in minor_stars.items()
-                if loc == year_palace and star in ["擎羊", "陀罗", "火星", "铃星", "地空", "地劫"]]
-
-    # 3. 计算流年五行
-    year_stem = HEAVENLY_STEMS[(current_year - 1900) % 10]
-    year_wuxing = WUXING_MAP.get(year_stem, "")
-    bureau_wuxing = wuxing_bureau[0]  # 五行局首字为五行属性
-
-    # 4. 分析五行生克
-    wuxing_relation = self._analyze_wuxing_relation(year_wuxing, bureau_wuxing)
-
-    # 5. 综合判断运势
-    fortune_level = self._determine_fortune_level(year_stars, year_minor_stars, year_sha_stars, wuxing_relation)
-
-    # 6. 生成详细分析
-    analysis = self._generate_fortune_analysis(current_year, year_palace, year_stars,
-                                               year_minor_stars, year_sha_stars, wuxing_relation, fortune_level)
-
-    return {
-        "year": current_year,
-        "year_palace": year_palace,
-        "year_stars": year_stars,
-        "year_minor_stars": year_minor_stars,
-        "year_sha_stars": year_sha_stars,
-        "wuxing_relation": wuxing_relation,
-        "fortune_level": fortune_level,
-        "analysis": analysis
-    }
-
-
-def _analyze_wuxing_relation(self, year_wuxing: str, bureau_wuxing: str) -> str:
-    """分析流年五行与五行局的生克关系"""
-    if not year_wuxing or not bureau_wuxing:
-        return "平"
-
-    wuxing_relations = {
-        "木": {"生": "火", "克": "土", "被生": "水", "被克": "金"},
-        "火": {"生": "土", "克": "金", "被生": "木", "被克": "水"},
-        "土": {"生": "金", "克": "水", "被生": "火", "被克": "木"},
-        "金": {"生": "水", "克": "木", "被生": "土", "被克": "火"},
-        "水": {"生": "木", "克": "火", "被生": "金", "被克": "土"}
-    }
-
-    if year_wuxing == bureau_wuxing:
-        return "比和"  # 五行相同
-
-    if wuxing_relations[year_wuxing]["生"] == bureau_wuxing:
-        return "相生"  # 流年五行生五行局
-
-    if wuxing_relations[year_wuxing]["克"] == bureau_wuxing:
-        return "相克"  # 流年五行克五行局
-
-    if wuxing_relations[bureau_wuxing]["生"] == year_wuxing:
-        return "被生"  # 五行局生流年五行
-
-    if wuxing_relations[bureau_wuxing]["克"] == year_wuxing:
-        return "被克"  # 五行局克流年五行
-
-    return "平"
+        } for idx, age in zip(palaces, ages)]
+
+    def _calculate_limit_start_age(self, wuxing_bureau: str, lunar: LunarDate) -> int:
+        """计算大限起限年龄（结合五行局和出生日干：甲己0、乙庚1、丙辛2、丁壬3、戊癸4）"""
+        return LIMIT_START_AGES.get(wuxing_bureau, 10) + self._get_lunar_day_stem(lunar) % 5
+
+    # === 命盘图 ===
+    def _generate_chart(self, life_palace: str, major_stars: dict, minor_stars: dict,
+                        body_palace: str = "") -> dict:
+        """紧凑JSON命盘图（宫位布局为固定模板，只记录各宫星曜掩码）"""
+        return ziwei_chart.build_chart(life_palace, body_palace, major_stars, minor_stars)
+
+    def render_chart(self, chart: dict, fmt: str = "svg"):
+        """命盘图输出：svg 为SVG文本（按命盘缓存），json 为紧凑JSON"""
+        if fmt == "svg":
+            return ziwei_chart.render_svg(chart)
+        if fmt == "json":
+            return chart
+        raise ValueError(f"不支持的命盘图格式: {fmt}")
+
+    # === 流年运势 ===
+    def project_annual_fortune(self, chart: dict, start_year: int, end_year: int) -> List[dict]:
+        """
+        流年运势投影：chart 为 calculate 的返回结果，按年返回 start_year 至 end_year（含）的
+        流年命宫、宫内星曜、流年五行与五行局关系及运势等级。
+        命盘只解析一次为十二宫的静态星曜与分值；流年命宫随年支（12年一轮）、
+        流年五行随年干（10年一轮）变化，每年只组合这两项增量。
+        """
+        if end_year < start_year:
+            raise ValueError(f"流年范围无效: {start_year}-{end_year}")
+
+        palaces = self._palace_profiles(chart["stars"]["major_stars"], chart["stars"]["minor_stars"])
+        bureau_wuxing = chart["wuxing_bureau"][0]  # 五行局首字为五行属性
+        # 年干 → (流年五行, 与五行局关系)
+        stem_relations = []
+        for stem in range(10):
+            year_wuxing = ELEMENTS[STEM_ELEMENT[stem]]
+            stem_relations.append((year_wuxing, self._analyze_wuxing_relation(year_wuxing, bureau_wuxing)))
+
+        projection = []
+        for year in range(start_year, end_year + 1):
+            palace_idx = year % 12
+            palace, year_stars, year_minor_stars, year_sha_stars, star_score = palaces[palace_idx]
+            year_wuxing, wuxing_relation = stem_relations[(year - 1900) % 10]
+            score = star_score + WUXING_RELATION_SCORES[wuxing_relation]
+            fortune_level = self._determine_fortune_level(score)
+            projection.append({
+                "year": year,
+                "year_palace": palace,
+                "year_stars": list(year_stars),
+                "year_minor_stars": list(year_minor_stars),
+                "year_sha_stars": list(year_sha_stars),
+                "year_wuxing": year_wuxing,
+                "wuxing_relation": wuxing_relation,
+                "score": score,
+                "fortune_level": fortune_level,
+                "analysis": self._generate_fortune_analysis(year, palace, year_stars, year_sha_stars,
+                                                            wuxing_relation, fortune_level)
+            })
+        return projection
+
+    def _palace_profiles(self, major_stars: dict, minor_stars: dict) -> list:
+        """十二宫的 (宫位, 主星, 吉辅星, 煞星, 星曜分值)，与流年无关"""
+        profiles = []
+        for palace in ZIWEI_CONFIG["palaces"]:
+            stars = tuple(star for star in major_stars.get(palace, []) if star != "空宫")
+            minors = tuple(star for star, loc in minor_stars.items() if loc == palace and star not in SHA_STARS)
+            shas = tuple(star for star, loc in minor_stars.items() if loc == palace and star in SHA_STARS)
+            score = sum(star in AUSPICIOUS_STARS for star in stars + minors) - len(shas)
+            profiles.append((palace, stars, minors, shas, score))
+        return profiles
+
+    def _determine_fortune_level(self, score: int) -> str:
+        """流年分值 → 运势等级"""
+        for threshold, level in FORTUNE_LEVELS:
+            if score >= threshold:
+                return level
+        return LOWEST_FORTUNE_LEVEL
+
+    def _generate_fortune_analysis(self, year: int, palace: str, stars: tuple, sha_stars: tuple,
+                                   wuxing_relation: str, fortune_level: str) -> str:
+        star_text = "、".join(stars) if stars else "无主星"
+        sha_text = f"，逢{'、'.join(sha_stars)}需谨慎" if sha_stars else ""
+        return (f"{year}年流年命宫在{palace}，{star_text}坐守{sha_text}；"
+                f"流年五行与五行局{wuxing_relation}，整体运势{fortune_level}。")
+
+    def _analyze_fortune_trend(self, major_stars: dict, minor_stars: dict, jd: float, wuxing_bureau: str) -> dict:
+        """命盘儒略日所在年份的流年运势"""
+        current_year = swe.revjul(jd)[0]
+        chart = {"stars": {"major_stars": major_stars, "minor_stars": minor_stars}, "wuxing_bureau": wuxing_bureau}
+        return self.project_annual_fortune(chart, current_year, current_year)[0]
+
+    def _analyze_wuxing_relation(self, year_wuxing: str, bureau_wuxing: str) -> str:
+        """分析流年五行与五行局的生克关系"""
+        if not year_wuxing or not bureau_wuxing:
+            return "平"
+
+        return ELEMENT_RELATION[ELEMENT_CODES[year_wuxing]][ELEMENT_CODES[bureau_wuxing]]
+
+@lru_cache(maxsize=None)
+def get_ziwei_calculator() -> ZiWeiCalculator:
+    """进程级紫微斗数计算器（星历表只需初始化一次）"""
+    return ZiWeiCalculator()
+
+
+def calculate(input_data: dict) -> dict:
+    """算法模块单条入口：input_data 为 {"birth_data": ..., "location_data": ...}"""
+    return get_ziwei_calculator().calculate(input_data["birth_data"], input_data["location_data"])
+
+
+def calculate_batch(inputs: List[dict]) -> List[dict]:
+    """算法模块批量入口：整批预取星历后逐张排盘，与逐条调用 calculate 的结果相同"""
+    return get_ziwei_calculator().calculate_cohort(inputs)
 
 
 # 使用示例（优化输出格式）
 if __name__ == "__main__":
     print("紫微斗数计算系统 - 启动 (优化版)")
 
-    # 创建计算器（自动更新星历表）
-    calculator = ZiWeiCalculator(auto_update_ephe=True)
+    # 创建计算器（使用离线星历表存储）
+    calculator = ZiWeiCalculator()
 
     # 示例输入数据（增加时区）
     birth_data = {
@@ -786,6 +672,8 @@ if __name__ == "__main__":
 
         print("\n=== 命盘图 ===")
         print(result["chart"])
+        with open("ziwei_chart.svg", "w", encoding="utf-8") as f:
+            f.write(calculator.render_chart(result["chart"]))
 
         # 保存完整结果
         with open("ziwei_result.json", "w", encoding="utf-8") as f:
@@ -0,0 +1,144 @@
+"""
+紫微斗数命盘图渲染模块
+十二宫按地支固定排布在4×4方格外圈（巳午未申在上、寅丑子亥在下），宫位框、宫名、地支等
+静态部分只生成一次模板，渲染时只填入各宫星曜与命宫/身宫标记。
+
+命盘图以紧凑JSON表示：各宫主星、辅星位掩码（第i位对应 MAJOR_STAR_ORDER / MINOR_STAR_ORDER[i]）
+与命宫、身宫序号，并附内容哈希（用作HTTP ETag）；SVG按命盘内容缓存，同一命盘重复请求不再重新渲染。
+"""
+
+import hashlib
+import json
+from functools import lru_cache
+from html import escape
+from typing import Dict, Any, List, Tuple
+
+from src.domain.fortune.algorithms.ganzhi import EARTHLY_BRANCHES
+from src.domain.fortune.algorithms.ziwei_tables import PALACES, MAJOR_STAR_ORDER, mask_stars
+
+CHART_LAYOUT_VERSION = 1
+
+MINOR_STAR_ORDER: Tuple[str, ...] = ("文昌", "文曲", "左辅", "右弼", "天魁", "天钺",
+                                     "禄存", "天马", "擎羊", "陀罗", "火星", "铃星",
+                                     "地空", "地劫")
+
+# 宫位序号（与地支编码相同）→ 4×4方格中的 (列, 行)
+PALACE_CELLS: Tuple[Tuple[int, int], ...] = (
+    (2, 3), (1, 3), (0, 3), (0, 2), (0, 1), (0, 0),  # 子丑寅卯辰巳
+    (1, 0), (2, 0), (3, 0), (3, 1), (3, 2), (3, 3)  # 午未申酉戌亥
+)
+
+CELL_WIDTH = 150
+CELL_HEIGHT = 120
+LINE_HEIGHT = 16
+SVG_RENDER_CACHE_SIZE = 4096
+
+_MINOR_BITS = {star: i for i, star in enumerate(MINOR_STAR_ORDER)}
+_MAJOR_BITS = {star: i for i, star in enumerate(MAJOR_STAR_ORDER)}
+
+
+def chart_masks(major_stars: Dict[str, List[str]], minor_stars: Dict[str, str]) -> Tuple[List[int], List[int]]:
+    """排盘结果 → 各宫主星、辅星位掩码（按 PALACES 顺序）"""
+    palace_index = {palace: i for i, palace in enumerate(PALACES)}
+    major = [0] * 12
+    minor = [0] * 12
+    for palace, stars in major_stars.items():
+        for star in stars:
+            if star in _MAJOR_BITS:
+                major[palace_index[palace]] |= 1 << _MAJOR_BITS[star]
+    for star, palace in minor_stars.items():
+        if palace in palace_index and star in _MINOR_BITS:
+            minor[palace_index[palace]] |= 1 << _MINOR_BITS[star]
+    return major, minor
+
+
+def build_chart(life_palace: str, body_palace: str,
+                major_stars: Dict[str, List[str]], minor_stars: Dict[str, str]) -> Dict[str, Any]:
+    """紧凑JSON命盘图"""
+    major, minor = chart_masks(major_stars, minor_stars)
+    chart = {
+        "layout": CHART_LAYOUT_VERSION,
+        "life": PALACES.index(life_palace),
+        "body": PALACES.index(body_palace) if body_palace in PALACES else -1,
+        "major": major,
+        "minor": minor
+    }
+    chart["hash"] = chart_hash(chart)
+    return chart
+
+
+def chart_hash(chart: Dict[str, Any]) -> str:
+    """命盘图内容哈希（不含hash字段本身），用作HTTP ETag 与客户端缓存键"""
+    payload = json.dumps([chart["layout"], chart["life"], chart["body"], chart["major"], chart["minor"]],
+                         separators=(",", ":"))
+    return hashlib.sha1(payload.encode("ascii")).hexdigest()[:16]
+
+
+def chart_legend() -> Dict[str, Any]:
+    """紧凑JSON的解码表（前端缓存一次即可）"""
+    return {
+        "layout": CHART_LAYOUT_VERSION,
+        "palaces": list(PALACES),
+        "branches": list(EARTHLY_BRANCHES),
+        "major_stars": list(MAJOR_STAR_ORDER),
+        "minor_stars": list(MINOR_STAR_ORDER),
+        "cells": [list(cell) for cell in PALACE_CELLS]
+    }
+
+
+@lru_cache(maxsize=None)
+def _svg_template() -> Tuple[str, Tuple[Tuple[str, str], ...], str]:
+    """SVG静态部分：(开头, 十二宫 (宫框前半, 宫框后半与标签), 结尾)，两段之间填入命宫/身宫样式"""
+    width, height = CELL_WIDTH * 4, CELL_HEIGHT * 4
+    head = (f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {width} {height}" '
+            f'width="{width}" height="{height}" font-family="sans-serif" font-size="13">'
+            '<style>.cell{fill:#fff;stroke:#333}.life{fill:#fff4e0}.body{fill:#eef6ff}'
+            '.major{fill:#b22222;font-weight:bold}.minor{fill:#333}.label{fill:#666;font-size:12px}</style>'
+            f'<rect x="{CELL_WIDTH}" y="{CELL_HEIGHT}" width="{CELL_WIDTH * 2}" height="{CELL_HEIGHT * 2}" '
+            'class="cell"/>')
+    cells = []
+    for i, (col, row) in enumerate(PALACE_CELLS):
+        x, y = col * CELL_WIDTH, row * CELL_HEIGHT
+        cells.append((
+            f'<g transform="translate({x},{y})">'
+            f'<rect width="{CELL_WIDTH}" height="{CELL_HEIGHT}" class="cell',
+            f'"/><text x="{CELL_WIDTH - 6}" y="{CELL_HEIGHT - 8}" text-anchor="end" class="label">'
+            f'{escape(PALACES[i])}·{escape(EARTHLY_BRANCHES[i])}</text>'
+        ))
+    return head, tuple(cells), "</svg>"
+
+
+def _star_lines(stars: Tuple[str, ...], css: str, first_line: int) -> str:
+    return "".join(f'<text x="6" y="{(first_line + k) * LINE_HEIGHT}" class="{css}">{star}</text>'
+                   for k, star in enumerate(stars))
+
+
+@lru_cache(maxsize=SVG_RENDER_CACHE_SIZE)
+def _render_svg(life: int, body: int, major: Tuple[int, ...], minor: Tuple[int, ...]) -> str:
+    head, cells, tail = _svg_template()
+    parts = [head]
+    for i, (cell_start, cell_end) in enumerate(cells):
+        cls = " life" if i == life else (" body" if i == body else "")
+        major_stars = mask_stars(major[i])
+        minor_stars = _minor_stars(minor[i])
+        parts += [cell_start, cls, cell_end]
+        parts.append(_star_lines(major_stars, "major", 1))
+        parts.append(_star_lines(minor_stars, "minor", len(major_stars) + 1))
+        parts.append("</g>")
+    parts.append(tail)
+    return "".join(parts)
+
+
+@lru_cache(maxsize=4096)
+def _minor_stars(mask: int) -> Tuple[str, ...]:
+    return tuple(star for i, star in enumerate(MINOR_STAR_ORDER) if mask >> i & 1)
+
+
+def render_svg(chart: Dict[str, Any]) -> str:
+    """紧凑JSON命盘图渲染为SVG（同一命盘命中渲染缓存）"""
+    return _render_svg(chart["life"], chart["body"], tuple(chart["major"]), tuple(chart["minor"]))
+
+
+def render_cache_info() -> Dict[str, int]:
+    info = _render_svg.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "size": info.currsize, "max_size": info.maxsize}
@@ -0,0 +1,165 @@
+"""
+紫微斗数安星表模块
+除太阳、太阴外，十四主星只取决于年干、月支与命宫，文昌文曲取决于日干与时支，
+左辅右弼、天魁天钺取决于年干与月支。这些组合空间很小，离线按 ZiWeiCalculator
+的安星规则生成uint8宫位表，排盘时直接查表。
+宫位内星曜以12个uint16位掩码表示（第i位对应 MAJOR_STAR_ORDER[i]），不再逐次构建字典列表。
+
+重新生成安星表：
+    python -m src.domain.fortune.algorithms.ziwei_tables
+"""
+
+import os
+import logging
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+PLACEMENT_TABLE_VERSION = "v1"
+TABLE_PATH = os.path.join(os.path.dirname(__file__), "data",
+                          f"ziwei_placements_{PLACEMENT_TABLE_VERSION}.npz")
+
+PALACES: Tuple[str, ...] = ("命宫", "兄弟", "夫妻", "子女", "财帛", "疾厄",
+                            "迁移", "交友", "事业", "田宅", "福德", "父母")
+
+# 主星位序（与原排盘逐颗追加的顺序一致，决定宫内星曜的输出顺序）
+MAJOR_STAR_ORDER: Tuple[str, ...] = ("紫微", "天府", "太阳", "太阴", "天机", "武曲", "天同",
+                                     "廉贞", "贪狼", "巨门", "天相", "天梁", "七杀", "破军")
+SUN_BIT = MAJOR_STAR_ORDER.index("太阳")
+MOON_BIT = MAJOR_STAR_ORDER.index("太阴")
+# 查表安置的主星（除太阳、太阴外的12颗）
+TABLE_MAJOR_STARS: Tuple[str, ...] = tuple(s for s in MAJOR_STAR_ORDER if s not in ("太阳", "太阴"))
+_TABLE_MAJOR_BITS = np.array([MAJOR_STAR_ORDER.index(s) for s in TABLE_MAJOR_STARS], dtype=np.uint16)
+
+# 查表安置的辅星
+HOUR_STARS: Tuple[str, ...] = ("文昌", "文曲")  # 日干 × 时支
+MONTH_STARS: Tuple[str, ...] = ("左辅", "右弼", "天魁", "天钺")  # 年干 × 月支
+
+
+def build_placement_tables() -> Dict[str, np.ndarray]:
+    """
+    按 ZiWeiCalculator 的安星规则生成宫位表：
+    major[年干, 月支, 命宫] → TABLE_MAJOR_STARS 各星宫位
+    hour[日干, 时支] → HOUR_STARS 各星宫位
+    month[年干, 月支] → MONTH_STARS 各星宫位
+    """
+    from src.domain.fortune.algorithms.ziwei import ZiWeiCalculator
+
+    # 安星规则方法不依赖实例状态，无需初始化星历
+    rules = object.__new__(ZiWeiCalculator)
+    major = np.zeros((10, 12, 12, len(TABLE_MAJOR_STARS)), dtype=np.uint8)
+    hour = np.zeros((10, 12, len(HOUR_STARS)), dtype=np.uint8)
+    month = np.zeros((10, 12, len(MONTH_STARS)), dtype=np.uint8)
+
+    for stem in range(10):
+        for branch in range(12):
+            ziwei = rules._calculate_ziwei_position(stem, branch)
+            tianfu = (ziwei + 4) % 12
+            tanlang = rules._calculate_tanlang_position(ziwei, branch)
+            qisha = (ziwei + 6) % 12
+            for life in range(12):
+                tiantong = (life + 7) % 12
+                positions = {
+                    "紫微": ziwei, "天府": tianfu,
+                    "天机": (life + 2) % 12, "武曲": (life + 5) % 12,
+                    "天同": tiantong, "廉贞": tiantong,
+                    "贪狼": tanlang, "巨门": (tanlang + 1) % 12,
+                    "天相": (tianfu + 1) % 12, "天梁": (tianfu + 2) % 12,
+                    "七杀": qisha, "破军": (qisha + 1) % 12
+                }
+                major[stem, branch, life] = [positions[s] for s in TABLE_MAJOR_STARS]
+
+            wenchang = rules._calculate_wenchang_position(stem, branch)
+            hour[stem, branch] = [wenchang, (wenchang + 2) % 12]
+            tiankui, tianyue = rules._calculate_tiankui_tianyue(stem)
+            month[stem, branch] = [rules._calculate_zuofu_position(stem, branch),
+                                   rules._calculate_youbi_position(stem, branch), tiankui, tianyue]
+
+    return {"major": major, "hour": hour, "month": month}
+
+
+def save_placement_tables(path: str = TABLE_PATH) -> None:
+    tables = build_placement_tables()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    np.savez_compressed(path, version=PLACEMENT_TABLE_VERSION, **tables)
+    logger.info(f"安星表已生成: {path}")
+
+
+def _load_tables(path: str = TABLE_PATH) -> Dict[str, np.ndarray]:
+    """加载安星表，文件缺失或版本不符时按规则现场生成"""
+    try:
+        with np.load(path) as data:
+            if str(data["version"]) == PLACEMENT_TABLE_VERSION:
+                return {name: data[name] for name in ("major", "hour", "month")}
+            logger.warning(f"安星表版本不匹配: {data['version']}，按规则重新生成")
+    except (OSError, KeyError) as e:
+        logger.warning(f"安星表加载失败: {e}，按规则重新生成")
+    return build_placement_tables()
+
+
+@lru_cache(maxsize=None)
+def _tables() -> Dict[str, np.ndarray]:
+    tables = _load_tables()
+    # 主星宫位表展开为宫位掩码表：major_masks[年干, 月支, 命宫, 宫位]
+    major = tables["major"].astype(np.intp)
+    masks = np.zeros((10, 12, 12, 12), dtype=np.uint16)
+    for k, bit in enumerate(_TABLE_MAJOR_BITS.tolist()):
+        np.bitwise_or.at(masks, (*np.indices((10, 12, 12)), major[..., k]), np.uint16(1 << bit))
+    tables["major_masks"] = masks
+    for table in tables.values():
+        table.setflags(write=False)
+    return tables
+
+
+@lru_cache(maxsize=None)
+def _scalar_tables() -> Dict[str, tuple]:
+    """单张排盘用的嵌套元组表（避免NumPy标量索引开销）"""
+    tables = _tables()
+    return {name: tables[name].tolist() for name in ("major_masks", "hour", "month")}
+
+
+def major_star_masks(year_stem: int, month_branch: int, life_palace: int,
+                     sun_palace: int, moon_palace: int) -> List[int]:
+    """十四主星的12宫位掩码，第i位对应 MAJOR_STAR_ORDER[i]"""
+    masks = list(_scalar_tables()["major_masks"][year_stem][month_branch][life_palace])
+    masks[sun_palace] |= 1 << SUN_BIT
+    masks[moon_palace] |= 1 << MOON_BIT
+    return masks
+
+
+def major_star_masks_array(year_stems, month_branches, life_palaces, sun_palaces, moon_palaces) -> np.ndarray:
+    """向量化主星宫位掩码，参数为长度n的编码数组，返回 (n, 12) uint16"""
+    masks = _tables()["major_masks"][year_stems, month_branches, life_palaces]
+    rows = np.arange(len(masks))
+    masks[rows, sun_palaces] |= np.uint16(1 << SUN_BIT)
+    masks[rows, moon_palaces] |= np.uint16(1 << MOON_BIT)
+    return masks
+
+
+def hour_star_palaces(day_stem: int, hour_branch: int) -> List[int]:
+    """文昌、文曲宫位"""
+    return _scalar_tables()["hour"][day_stem][hour_branch]
+
+
+def month_star_palaces(year_stem: int, month_branch: int) -> List[int]:
+    """左辅、右弼、天魁、天钺宫位"""
+    return _scalar_tables()["month"][year_stem][month_branch]
+
+
+@lru_cache(maxsize=4096)
+def mask_stars(mask: int) -> Tuple[str, ...]:
+    """掩码 → 宫内星曜（按 MAJOR_STAR_ORDER 顺序）"""
+    return tuple(star for i, star in enumerate(MAJOR_STAR_ORDER) if mask >> i & 1)
+
+
+def masks_to_palaces(masks: List[int]) -> Dict[str, List[str]]:
+    """宫位掩码还原为 {宫位: [星曜]}，无主星的宫位为 ["空宫"]"""
+    return {palace: list(mask_stars(mask)) or ["空宫"] for palace, mask in zip(PALACES, masks)}
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    save_placement_tables()
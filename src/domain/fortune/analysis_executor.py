@@ -0,0 +1,234 @@
+# src/domain/fortune/analysis_executor.py
+"""
+命理分析并行执行器
+calculate_fortune_analysis 中的八字、紫微斗数等分析相互独立，由执行器并行分派，
+整体耗时接近最慢的一项而不是各项之和。执行模式：
+
+- process：CPU密集的分析类型（CPU_BOUND_TYPES，八字/紫微排盘）在有界进程池中计算，
+  其他类型在计算线程中计算（默认；每个Web工作进程会再启动一组spawn子进程，占用内存并有冷启动开销）
+- thread：全部在计算线程中计算。八字/紫微排盘以纯Python为主，计算期间持有GIL，
+  多项分析在线程中并不能同时占用多个CPU，只适合单核部署或释放GIL的算法
+- serial：按顺序逐项计算（便于调试）
+
+每种分析类型有独立的超时时间，所有模式下均生效；任一分析失败或超时时，尚未开始的其他分析被取消。
+线程无法被强制终止，线程中超时的计算仍会在后台执行完毕，调用方按时收到超时异常。
+执行模式与进程池大小可通过环境变量 FORTUNE_ANALYSIS_MODE、FORTUNE_ANALYSIS_WORKERS 配置。
+"""
+
+import importlib
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, Callable, Optional, List, Union, Iterable
+import logging
+
+from src.domain.core.exceptions import AlgorithmTimeoutError
+
+logger = logging.getLogger(__name__)
+
+EXECUTION_MODES = ("process", "thread", "serial")
+
+# 各分析类型的超时时间（秒）
+DEFAULT_TIMEOUTS = {
+    "bazi": 5.0,
+    "ziwei": 10.0
+}
+DEFAULT_TIMEOUT = 10.0
+
+# 纯Python计算为主、受GIL限制的分析类型，process 模式下进入进程池
+CPU_BOUND_TYPES = ("bazi", "ziwei")
+
+
+def _init_worker() -> None:
+    """工作进程启动时预热节气表、干支查找表与星历，首个请求不承担冷启动开销"""
+    from src.domain.fortune.algorithm_registry import _warm_builtin_tables
+
+    try:
+        _warm_builtin_tables()
+    except Exception as e:
+        logger.warning(f"Analysis worker warm-up failed: {e}")
+
+
+def _calculate_in_worker(module_name: str, input_data: Dict[str, Any]) -> Dict[str, Any]:
+    """在工作进程中导入算法模块（每个进程只导入一次）并计算"""
+    return importlib.import_module(module_name).calculate(input_data)
+
+
+def _calculate_or_error(module_name: str, input_data: Dict[str, Any]) -> Union[Dict[str, Any], Exception]:
+    """批量计算中单条失败不影响其他记录，异常作为结果返回"""
+    try:
+        return _calculate_in_worker(module_name, input_data)
+    except Exception as e:
+        # 异常对象在进程间传递时未必可序列化，统一转换为ValueError
+        return ValueError(str(e))
+
+
+class AnalysisExecutor:
+    """分析类型的并行分派与超时控制"""
+
+    def __init__(self,
+                 mode: str = "process",
+                 max_workers: Optional[int] = None,
+                 timeouts: Optional[Dict[str, float]] = None,
+                 default_timeout: float = DEFAULT_TIMEOUT,
+                 process_types: Iterable[str] = CPU_BOUND_TYPES):
+        if mode not in EXECUTION_MODES:
+            raise ValueError(f"Unknown analysis execution mode: {mode}")
+        self.mode = mode
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.timeouts = {**DEFAULT_TIMEOUTS, **(timeouts or {})}
+        self.default_timeout = default_timeout
+        self.process_types = frozenset(process_types)
+        self._dispatch_pool: Optional[ThreadPoolExecutor] = None
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def timeout_for(self, analysis_type: str) -> float:
+        return self.timeouts.get(analysis_type, self.default_timeout)
+
+    def calculate(self, analysis_type: str, algorithm: Any, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """执行单个算法模块的 calculate 并等待至超时，CPU密集类型在进程模式下进入进程池"""
+        if self.mode != "process" or analysis_type not in self.process_types:
+            future = self._get_thread_pool().submit(algorithm.calculate, input_data)
+            return self._wait(analysis_type, future, time.monotonic())
+
+        pool = self._get_process_pool()
+        try:
+            future = pool.submit(_calculate_in_worker, algorithm.__name__, input_data)
+        except BrokenProcessPool:
+            # 工作进程异常退出后进程池不可再用，重建后重试一次
+            self._reset_process_pool(pool)
+            future = self._get_process_pool().submit(_calculate_in_worker, algorithm.__name__, input_data)
+
+        try:
+            return self._wait(analysis_type, future, time.monotonic())
+        except BrokenProcessPool:
+            self._reset_process_pool(pool)
+            raise
+
+    def calculate_many(self, analysis_type: str, algorithm: Any,
+                       inputs: List[Dict[str, Any]]) -> List[Union[Dict[str, Any], Exception]]:
+        """
+        批量计算，返回与输入一一对应的结果，计算失败的记录对应异常对象。
+        算法模块提供 calculate_batch 时整批向量化计算（整批失败再逐条回退），
+        否则CPU密集类型在进程模式下分块分派到进程池，其他情况逐条计算。批量计算不设单条超时。
+        """
+        calculate_batch = getattr(algorithm, "calculate_batch", None)
+        if calculate_batch is not None:
+            try:
+                return list(calculate_batch(inputs))
+            except Exception as e:
+                logger.warning(f"Batch {analysis_type} calculation failed, falling back per record: {e}")
+
+        if self.mode != "process" or analysis_type not in self.process_types:
+            results = []
+            for data in inputs:
+                try:
+                    results.append(algorithm.calculate(data))
+                except Exception as e:
+                    results.append(e)
+            return results
+
+        chunksize = max(1, len(inputs) // (self.max_workers * 4))
+        pool = self._get_process_pool()
+        try:
+            return list(pool.map(_calculate_or_error, [algorithm.__name__] * len(inputs), inputs,
+                                 chunksize=chunksize))
+        except BrokenProcessPool:
+            self._reset_process_pool(pool)
+            raise
+
+    def gather(self, tasks: Dict[str, Callable[[], Any]]) -> Dict[str, Any]:
+        """
+        并行执行各分析类型的任务并按类型返回结果。
+        任一任务失败或超过其超时时间时，取消其余尚未开始的任务并抛出异常。
+        serial 模式下逐项分派并等待，同样受各自的超时时间限制。
+        """
+        pool = self._get_dispatch_pool()
+        if self.mode == "serial":
+            return {analysis_type: self._wait(analysis_type, pool.submit(task), time.monotonic())
+                    for analysis_type, task in tasks.items()}
+
+        started = time.monotonic()
+        futures: Dict[str, Future] = {t: pool.submit(task) for t, task in tasks.items()}
+        results = {}
+        try:
+            # 按超时时间从短到长等待，每项的截止时间均从分派时刻起算
+            for analysis_type in sorted(futures, key=self.timeout_for):
+                results[analysis_type] = self._wait(analysis_type, futures[analysis_type], started)
+        except Exception:
+            for future in futures.values():
+                future.cancel()
+            raise
+        return results
+
+    def _wait(self, analysis_type: str, future: Future, started: float) -> Any:
+        """等待结果至该分析类型的截止时间（从 started 起算），超时时取消尚未开始的计算"""
+        timeout = self.timeout_for(analysis_type)
+        try:
+            return future.result(timeout=max(0.0, started + timeout - time.monotonic()))
+        except FutureTimeoutError:
+            future.cancel()
+            raise AlgorithmTimeoutError(analysis_type, timeout)
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            if self._dispatch_pool is not None:
+                self._dispatch_pool.shutdown(wait=wait, cancel_futures=True)
+                self._dispatch_pool = None
+            if self._thread_pool is not None:
+                self._thread_pool.shutdown(wait=wait, cancel_futures=True)
+                self._thread_pool = None
+            if self._process_pool is not None:
+                self._process_pool.shutdown(wait=wait, cancel_futures=True)
+                self._process_pool = None
+
+    def _get_dispatch_pool(self) -> ThreadPoolExecutor:
+        if self._dispatch_pool is None:
+            with self._lock:
+                if self._dispatch_pool is None:
+                    # 每个请求占用的分派线程数等于分析类型数，分派线程只等待计算结果
+                    self._dispatch_pool = ThreadPoolExecutor(max_workers=self.max_workers * 4,
+                                                             thread_name_prefix="fortune-analysis")
+        return self._dispatch_pool
+
+    def _get_thread_pool(self) -> ThreadPoolExecutor:
+        if self._thread_pool is None:
+            with self._lock:
+                if self._thread_pool is None:
+                    # 计算线程与分派线程分开，分派线程等待计算线程时不会因同一线程池占满而互相等待
+                    self._thread_pool = ThreadPoolExecutor(max_workers=self.max_workers * 4,
+                                                           thread_name_prefix="fortune-calculate")
+        return self._thread_pool
+
+    def _get_process_pool(self) -> ProcessPoolExecutor:
+        if self._process_pool is None:
+            with self._lock:
+                if self._process_pool is None:
+                    # Web工作进程为多线程环境，使用spawn启动子进程，避免fork继承锁状态
+                    self._process_pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                             mp_context=multiprocessing.get_context("spawn"),
+                                                             initializer=_init_worker)
+        return self._process_pool
+
+    def _reset_process_pool(self, broken: ProcessPoolExecutor) -> None:
+        with self._lock:
+            if self._process_pool is broken:
+                self._process_pool = None
+        broken.shutdown(wait=False, cancel_futures=True)
+        logger.error("Analysis process pool broken, recreated on next use")
+
+
+def _executor_from_env() -> AnalysisExecutor:
+    workers = os.environ.get("FORTUNE_ANALYSIS_WORKERS")
+    return AnalysisExecutor(mode=os.environ.get("FORTUNE_ANALYSIS_MODE", "process"),
+                            max_workers=int(workers) if workers else None)
+
+
+# 进程级执行器，所有 FortuneCalculationService 实例共享同一组进程池
+analysis_executor = _executor_from_env()
@@ -0,0 +1,190 @@
+# src/domain/fortune/chart_cache.py
+"""
+命盘结果缓存
+命盘计算结果只取决于出生信息、算法版本和常量表，按三者的规范化哈希缓存：
+进程内LRU（cache_manager.MemoryBackend）为一级缓存，共享缓存（如Redis，需提供get/set/delete）为二级缓存。
+停用某算法版本时显式失效该版本的全部缓存。
+"""
+
+import copy
+import datetime
+import hashlib
+import json
+import threading
+import time
+import uuid
+from typing import Dict, Any, Optional, Callable, Tuple
+import logging
+
+from src.config.loader import CONSTANTS_DIGEST
+from src.infrastructure.utils.cache_manager import MemoryBackend
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_birth_input(birth_data: Dict[str, Any]) -> Dict[str, Any]:
+    """规范化出生信息：统一时间格式、坐标精度，去除空值"""
+    normalized = {}
+    for key, value in birth_data.items():
+        if value is None or value == {} or value == "":
+            continue
+        if key == "birth_datetime" and isinstance(value, str):
+            value = datetime.datetime.fromisoformat(value.strip()).isoformat()
+        elif isinstance(value, dict):
+            value = normalize_birth_input(value)
+        elif isinstance(value, float):
+            # 经纬度保留6位小数（约0.1米），避免浮点表示差异导致键不同
+            value = round(value, 6)
+        elif isinstance(value, str):
+            value = value.strip()
+        normalized[key] = value
+    return normalized
+
+
+def chart_key(algorithm_type: str, version: str, birth_input: Dict[str, Any],
+              constants_digest: str = CONSTANTS_DIGEST) -> str:
+    """命盘缓存键：算法类型、版本、常量摘要与规范化出生信息的SHA-256"""
+    payload = json.dumps({
+        "type": algorithm_type,
+        "version": version,
+        "constants": constants_digest,
+        "input": normalize_birth_input(birth_input)
+    }, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ChartCache:
+    """两级命盘结果缓存"""
+
+    def __init__(self,
+                 shared_cache: Optional[Any] = None,
+                 max_entries: int = 10000,
+                 local_ttl: int = 300,
+                 shared_ttl: int = 86400,
+                 key_prefix: str = "fortune_chart:"):
+        self.shared_cache = shared_cache
+        self.max_entries = max_entries
+        self.local_ttl = local_ttl  # 进程内缓存有效期，限制其他进程停用版本后的陈旧时间
+        self.shared_ttl = shared_ttl
+        self.key_prefix = key_prefix
+        # 进程内条目键为 "<算法类型>:<版本>:<命盘键>"，各自按 local_ttl 过期
+        self._local = MemoryBackend(max_entries=max_entries)
+        self._generations: Dict[Tuple[str, str], Tuple[str, float]] = {}
+        # 失效次数：读取共享代次号期间发生过失效时，读到的代次号不写入进程内
+        self._invalidations = 0
+        self._lock = threading.Lock()
+        self._stats = {
+            "local_hits": 0, "shared_hits": 0, "misses": 0,
+            "cached_seconds": 0.0, "computed_seconds": 0.0
+        }
+
+    def get_or_compute(self,
+                       algorithm_type: str,
+                       version: str,
+                       birth_input: Dict[str, Any],
+                       compute: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """命中缓存直接返回结果副本，否则调用compute计算并写入两级缓存"""
+        started = time.perf_counter()
+        key = chart_key(algorithm_type, version, birth_input)
+        local_key = f"{algorithm_type}:{version}:{key}"
+
+        result = self._local.get(local_key)
+        if result is not None:
+            self._record("local_hits", "cached_seconds", started)
+            return copy.deepcopy(result)
+
+        shared_key = None
+        if self.shared_cache is not None:
+            shared_key = self._shared_key(algorithm_type, version, key)
+            result = self._shared_get(shared_key)
+            if result is not None:
+                self._local.set(local_key, result, ttl=self.local_ttl)
+                self._record("shared_hits", "cached_seconds", started)
+                return copy.deepcopy(result)
+
+        result = compute()
+        self._local.set(local_key, copy.deepcopy(result), ttl=self.local_ttl)
+        if shared_key is not None:
+            self._shared_set(shared_key, result)
+        self._record("misses", "computed_seconds", started)
+        return result
+
+    def invalidate_version(self, algorithm_type: str, version: str) -> int:
+        """失效指定算法版本的全部缓存，返回移除的进程内条目数"""
+        # 共享缓存无法按前缀删除，改为更换该版本的代次号，旧键随TTL自然过期；
+        # 先更换共享代次号再清除进程内代次号，此后读取到的一定是新代次号
+        if self.shared_cache is not None:
+            try:
+                self.shared_cache.set(self._generation_key(algorithm_type, version),
+                                      uuid.uuid4().hex, ttl=self.shared_ttl)
+            except Exception as e:
+                logger.warning(f"Failed to bump chart cache generation for {algorithm_type} {version}: {e}")
+
+        with self._lock:
+            self._generations.pop((algorithm_type, version), None)
+            self._invalidations += 1
+        removed = self._local.delete_prefix(f"{algorithm_type}:{version}:")
+
+        logger.info(f"Chart cache invalidated for {algorithm_type} version {version}, "
+                    f"{removed} local entries removed")
+        return removed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generations.clear()
+            self._invalidations += 1
+        self._local.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """命中率与缓存/计算平均耗时（毫秒）"""
+        with self._lock:
+            s = dict(self._stats)
+        size = self._local.stats()["size"]
+        hits = s["local_hits"] + s["shared_hits"]
+        total = hits + s["misses"]
+        return {
+            "local_hits": s["local_hits"],
+            "shared_hits": s["shared_hits"],
+            "misses": s["misses"],
+            "hit_ratio": round(hits / total, 4) if total else 0.0,
+            "avg_cached_ms": round(s["cached_seconds"] * 1000 / hits, 3) if hits else 0.0,
+            "avg_computed_ms": round(s["computed_seconds"] * 1000 / s["misses"], 3) if s["misses"] else 0.0,
+            "local_size": size
+        }
+
+    def _record(self, counter: str, timer: str, started: float) -> None:
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self._stats[counter] += 1
+            self._stats[timer] += elapsed
+
+    def _generation_key(self, algorithm_type: str, version: str) -> str:
+        return f"{self.key_prefix}gen:{algorithm_type}:{version}"
+
+    def _shared_key(self, algorithm_type: str, version: str, key: str) -> str:
+        # 代次号与进程内条目同样按local_ttl刷新，以感知其他进程的失效；读取共享缓存时不持锁
+        with self._lock:
+            cached = self._generations.get((algorithm_type, version))
+            invalidations = self._invalidations
+        if cached is not None and time.monotonic() - cached[1] <= self.local_ttl:
+            generation = cached[0]
+        else:
+            generation = self._shared_get(self._generation_key(algorithm_type, version)) or "0"
+            with self._lock:
+                if self._invalidations == invalidations:
+                    self._generations[(algorithm_type, version)] = (generation, time.monotonic())
+        return f"{self.key_prefix}{algorithm_type}:{version}:{generation}:{key}"
+
+    def _shared_get(self, key: str):
+        # 共享缓存不可用时降级为仅进程内缓存，不影响计算
+        try:
+            return self.shared_cache.get(key)
+        except Exception as e:
+            logger.warning(f"Shared chart cache get failed for {key}: {e}")
+            return None
+
+    def _shared_set(self, key: str, value: Dict[str, Any]) -> None:
+        try:
+            self.shared_cache.set(key, value, ttl=self.shared_ttl)
+        except Exception as e:
+            logger.warning(f"Shared chart cache set failed for {key}: {e}")
@@ -0,0 +1,237 @@
+# src/domain/fortune/compatibility.py
+"""
+合婚（命盘相合度）引擎
+每位用户的八字命盘压缩为定长特征向量（float32）：
+
+    [五行比例(5), 五行欠缺(5), 日干独热(10), 年支独热(12)]
+
+两人相合度为双线性型 score(a, b) = f_a · M · f_b，由三部分组成（M 对称，score 与顺序无关）：
+1. 五行互补：一方欠缺的五行恰为另一方所旺
+2. 日干：天干五合与日主五行生克
+3. 年支（生肖）：六合、三合加分，六冲、相害减分
+
+候选评分因此化为矩阵乘法；top-k 检索按候选分块计算（每块一次矩阵乘法 + argpartition），
+内存占用与候选总数无关，单机可覆盖百万级用户。
+"""
+
+import uuid
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+import logging
+
+from src.domain.fortune.algorithms.ganzhi import (
+    STEM_CODES, BRANCH_CODES, ELEMENTS, STEM_ELEMENT, ELEMENT_RELATION
+)
+
+logger = logging.getLogger(__name__)
+
+FEATURE_DIM = 32
+_MAIN, _NEED, _STEM, _BRANCH = slice(0, 5), slice(5, 10), slice(10, 20), slice(20, 32)
+
+# 五行比例低于均衡值（0.2）的部分记为欠缺
+BALANCED_SHARE = 0.2
+
+COMPATIBILITY_WEIGHTS = {
+    "element_complement": 10.0,  # 五行互补（欠缺 × 对方比例）
+    "stem_combination": 1.0,  # 天干五合
+    "element_generate": 0.5,  # 日主五行相生
+    "element_same": 0.25,  # 日主五行比和
+    "element_control": -0.5,  # 日主五行相克
+    "branch_six_combination": 1.0,  # 地支六合
+    "branch_three_combination": 0.5,  # 地支三合
+    "branch_clash": -1.0,  # 地支六冲
+    "branch_harm": -0.5  # 地支相害
+}
+
+# 天干五合：甲己、乙庚、丙辛、丁壬、戊癸
+STEM_COMBINATIONS = ((0, 5), (1, 6), (2, 7), (3, 8), (4, 9))
+# 地支六合：子丑、寅亥、卯戌、辰酉、巳申、午未
+BRANCH_SIX_COMBINATIONS = ((0, 1), (2, 11), (3, 10), (4, 9), (5, 8), (6, 7))
+# 地支三合：申子辰、亥卯未、寅午戌、巳酉丑
+BRANCH_THREE_COMBINATIONS = ((8, 0, 4), (11, 3, 7), (2, 6, 10), (5, 9, 1))
+# 地支六冲：子午、丑未、寅申、卯酉、辰戌、巳亥
+BRANCH_CLASHES = ((0, 6), (1, 7), (2, 8), (3, 9), (4, 10), (5, 11))
+# 地支相害：子未、丑午、寅巳、卯辰、申亥、酉戌
+BRANCH_HARMS = ((0, 7), (1, 6), (2, 5), (3, 4), (8, 11), (9, 10))
+
+_ID_DTYPE = np.dtype("V16")
+
+# 单块候选评分矩阵的元素上限（查询数 × 块大小），约64MB
+MAX_BLOCK_ELEMENTS = 1 << 24
+
+
+def _stem_matrix(weights: Dict[str, float]) -> np.ndarray:
+    """日干 × 日干 相合分"""
+    element_scores = {
+        "相生": weights["element_generate"], "被生": weights["element_generate"],
+        "比和": weights["element_same"],
+        "相克": weights["element_control"], "被克": weights["element_control"]
+    }
+    matrix = np.zeros((10, 10), dtype=np.float64)
+    for a in range(10):
+        for b in range(10):
+            matrix[a, b] = element_scores.get(ELEMENT_RELATION[STEM_ELEMENT[a]][STEM_ELEMENT[b]], 0.0)
+    for a, b in STEM_COMBINATIONS:
+        matrix[a, b] += weights["stem_combination"]
+        matrix[b, a] += weights["stem_combination"]
+    return matrix
+
+
+def _branch_matrix(weights: Dict[str, float]) -> np.ndarray:
+    """年支 × 年支 相合分"""
+    matrix = np.zeros((12, 12), dtype=np.float64)
+    pairs = [(p, weights["branch_six_combination"]) for p in BRANCH_SIX_COMBINATIONS]
+    pairs += [((a, b), weights["branch_three_combination"])
+              for group in BRANCH_THREE_COMBINATIONS for a in group for b in group if a < b]
+    pairs += [(p, weights["branch_clash"]) for p in BRANCH_CLASHES]
+    pairs += [(p, weights["branch_harm"]) for p in BRANCH_HARMS]
+    for (a, b), score in pairs:
+        matrix[a, b] += score
+        matrix[b, a] += score
+    return matrix
+
+
+def interaction_matrix(weights: Optional[Dict[str, float]] = None) -> np.ndarray:
+    """特征交互矩阵 M (FEATURE_DIM, FEATURE_DIM)，score(a, b) = f_a · M · f_b"""
+    weights = {**COMPATIBILITY_WEIGHTS, **(weights or {})}
+    matrix = np.zeros((FEATURE_DIM, FEATURE_DIM), dtype=np.float64)
+    complement = weights["element_complement"] * np.eye(5)
+    matrix[_MAIN, _NEED] = complement
+    matrix[_NEED, _MAIN] = complement
+    matrix[_STEM, _STEM] = _stem_matrix(weights)
+    matrix[_BRANCH, _BRANCH] = _branch_matrix(weights)
+    return matrix.astype(np.float32)
+
+
+def chart_features(main_elements, day_stems, year_branches) -> np.ndarray:
+    """
+    批量生成命盘特征向量 (n, FEATURE_DIM) float32
+    main_elements 为 (n, 5) 五行比例（ELEMENTS 顺序），day_stems、year_branches 为编码数组
+    """
+    main_elements = np.asarray(main_elements, dtype=np.float32)
+    n = len(main_elements)
+    rows = np.arange(n)
+    features = np.zeros((n, FEATURE_DIM), dtype=np.float32)
+    features[:, _MAIN] = main_elements
+    features[:, _NEED] = np.maximum(BALANCED_SHARE - main_elements, 0.0)
+    features[rows, _STEM.start + np.asarray(day_stems, dtype=np.intp)] = 1.0
+    features[rows, _BRANCH.start + np.asarray(year_branches, dtype=np.intp)] = 1.0
+    return features
+
+
+def features_from_batch(result) -> np.ndarray:
+    """由 BaziBatchResult 列式结果生成特征向量"""
+    return chart_features(result.main_elements, result.stem_codes[:, 2], result.branch_codes[:, 0])
+
+
+def features_from_bazi(bazi: Dict[str, Any]) -> np.ndarray:
+    """由单条 calculate_bazi 结果生成特征向量 (FEATURE_DIM,)"""
+    main = [[bazi["main_elements"][e] for e in ELEMENTS]]
+    return chart_features(main, [STEM_CODES[bazi["heavenly_stems"][2]]],
+                          [BRANCH_CODES[bazi["earthly_branches"][0]]])[0]
+
+
+class CompatibilityIndex:
+    """用户命盘特征矩阵及分块 top-k 相合度检索"""
+
+    def __init__(self,
+                 user_ids: Sequence[uuid.UUID],
+                 features: np.ndarray,
+                 weights: Optional[Dict[str, float]] = None):
+        features = np.asarray(features, dtype=np.float32)
+        if features.ndim != 2 or features.shape[1] != FEATURE_DIM or len(features) != len(user_ids):
+            raise ValueError(f"Invalid compatibility features shape {features.shape} for {len(user_ids)} users")
+        # 用户ID按16字节原始值存储（加载时为内存映射的 V16 数组）
+        if isinstance(user_ids, np.ndarray):
+            self.user_ids = user_ids.astype(_ID_DTYPE, copy=False)
+        else:
+            self.user_ids = np.array([u.bytes for u in user_ids], dtype=_ID_DTYPE)
+        self.features = features
+        self.matrix = interaction_matrix(weights)
+        self._positions: Optional[Dict[bytes, int]] = None
+
+    def __len__(self) -> int:
+        return len(self.features)
+
+    def save(self, path_prefix: str) -> None:
+        """保存为两个 .npy 文件（特征矩阵、用户ID），加载时可内存映射"""
+        np.save(f"{path_prefix}.features.npy", self.features)
+        np.save(f"{path_prefix}.ids.npy", self.user_ids)
+
+    @classmethod
+    def load(cls, path_prefix: str, weights: Optional[Dict[str, float]] = None) -> "CompatibilityIndex":
+        features = np.load(f"{path_prefix}.features.npy", mmap_mode="r")
+        user_ids = np.load(f"{path_prefix}.ids.npy", mmap_mode="r")
+        return cls(user_ids, features, weights)
+
+    def position(self, user_id: uuid.UUID) -> int:
+        """用户在特征矩阵中的行号"""
+        if self._positions is None:
+            self._positions = {raw: i for i, raw in enumerate(self.user_ids.tolist())}
+        try:
+            return self._positions[user_id.bytes]
+        except KeyError:
+            raise KeyError(f"User {user_id} not in compatibility index")
+
+    def scores(self, query_features: np.ndarray, candidates: Optional[np.ndarray] = None) -> np.ndarray:
+        """查询特征 (m, FEATURE_DIM) 与候选行（默认全部）的相合度矩阵 (m, c)"""
+        keys = self.features if candidates is None else self.features[candidates]
+        return (np.atleast_2d(query_features).astype(np.float32) @ self.matrix) @ keys.T
+
+    def top_k(self,
+              query_features: np.ndarray,
+              k: int = 10,
+              candidate_mask: Optional[np.ndarray] = None,
+              exclude_rows: Optional[Sequence[int]] = None,
+              max_block_elements: int = MAX_BLOCK_ELEMENTS) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        分块检索每个查询最相合的k个候选。
+        candidate_mask 为 (n,) 布尔数组（如按性别、地区预先筛选），exclude_rows 为每个查询要排除的行号
+        （通常为查询用户自身，-1表示不排除）。返回 (行号 (m, k), 分数 (m, k))，按分数降序，不足k个时行号为-1。
+        """
+        queries = np.atleast_2d(query_features).astype(np.float32) @ self.matrix
+        m, n = len(queries), len(self.features)
+        k = min(k, n)
+        best_scores = np.full((m, k), -np.inf, dtype=np.float32)
+        best_rows = np.full((m, k), -1, dtype=np.int64)
+        exclude = np.asarray(exclude_rows if exclude_rows is not None else [-1] * m, dtype=np.int64)
+        block = max(k, max_block_elements // max(m, 1))
+
+        for start in range(0, n, block):
+            end = min(start + block, n)
+            scores = queries @ np.asarray(self.features[start:end]).T
+            if candidate_mask is not None:
+                scores[:, ~candidate_mask[start:end]] = -np.inf
+            hit = (exclude >= start) & (exclude < end)
+            scores[np.nonzero(hit)[0], exclude[hit] - start] = -np.inf
+
+            # 块内先取前k，再与已有前k合并
+            if end - start > k:
+                cols = np.argpartition(scores, end - start - k, axis=1)[:, end - start - k:]
+            else:
+                cols = np.broadcast_to(np.arange(end - start), (m, end - start))
+            merged_scores = np.concatenate([best_scores, np.take_along_axis(scores, cols, axis=1)], axis=1)
+            merged_rows = np.concatenate([best_rows, cols + start], axis=1)
+            keep = np.argpartition(merged_scores, merged_scores.shape[1] - k, axis=1)[:, -k:]
+            best_scores = np.take_along_axis(merged_scores, keep, axis=1)
+            best_rows = np.take_along_axis(merged_rows, keep, axis=1)
+
+        order = np.argsort(-best_scores, axis=1, kind="stable")
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+        best_rows = np.take_along_axis(best_rows, order, axis=1)
+        best_rows[~np.isfinite(best_scores)] = -1
+        return best_rows, best_scores
+
+    def top_k_for_users(self,
+                        user_ids: Sequence[uuid.UUID],
+                        k: int = 10,
+                        candidate_mask: Optional[np.ndarray] = None) -> Dict[uuid.UUID, List[Tuple[uuid.UUID, float]]]:
+        """按用户检索最相合的k个其他用户：{用户: [(候选用户, 分数)]}"""
+        rows = [self.position(u) for u in user_ids]
+        best_rows, best_scores = self.top_k(np.asarray(self.features[rows]), k, candidate_mask, rows)
+        results = {}
+        for user_id, row_ids, row_scores in zip(user_ids, best_rows.tolist(), best_scores.tolist()):
+            results[user_id] = [(uuid.UUID(bytes=self.user_ids[r].tobytes()), round(s, 4))
+                                for r, s in zip(row_ids, row_scores) if r >= 0]
+        return results
@@ -1,11 +1,11 @@
 # src/domain/fortune/entities.py
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional
-from uuid import UUID
+from typing import Any, Dict, List, Optional
+from uuid import UUID, uuid4
 
 import datetime
 
-from src.domain.core.entities import AggregateRoot
+from src.domain.core.entities import AggregateRoot, DomainEvent
 from src.domain.core.value_objects import BirthData
 
 
@@ -28,6 +28,18 @@ class BaziResult:
             "recommendation": self.recommendation
         }
 
+    @classmethod
+    def from_chart(cls, chart: Dict[str, Any]) -> "BaziResult":
+        """八字算法输出的完整命盘（含十神、大运等）映射为分析结果"""
+        return cls(
+            heavenly_stems=list(chart["heavenly_stems"]),
+            earthly_branches=list(chart["earthly_branches"]),
+            main_elements=dict(chart["main_elements"]),
+            strong_elements=list(chart.get("strong_elements", [])),
+            weak_elements=list(chart.get("weak_elements", [])),
+            recommendation=chart.get("recommendation", "")
+        )
+
 
 @dataclass
 class ZiweiResult:
@@ -46,6 +58,20 @@ class ZiweiResult:
             "recommendation": self.recommendation
         }
 
+    @classmethod
+    def from_chart(cls, chart: Dict[str, Any]) -> "ZiweiResult":
+        """紫微斗数算法输出的完整命盘映射为分析结果：命宫主星，以及与命宫同宫的辅星"""
+        life_palace = chart["palaces"]["life_palace"]
+        trend = chart.get("fortune_trend") or {}
+        return cls(
+            life_palace=life_palace,
+            major_stars=[star for star in chart["stars"]["major_stars"].get(life_palace, []) if star != "空宫"],
+            star_interactions=[{"star": star, "palace": palace}
+                               for star, palace in chart["stars"]["minor_stars"].items() if palace == life_palace],
+            fortune_trend=trend.get("analysis", ""),
+            recommendation=trend.get("fortune_level", "")
+        )
+
 
 @dataclass
 class FortuneAnalysis(AggregateRoot):
@@ -59,6 +85,15 @@ class FortuneAnalysis(AggregateRoot):
     lucky_jewelry_ids: List[int] = field(default_factory=list)
     confidence_score: float = 0.0
     created_at: str = field(default_factory=lambda: str(datetime.datetime.now()))
+    updated_at: str = field(default_factory=lambda: str(datetime.datetime.now()))
+    id: UUID = field(default_factory=uuid4)
+    _domain_events: List[DomainEvent] = field(default_factory=list, repr=False, compare=False)
+
+    def get_domain_events(self) -> List[DomainEvent]:
+        return list(self._domain_events)
+
+    def clear_domain_events(self) -> None:
+        self._domain_events.clear()
 
     def update_bazi_result(self, result: BaziResult) -> None:
         self.bazi_result = result
@@ -72,3 +107,10 @@ class FortuneAnalysis(AggregateRoot):
         if jewelry_id not in self.lucky_jewelry_ids:
             self.lucky_jewelry_ids.append(jewelry_id)
             self.updated_at = str(datetime.datetime.now())
+
+
+@dataclass
+class FortuneAnalysisBatch:
+    """批量命理分析结果"""
+    analyses: List[FortuneAnalysis] = field(default_factory=list)
+    failed: Dict[UUID, str] = field(default_factory=dict)  # 计算失败的用户及原因
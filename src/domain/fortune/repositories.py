@@ -1,7 +1,8 @@
 # src/domain/fortune/repositories.py
 from abc import ABC, abstractmethod
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from uuid import UUID
+from src.domain.core.value_objects import BirthData
 from src.domain.fortune.entities import FortuneAnalysis
 
 
@@ -56,12 +57,32 @@ class FortuneAnalysisRepository(ABC):
         """更新命理分析结果"""
         pass
 
+    def save_many(self, analyses: List[FortuneAnalysis]) -> None:
+        """
+        批量保存命理分析结果，按ID覆盖写入（已存在的ID更新，重复保存不产生重复行）。
+        默认逐条查询后保存或更新，实现类应覆盖为单次批量upsert。
+        """
+        for analysis in analyses:
+            if self.find_by_id(analysis.id) is None:
+                self.save(analysis)
+            else:
+                self.update(analysis)
+
     @abstractmethod
     def delete(self, analysis_id: UUID) -> None:
         """删除命理分析结果"""
         pass
 
 
+class BirthDataRepository(ABC):
+    """用户出生信息存储库接口"""
+
+    @abstractmethod
+    def find_by_user_ids(self, user_ids: List[UUID]) -> Dict[UUID, BirthData]:
+        """一次查询获取多个用户的出生信息，未登记出生信息的用户不在结果中"""
+        pass
+
+
 class AlgorithmRepository(ABC):
     """算法元数据存储库接口"""
 
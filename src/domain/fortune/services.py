@@ -1,10 +1,15 @@
 # src/domain/fortune/services.py
-import importlib
+import copy
+import time
 from typing import Dict, Any, Optional, Callable, List
 from uuid import UUID
-from src.domain.core.exceptions import AlgorithmNotFoundError, ConfigNotFoundError
+from src.domain.core.exceptions import AlgorithmNotFoundError, AlgorithmTimeoutError, ConfigNotFoundError
 from src.domain.fortune.repositories import AlgorithmRepository, FortuneAnalysisRepository, AlgorithmMetadata
-from src.domain.fortune.entities import FortuneAnalysis, BirthData, BaziResult, ZiweiResult
+from src.domain.fortune.entities import FortuneAnalysis, FortuneAnalysisBatch, BirthData, BaziResult, ZiweiResult
+from src.domain.fortune.chart_cache import ChartCache
+from src.domain.fortune.algorithm_registry import AlgorithmRegistry, algorithm_registry
+from src.domain.fortune.analysis_executor import AnalysisExecutor, analysis_executor
+from src.domain.fortune.shadow_execution import ShadowConfig, ShadowRunner, shadow_runner
 from src.infrastructure.utils.dynamic_config import DynamicConfigService
 import logging
 
@@ -16,10 +21,17 @@ class FortuneCalculationService:
 
     def __init__(self,
                  algorithm_repository: AlgorithmRepository,
-                 dynamic_config_service: DynamicConfigService):
+                 dynamic_config_service: DynamicConfigService,
+                 chart_cache: Optional[ChartCache] = None,
+                 registry: Optional[AlgorithmRegistry] = None,
+                 executor: Optional[AnalysisExecutor] = None,
+                 shadow: Optional[ShadowRunner] = None):
         self.algorithm_repo = algorithm_repository
         self.dynamic_config_service = dynamic_config_service
-        self.loaded_algorithms: Dict[str, Any] = {}  # 缓存已加载的算法模块
+        self.registry = registry or algorithm_registry  # 进程级已加载算法模块
+        self.chart_cache = chart_cache or ChartCache()  # 命盘结果缓存（默认仅进程内）
+        self.executor = executor or analysis_executor  # 分析类型并行执行器（进程级共享）
+        self.shadow = shadow or shadow_runner  # 候选算法版本的影子执行（进程级共享统计）
         self.algorithm_type_config_map = {
             "bazi": "fortune.bazi.default_version",
             "ziwei": "fortune.ziwei.default_version",
@@ -27,6 +39,14 @@ class FortuneCalculationService:
             "palm": "fortune.palm.default_version"
         }
 
+    def preload_configs(self) -> Dict[str, Any]:
+        """
+        一次查询加载全部配置到本地快照，返回其中的 fortune.* 配置（默认版本、影子执行等）。
+        由进程启动钩子调用（见 monitoring.algorithm_warm_up），此后请求路径上的配置读取只读本地快照
+        """
+        self.dynamic_config_service.load_snapshot()
+        return self.dynamic_config_service.get_prefix("fortune.")
+
     def _get_default_version(self, algorithm_type: str) -> str:
         """获取指定算法类型的默认版本"""
         try:
@@ -45,30 +65,38 @@ class FortuneCalculationService:
             return version
 
     def _load_algorithm(self, algorithm_type: str, version: str) -> Callable:
-        """加载并返回指定类型和版本的算法模块"""
-        algorithm_key = f"{algorithm_type}_{version}"
-
-        if algorithm_key not in self.loaded_algorithms:
-            # 从算法仓库获取元数据
-            metadata = self.algorithm_repo.get_algorithm_metadata(algorithm_type, version)
-            if not metadata:
-                raise AlgorithmNotFoundError(algorithm_type, version)
+        """加载并返回指定类型和版本的算法模块（进程内共享）"""
+        return self.registry.get(algorithm_type, version, self.algorithm_repo)
 
-            # 动态加载算法模块
-            try:
-                module = importlib.import_module(metadata.module_path)
-                if not hasattr(module, 'calculate'):
-                    raise AlgorithmNotFoundError(
-                        f"Algorithm module {metadata.module_path} missing 'calculate' function")
+    def _get_shadow_config(self, algorithm_type: str) -> Optional[ShadowConfig]:
+        """获取指定算法类型的影子执行配置，未配置时返回None"""
+        try:
+            return ShadowConfig.from_dict(self.dynamic_config_service.get_config(f"fortune.{algorithm_type}.shadow"))
+        except ConfigNotFoundError:
+            return None
 
-                self.loaded_algorithms[algorithm_key] = module
-                logger.info(f"Loaded {algorithm_type} algorithm version {version} "
-                            f"from module: {metadata.module_path}")
-            except ImportError as e:
-                logger.error(f"Failed to import algorithm module: {metadata.module_path}, Error: {e}")
-                raise AlgorithmNotFoundError(algorithm_type, version)
+    def _compute(self, algorithm_type: str, version: str, algorithm: Any,
+                 input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """执行算法计算并记录该版本的计算耗时（请求路径上的主版本计算）"""
+        started = time.perf_counter()
+        result = self.executor.calculate(algorithm_type, algorithm, input_data)
+        self.shadow.record_latency(algorithm_type, version, time.perf_counter() - started)
+        return result
 
-        return self.loaded_algorithms[algorithm_key]
+    def _maybe_shadow(self, algorithm_type: str, version: str,
+                      input_data: Dict[str, Any], result_data: Dict[str, Any]) -> None:
+        """按抽样比例将候选版本计算交给后台影子执行，不影响请求结果"""
+        try:
+            config = self._get_shadow_config(algorithm_type)
+            if config is None or config.version == version or not self.shadow.should_sample(config.sample_rate):
+                return
+            # 候选版本的耗时由 ShadowRunner 在后台计算完成时记录，这里不经过 _compute，避免重复记录
+            self.shadow.submit(algorithm_type, version, config.version, copy.deepcopy(result_data),
+                               lambda: self.executor.calculate(
+                                   algorithm_type, self._load_algorithm(algorithm_type, config.version),
+                                   input_data))
+        except Exception as e:
+            logger.warning(f"Failed to schedule shadow {algorithm_type} calculation: {e}")
 
     def calculate_bazi(self, birth_data: BirthData, version: Optional[str] = None) -> BaziResult:
         """计算八字命理分析结果"""
@@ -76,8 +104,13 @@ class FortuneCalculationService:
         algorithm = self._load_algorithm("bazi", version)
 
         try:
-            result_data = algorithm.calculate(birth_data.to_dict())
-            return BaziResult(**result_data)
+            input_data = birth_data.to_dict()
+            result_data = self.chart_cache.get_or_compute(
+                "bazi", version, input_data, lambda: self._compute("bazi", version, algorithm, input_data))
+            self._maybe_shadow("bazi", version, input_data, result_data)
+            return BaziResult.from_chart(result_data)
+        except AlgorithmTimeoutError:
+            raise
         except Exception as e:
             logger.error(f"Error calculating Bazi: {e}")
             raise AlgorithmNotFoundError(f"Error in Bazi calculation: {e}")
@@ -95,12 +128,33 @@ class FortuneCalculationService:
                 "birth_data": birth_data.to_dict(),
                 "location_data": location_data
             }
-            result_data = algorithm.calculate(input_data)
-            return ZiweiResult(**result_data)
+            result_data = self.chart_cache.get_or_compute(
+                "ziwei", version, input_data, lambda: self._compute("ziwei", version, algorithm, input_data))
+            self._maybe_shadow("ziwei", version, input_data, result_data)
+            return ZiweiResult.from_chart(result_data)
+        except AlgorithmTimeoutError:
+            raise
         except Exception as e:
             logger.error(f"Error calculating Ziwei: {e}")
             raise AlgorithmNotFoundError(f"Error in Ziwei calculation: {e}")
 
+    def deactivate_algorithm(self, algorithm_type: str, version: str) -> None:
+        """停用算法版本，并失效该版本已加载的模块和命盘缓存"""
+        self.algorithm_repo.deactivate_algorithm(algorithm_type, version)
+        self.registry.evict(algorithm_type, version)
+        self.chart_cache.invalidate_version(algorithm_type, version)
+
+    def get_chart_cache_stats(self) -> Dict[str, Any]:
+        """命盘缓存命中率及缓存/计算耗时"""
+        stats = self.chart_cache.stats()
+        logger.info(f"Chart cache hit ratio {stats['hit_ratio']:.2%}, "
+                    f"cached {stats['avg_cached_ms']}ms vs computed {stats['avg_computed_ms']}ms")
+        return stats
+
+    def get_shadow_stats(self) -> Dict[str, Any]:
+        """各算法版本的计算耗时直方图及影子执行的比较统计"""
+        return self.shadow.stats()
+
     def calculate_fortune_analysis(self,
                                    user_id: UUID,
                                    birth_data: BirthData,
@@ -115,14 +169,21 @@ class FortuneCalculationService:
             birth_data=birth_data
         )
 
+        # 各分析类型相互独立，并行执行；不需要的类型不分派
+        tasks = {}
         if "bazi" in analysis_types:
-            bazi_result = self.calculate_bazi(birth_data)
+            tasks["bazi"] = lambda: self.calculate_bazi(birth_data)
+        if "ziwei" in analysis_types and location_data:
+            tasks["ziwei"] = lambda: self.calculate_ziwei(birth_data, location_data)
+        results = self.executor.gather(tasks)
+
+        if "bazi" in results:
+            bazi_result = results["bazi"]
             analysis.update_bazi_result(bazi_result)
             analysis.wuxing_analysis = bazi_result.main_elements
 
-        if "ziwei" in analysis_types and location_data:
-            ziwei_result = self.calculate_ziwei(birth_data, location_data)
-            analysis.update_ziwei_result(ziwei_result)
+        if "ziwei" in results:
+            analysis.update_ziwei_result(results["ziwei"])
 
         # 计算幸运珠宝
         if analysis.wuxing_analysis:
@@ -130,6 +191,67 @@ class FortuneCalculationService:
 
         return analysis
 
+    def calculate_fortune_analysis_batch(self,
+                                         births: Dict[UUID, BirthData],
+                                         analysis_types: Optional[List[str]] = None) -> FortuneAnalysisBatch:
+        """
+        批量命理分析：每种分析类型整批向量化或分块进程池计算，不经过命盘缓存。
+        紫微斗数只计算登记了出生地经纬度的用户；单个用户计算失败记入 failed，不影响其他用户。
+        """
+        analysis_types = analysis_types or ["bazi", "ziwei"]
+        user_ids = list(births)
+        batch = FortuneAnalysisBatch()
+
+        bazi_results: Dict[UUID, Any] = {}
+        if "bazi" in analysis_types:
+            algorithm = self._load_algorithm("bazi", self._get_default_version("bazi"))
+            outcomes = self.executor.calculate_many(
+                "bazi", algorithm, [births[user_id].to_dict() for user_id in user_ids])
+            bazi_results = dict(zip(user_ids, outcomes))
+
+        ziwei_results: Dict[UUID, Any] = {}
+        if "ziwei" in analysis_types:
+            located = [user_id for user_id in user_ids if births[user_id].location]
+            algorithm = self._load_algorithm("ziwei", self._get_default_version("ziwei"))
+            outcomes = self.executor.calculate_many("ziwei", algorithm, [
+                {"birth_data": births[user_id].to_dict(), "location_data": births[user_id].location}
+                for user_id in located
+            ])
+            ziwei_results = dict(zip(located, outcomes))
+
+        for user_id in user_ids:
+            errors = [f"{analysis_type}: {outcome}"
+                      for analysis_type, outcome in (("bazi", bazi_results.get(user_id)),
+                                                     ("ziwei", ziwei_results.get(user_id)))
+                      if isinstance(outcome, Exception)]
+            if errors:
+                batch.failed[user_id] = "; ".join(errors)
+                continue
+
+            try:
+                analysis = FortuneAnalysis(
+                    user_id=user_id,
+                    analysis_type="_".join(analysis_types),
+                    birth_data=births[user_id]
+                )
+                if user_id in bazi_results:
+                    bazi_result = BaziResult.from_chart(bazi_results[user_id])
+                    analysis.update_bazi_result(bazi_result)
+                    analysis.wuxing_analysis = bazi_result.main_elements
+                if user_id in ziwei_results:
+                    analysis.update_ziwei_result(ZiweiResult.from_chart(ziwei_results[user_id]))
+            except Exception as e:
+                batch.failed[user_id] = str(e)
+                continue
+
+            if analysis.wuxing_analysis:
+                analysis.lucky_jewelry_ids = self._calculate_lucky_jewelry(analysis.wuxing_analysis)
+            batch.analyses.append(analysis)
+
+        if batch.failed:
+            logger.warning(f"Fortune analysis batch: {len(batch.failed)} of {len(user_ids)} users failed")
+        return batch
+
     def _calculate_lucky_jewelry(self, wuxing_analysis: Dict[str, float]) -> List[int]:
         """根据五行分析结果计算推荐的幸运珠宝ID"""
         # 简化实现，实际应用中会更复杂
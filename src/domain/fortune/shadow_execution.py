@@ -0,0 +1,270 @@
+# src/domain/fortune/shadow_execution.py
+"""
+算法版本影子执行
+上线新的（通常是优化过的）算法版本前，按动态配置 fortune.<类型>.shadow
+（{"version": 候选版本, "sample_rate": 抽样比例}）抽取一部分线上请求，
+在后台线程中用候选版本重新计算，与主版本结果逐字段比较。
+影子计算不在请求路径上：请求只负责抽样和入队，队列已满时直接丢弃。
+
+按版本记录计算耗时直方图，按（主版本, 候选版本）记录比较次数、不一致次数与最近的差异字段，
+为切换默认版本提供依据。
+"""
+
+import bisect
+import math
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Any, Callable, Optional, List, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 耗时直方图桶上界（毫秒），最后一个桶为 +inf
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+MAX_DIFF_PATHS = 20
+RECENT_MISMATCHES = 20
+
+
+@dataclass
+class ShadowConfig:
+    """某算法类型的影子执行配置"""
+    version: str
+    sample_rate: float = 0.0
+
+    @classmethod
+    def from_dict(cls, config: Dict[str, Any]) -> Optional["ShadowConfig"]:
+        version = config.get("version")
+        sample_rate = float(config.get("sample_rate", 0.0))
+        if not version or sample_rate <= 0 or not config.get("enabled", True):
+            return None
+        return cls(version=version, sample_rate=min(sample_rate, 1.0))
+
+
+class LatencyHistogram:
+    """固定桶的耗时直方图（非线程安全，由 ShadowRunner 加锁访问）"""
+
+    def __init__(self, buckets_ms: Tuple[float, ...] = LATENCY_BUCKETS_MS):
+        self.buckets_ms = buckets_ms
+        self.counts = [0] * (len(buckets_ms) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, seconds: float) -> None:
+        ms = seconds * 1000
+        self.counts[bisect.bisect_left(self.buckets_ms, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, q: float) -> float:
+        """按桶上界估算分位数（毫秒），落在最后一个桶时返回最大值"""
+        if not self.count:
+            return 0.0
+        rank = math.ceil(q * self.count)
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return float(self.buckets_ms[i]) if i < len(self.buckets_ms) else round(self.max_ms, 3)
+        return round(self.max_ms, 3)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": round(self.max_ms, 3),
+            "buckets": {**{f"le_{b}": n for b, n in zip(self.buckets_ms, self.counts)},
+                        "le_inf": self.counts[-1]}
+        }
+
+
+@dataclass
+class ComparisonStats:
+    """主版本与候选版本的比较统计"""
+    compared: int = 0
+    mismatches: int = 0
+    candidate_errors: int = 0
+    recent_mismatches: deque = field(default_factory=lambda: deque(maxlen=RECENT_MISMATCHES))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "compared": self.compared,
+            "mismatches": self.mismatches,
+            "candidate_errors": self.candidate_errors,
+            "mismatch_ratio": round(self.mismatches / self.compared, 4) if self.compared else 0.0,
+            "recent_mismatches": list(self.recent_mismatches)
+        }
+
+
+def diff_results(primary: Any, candidate: Any, path: str = "",
+                 float_tolerance: float = 1e-6, limit: int = MAX_DIFF_PATHS) -> List[str]:
+    """逐字段比较两个计算结果，返回不一致字段的路径（最多limit个），浮点数按绝对误差比较"""
+    diffs: List[str] = []
+    _diff(primary, candidate, path or "$", float_tolerance, limit, diffs)
+    return diffs
+
+
+def _diff(a: Any, b: Any, path: str, tolerance: float, limit: int, diffs: List[str]) -> None:
+    if len(diffs) >= limit:
+        return
+    if isinstance(a, dict) and isinstance(b, dict):
+        for key in sorted(set(a) | set(b), key=str):
+            if key not in a or key not in b:
+                diffs.append(f"{path}.{key}")
+            else:
+                _diff(a[key], b[key], f"{path}.{key}", tolerance, limit, diffs)
+            if len(diffs) >= limit:
+                return
+    elif isinstance(a, (list, tuple)) and isinstance(b, (list, tuple)):
+        if len(a) != len(b):
+            diffs.append(f"{path}[len]")
+            return
+        for i, (x, y) in enumerate(zip(a, b)):
+            _diff(x, y, f"{path}[{i}]", tolerance, limit, diffs)
+    elif isinstance(a, float) or isinstance(b, float):
+        try:
+            if not math.isclose(a, b, rel_tol=0.0, abs_tol=tolerance):
+                diffs.append(path)
+        except TypeError:
+            diffs.append(path)
+    elif a != b:
+        diffs.append(path)
+
+
+class ShadowRunner:
+    """抽样、后台执行候选版本并汇总比较与耗时统计"""
+
+    def __init__(self,
+                 max_workers: int = 2,
+                 max_pending: int = 100,
+                 float_tolerance: float = 1e-6,
+                 rng: Optional[random.Random] = None):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.float_tolerance = float_tolerance
+        self._rng = rng or random.Random()
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._dropped = 0
+        self._latency: Dict[Tuple[str, str], LatencyHistogram] = {}
+        self._comparisons: Dict[Tuple[str, str, str], ComparisonStats] = {}
+
+    def should_sample(self, sample_rate: float) -> bool:
+        return sample_rate >= 1.0 or self._rng.random() < sample_rate
+
+    def record_latency(self, algorithm_type: str, version: str, seconds: float) -> None:
+        """记录某算法版本一次实际计算（未命中缓存）的耗时"""
+        with self._lock:
+            histogram = self._latency.get((algorithm_type, version))
+            if histogram is None:
+                histogram = self._latency[(algorithm_type, version)] = LatencyHistogram()
+            histogram.observe(seconds)
+
+    def submit(self,
+               algorithm_type: str,
+               primary_version: str,
+               candidate_version: str,
+               primary_result: Dict[str, Any],
+               run_candidate: Callable[[], Dict[str, Any]]) -> bool:
+        """候选版本计算入队，返回是否已入队（队列已满时丢弃，不阻塞请求）"""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._dropped += 1
+                return False
+            self._pending += 1
+        try:
+            self._get_pool().submit(self._run, algorithm_type, primary_version, candidate_version,
+                                    primary_result, run_candidate)
+        except RuntimeError:
+            # 进程退出时线程池已关闭
+            with self._lock:
+                self._pending -= 1
+                self._dropped += 1
+            return False
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "pending": self._pending,
+                "dropped": self._dropped,
+                "latency": {f"{t}:{v}": h.to_dict() for (t, v), h in self._latency.items()},
+                "comparisons": {f"{t}:{p}->{c}": s.to_dict() for (t, p, c), s in self._comparisons.items()}
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._dropped = 0
+            self._latency.clear()
+            self._comparisons.clear()
+
+    def wait_idle(self, timeout: float = 5.0) -> bool:
+        """等待已入队的影子计算完成（用于测试与进程退出前）"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self._lock:
+                if not self._pending:
+                    return True
+            time.sleep(0.01)
+        return False
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait, cancel_futures=True)
+
+    def _run(self, algorithm_type: str, primary_version: str, candidate_version: str,
+             primary_result: Dict[str, Any], run_candidate: Callable[[], Dict[str, Any]]) -> None:
+        try:
+            started = time.perf_counter()
+            try:
+                candidate_result = run_candidate()
+            except Exception as e:
+                logger.warning(f"Shadow {algorithm_type} {candidate_version} failed: {e}")
+                with self._lock:
+                    self._comparison(algorithm_type, primary_version, candidate_version).candidate_errors += 1
+                return
+            self.record_latency(algorithm_type, candidate_version, time.perf_counter() - started)
+
+            diffs = diff_results(primary_result, candidate_result, float_tolerance=self.float_tolerance)
+            with self._lock:
+                stats = self._comparison(algorithm_type, primary_version, candidate_version)
+                stats.compared += 1
+                if diffs:
+                    stats.mismatches += 1
+                    stats.recent_mismatches.append(diffs)
+            if diffs:
+                logger.info(f"Shadow {algorithm_type} {candidate_version} differs from "
+                            f"{primary_version}: {', '.join(diffs)}")
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def _comparison(self, algorithm_type: str, primary_version: str, candidate_version: str) -> ComparisonStats:
+        key = (algorithm_type, primary_version, candidate_version)
+        stats = self._comparisons.get(key)
+        if stats is None:
+            stats = self._comparisons[key] = ComparisonStats()
+        return stats
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix="fortune-shadow")
+        return self._pool
+
+
+# 进程级影子执行器，所有 FortuneCalculationService 实例共享统计
+shadow_runner = ShadowRunner()
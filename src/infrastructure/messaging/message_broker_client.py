@@ -0,0 +1,128 @@
+# src/infrastructure/messaging/message_broker_client.py
+"""
+消息通道客户端
+提供按频道发布/订阅的最小接口，用于在进程之间广播轻量通知（如动态配置失效）。
+消息为字典（值可为领域对象、UUID等编解码器支持的类型）；
+订阅回调在后台线程（Redis）或发布方线程（进程内实现）中执行，回调内的异常只记录日志，不影响其他订阅者。
+
+- InMemoryMessageBroker：进程内实现，单进程部署与测试使用
+- RedisMessageBroker：基于 Redis pub/sub，多进程/多实例部署使用（redis 依赖按需导入），
+  消息默认用二进制编解码器（codec.binary_codec）编码
+"""
+
+import logging
+import threading
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from typing import Dict, Any, Callable, List
+
+from src.infrastructure.utils.codec import Codec, binary_codec
+
+logger = logging.getLogger(__name__)
+
+MessageHandler = Callable[[Dict[str, Any]], None]
+
+
+class MessageBrokerClient(ABC):
+    """消息通道接口"""
+
+    @abstractmethod
+    def publish(self, channel: str, message: Dict[str, Any]) -> None:
+        """向频道发布消息"""
+        pass
+
+    @abstractmethod
+    def subscribe(self, channel: str, handler: MessageHandler) -> Callable[[], None]:
+        """订阅频道，返回取消订阅的函数"""
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+def _dispatch(channel: str, handlers: List[MessageHandler], message: Dict[str, Any]) -> None:
+    for handler in handlers:
+        try:
+            handler(message)
+        except Exception:
+            logger.exception(f"Message handler failed on channel '{channel}'")
+
+
+class InMemoryMessageBroker(MessageBrokerClient):
+    """进程内消息通道：发布时在发布方线程中同步调用订阅回调"""
+
+    def __init__(self):
+        self._handlers: Dict[str, List[MessageHandler]] = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def publish(self, channel: str, message: Dict[str, Any]) -> None:
+        with self._lock:
+            handlers = list(self._handlers.get(channel, ()))
+        _dispatch(channel, handlers, message)
+
+    def subscribe(self, channel: str, handler: MessageHandler) -> Callable[[], None]:
+        with self._lock:
+            self._handlers[channel].append(handler)
+
+        def unsubscribe():
+            with self._lock:
+                if handler in self._handlers.get(channel, ()):
+                    self._handlers[channel].remove(handler)
+        return unsubscribe
+
+
+class RedisMessageBroker(MessageBrokerClient):
+    """Redis pub/sub 消息通道：所有频道共用一个连接和一个后台监听线程"""
+
+    def __init__(self, redis_url: str = "redis://localhost:6379/0", poll_interval: float = 0.1,
+                 codec: Codec = binary_codec):
+        import redis
+
+        self._client = redis.Redis.from_url(redis_url)
+        self._pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        self._poll_interval = poll_interval
+        self._codec = codec
+        self._handlers: Dict[str, List[MessageHandler]] = defaultdict(list)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def publish(self, channel: str, message: Dict[str, Any]) -> None:
+        self._client.publish(channel, self._codec.encode(message))
+
+    def subscribe(self, channel: str, handler: MessageHandler) -> Callable[[], None]:
+        with self._lock:
+            first = not self._handlers[channel]
+            self._handlers[channel].append(handler)
+            if first:
+                self._pubsub.subscribe(**{channel: self._on_message})
+            if self._thread is None:
+                self._thread = self._pubsub.run_in_thread(sleep_time=self._poll_interval, daemon=True)
+
+        def unsubscribe():
+            with self._lock:
+                if handler in self._handlers.get(channel, ()):
+                    self._handlers[channel].remove(handler)
+                if not self._handlers.get(channel):
+                    self._pubsub.unsubscribe(channel)
+        return unsubscribe
+
+    def _on_message(self, raw: Dict[str, Any]) -> None:
+        channel = raw["channel"]
+        if isinstance(channel, bytes):
+            channel = channel.decode("utf-8")
+        try:
+            message = self._codec.decode(raw["data"])
+        except (TypeError, ValueError):
+            logger.warning(f"Dropping malformed message on channel '{channel}'")
+            return
+        with self._lock:
+            handlers = list(self._handlers.get(channel, ()))
+        _dispatch(channel, handlers, message)
+
+    def close(self) -> None:
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.stop()
+        self._pubsub.close()
+        self._client.close()
@@ -0,0 +1,81 @@
+"""
+算法预热启动钩子
+Web应用启动时在后台线程中预热进程级算法注册表，/readyz 在预热完成前返回503，
+完成后按预热结果报告就绪状态；Celery 使用 prefork 模型，每个worker进程在
+worker_process_init 中同步预热，预热完成前不接收任务。
+传入 fortune_service_factory 时，预热同时一次加载全部动态配置到本地快照（preload_configs），
+冷启动后的首批请求不再逐键查询配置表；配置预加载失败不影响就绪状态，读取时按键回源。
+"""
+
+import threading
+from typing import Any, Callable, Optional
+import logging
+
+from src.domain.fortune.algorithm_registry import algorithm_registry
+from src.domain.fortune.repositories import AlgorithmRepository
+from src.domain.fortune.services import FortuneCalculationService
+
+logger = logging.getLogger(__name__)
+
+AlgorithmRepositoryFactory = Callable[[], AlgorithmRepository]
+FortuneServiceFactory = Callable[[], Optional[FortuneCalculationService]]
+
+
+def _preload_configs(fortune_service_factory: Optional[FortuneServiceFactory]) -> None:
+    try:
+        fortune_service = fortune_service_factory() if fortune_service_factory is not None else None
+        if fortune_service is None:
+            return
+        configs = fortune_service.preload_configs()
+    except Exception:
+        logger.exception("Dynamic config preload failed")
+        return
+    logger.info(f"Preloaded {len(configs)} fortune configs at startup.")
+
+
+def _warm_up(algorithm_repo_factory: Optional[AlgorithmRepositoryFactory],
+             fortune_service_factory: Optional[FortuneServiceFactory] = None) -> None:
+    _preload_configs(fortune_service_factory)
+    try:
+        algorithm_repo = algorithm_repo_factory() if algorithm_repo_factory is not None else None
+        status = algorithm_registry.warm_up(algorithm_repo)
+    except Exception:
+        # 预热未完成，/readyz 保持未就绪
+        logger.exception("Algorithm warm-up failed")
+        return
+    if not status["ready"]:
+        logger.error(f"Algorithm warm-up finished with errors: {status['errors']}")
+
+
+def init_algorithm_warm_up(app: Any = None,
+                           algorithm_repo_factory: Optional[AlgorithmRepositoryFactory] = None,
+                           celery_app: Any = None,
+                           background: bool = True,
+                           fortune_service_factory: Optional[FortuneServiceFactory] = None
+                           ) -> Optional[threading.Thread]:
+    """
+    注册算法预热：传入 app 时立即开始预热（默认后台线程，返回该线程），
+    传入 celery_app 时在每个worker进程启动时预热。
+    algorithm_repo_factory 在预热所在的进程内创建算法仓库，不传时只预热内置算法；
+    fortune_service_factory 返回该进程处理请求所用的命理计算服务（返回None时跳过配置预加载）。
+    """
+    thread = None
+    if app is not None or celery_app is not None:
+        algorithm_registry.expect_warm_up()
+    if app is not None:
+        if background:
+            thread = threading.Thread(target=_warm_up, args=(algorithm_repo_factory, fortune_service_factory),
+                                      name="algorithm-warm-up", daemon=True)
+            thread.start()
+        else:
+            _warm_up(algorithm_repo_factory, fortune_service_factory)
+        logger.info("Algorithm warm-up started for web application.")
+
+    if celery_app is not None:
+        from celery.signals import worker_process_init
+
+        @worker_process_init.connect(weak=False)
+        def warm_up_celery_worker(*args, **kwargs):
+            _warm_up(algorithm_repo_factory, fortune_service_factory)
+        logger.info("Algorithm warm-up registered for Celery worker processes.")
+    return thread
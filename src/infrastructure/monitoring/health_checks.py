@@ -1,5 +1,6 @@
 from flask import Blueprint, jsonify
 from src.extensions import db, cache  # 假设db和cache是Flask扩展实例
+from src.domain.fortune.algorithm_registry import algorithm_registry
 import logging
 
 logger = logging.getLogger(__name__)
@@ -7,7 +8,7 @@ logger = logging.getLogger(__name__)
 health_bp = Blueprint('health', __name__)
 
 
-@health_bp.route('/healthz', methods=)
+@health_bp.route('/healthz', methods=['GET'])
 def liveness_check():
     """
     Liveness probe: Checks if the application is running.
@@ -25,7 +26,7 @@ def liveness_check():
         return jsonify({"status": "DOWN", "error": str(e)}), 500
 
 
-@health_bp.route('/readyz', methods=)
+@health_bp.route('/readyz', methods=['GET'])
 def readiness_check():
     """
     Readiness probe: Checks if the application is ready to serve traffic.
@@ -39,13 +40,15 @@ def readiness_check():
         if cache.get("ready_check_key") != "ok":
             raise ConnectionError("Cache is not fully ready.")
 
-        # 检查核心算法模型是否已加载或可访问
-        # 例如：从动态配置服务中尝试获取一个关键配置，确保服务已初始化并能访问配置
-        # from src.infrastructure.utils.dynamic_config import dynamic_config_service
-        # dynamic_config_service.get_config("some_critical_algorithm_param")
+        # 检查核心算法是否已在工作进程启动时完成预热
+        algorithms = algorithm_registry.readiness()
+        if not algorithms["ready"]:
+            logger.warning(f"Readiness check: algorithms not ready: {algorithms}")
+            return jsonify({"status": "NOT_READY", "algorithms": algorithms}), 503
 
         logger.debug("Readiness check successful.")
-        return jsonify({"status": "READY", "details": "Application is ready to serve traffic"}), 200
+        return jsonify({"status": "READY", "details": "Application is ready to serve traffic",
+                        "algorithms": algorithms}), 200
     except Exception as e:
         logger.error(f"Readiness check failed: {e}")
         return jsonify({"status": "NOT_READY", "error": str(e)}), 503
@@ -1,5 +1,5 @@
 from sqlalchemy import (
-    Column, Integer, String, Date, Text, Boolean, TIMESTAMP, DECIMAL, ForeignKey, JSON
+    Column, Integer, String, Date, Text, Boolean, TIMESTAMP, DECIMAL, ForeignKey, JSON, BigInteger
 )
 from sqlalchemy.orm import relationship
 from .base import Base
@@ -21,6 +21,12 @@ class FortuneAnalysisRepositoryImpl(FortuneAnalysisRepository):
         self.session.merge(analysis)
         self.session.commit()
 
+    def save_many(self, analyses: list[FortuneAnalysis]) -> None:
+        # merge 按主键upsert，一次提交
+        for analysis in analyses:
+            self.session.merge(analysis)
+        self.session.commit()
+
     def delete(self, analysis_id) -> None:
         analysis = self.find_by_id(analysis_id)
         if analysis:
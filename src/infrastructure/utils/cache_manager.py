@@ -0,0 +1,258 @@
+"""
+缓存管理器
+命理结果、动态配置、商品目录等查询共用的缓存层，提供 get / set(ttl) / delete / get_or_set。
+
+- 后端可替换：MemoryBackend 为进程内有界LRU（每个键单独的过期时间）；
+  RedisBackend 只依赖 Redis 协议的 get / set(ex=) / delete，测试中可用本地替身代替 Redis 客户端；
+  值默认用二进制编解码器（codec.binary_codec）写出，解码失败（如模式版本已变化）按未命中处理
+- 键按命名空间隔离（"<namespace>:<key>"），namespaced() 派生的子管理器共享后端、统计与合并表
+- get_or_set 单飞合并：同一键并发未命中时只有一个调用方执行计算，其余等待其结果
+- 统计命中、未命中、写入、删除、合并等待、后端错误与LRU淘汰次数
+- 后端不可用时降级为未命中（读）或忽略（写），不影响业务计算
+
+值 None 表示未命中，写入 None 会被忽略。MemoryBackend 按引用保存对象，调用方不应修改取回的可变对象。
+ttl 为 None 表示不过期；ttl 不大于0表示立即过期：不写入，并删除该键已有的值。
+"""
+
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Any, Callable, Optional, Tuple
+import logging
+
+from src.infrastructure.utils.codec import Codec, binary_codec
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = 300
+
+
+class CacheBackend(ABC):
+    """缓存后端接口：ttl 为秒数，None 表示不过期，不大于0时不写入并删除已有的值"""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        """读取缓存值，未命中或已过期时返回None"""
+        pass
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """写入缓存值"""
+        pass
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """删除缓存值"""
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+
+class MemoryBackend(CacheBackend):
+    """进程内有界LRU，条目各自记录过期时刻，读取时惰性清除过期条目"""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Optional[float], Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._evictions = 0
+        self._expirations = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and time.monotonic() >= expires_at:
+                del self._entries[key]
+                self._expirations += 1
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        if ttl is not None and ttl <= 0:
+            self.delete(key)
+            return
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_prefix(self, prefix: str) -> int:
+        """删除以 prefix 开头的全部键，返回删除条数"""
+        with self._lock:
+            stale = [key for key in self._entries if key.startswith(prefix)]
+            for key in stale:
+                del self._entries[key]
+        return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"size": len(self._entries), "max_entries": self.max_entries,
+                    "evictions": self._evictions, "expirations": self._expirations}
+
+
+class RedisBackend(CacheBackend):
+    """Redis 协议后端：client 需提供 get / set(key, value, ex=) / delete，值经 codec 编解码"""
+
+    def __init__(self, client: Any, codec: Codec = binary_codec):
+        self.client = client
+        self.codec = codec
+
+    @classmethod
+    def from_url(cls, redis_url: str = "redis://localhost:6379/0", **kwargs) -> "RedisBackend":
+        import redis
+
+        return cls(redis.Redis.from_url(redis_url), **kwargs)
+
+    def get(self, key: str) -> Optional[Any]:
+        data = self.client.get(key)
+        return None if data is None else self.codec.decode(data)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        if ttl is not None and ttl <= 0:
+            self.client.delete(key)
+            return
+        # Redis 过期时间为整秒，不足1秒按1秒计
+        self.client.set(key, self.codec.encode(value), ex=max(1, int(ttl)) if ttl is not None else None)
+
+    def delete(self, key: str) -> None:
+        self.client.delete(key)
+
+
+class _Flight:
+    """一次进行中的计算，等待者在 done 上阻塞"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error: Optional[BaseException] = None
+
+
+class _SharedState:
+    """同一后端上各命名空间共享的统计与单飞合并表"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.flights: Dict[str, _Flight] = {}
+        self.counters = {"hits": 0, "misses": 0, "sets": 0, "deletes": 0, "coalesced": 0, "errors": 0}
+
+
+class CacheManager:
+    def __init__(self, backend: Optional[CacheBackend] = None, namespace: str = "",
+                 default_ttl: Optional[float] = DEFAULT_TTL, _state: Optional[_SharedState] = None):
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.namespace = namespace
+        self.default_ttl = default_ttl
+        self._state = _state or _SharedState()
+
+    def namespaced(self, namespace: str, default_ttl: Optional[float] = None) -> "CacheManager":
+        """派生子命名空间的管理器（共享后端、统计与单飞合并）"""
+        return CacheManager(self.backend, self._full_key(namespace),
+                            self.default_ttl if default_ttl is None else default_ttl, self._state)
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self._backend_get(self._full_key(key))
+        self._count("hits" if value is not None else "misses")
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        if value is None:
+            logger.debug(f"Skipping cache set of None for {self._full_key(key)}")
+            return
+        try:
+            self.backend.set(self._full_key(key), value, self.default_ttl if ttl is None else ttl)
+            self._count("sets")
+        except Exception as e:
+            self._count("errors")
+            logger.warning(f"Cache set failed for {self._full_key(key)}: {e}")
+
+    def delete(self, key: str) -> None:
+        try:
+            self.backend.delete(self._full_key(key))
+            self._count("deletes")
+        except Exception as e:
+            self._count("errors")
+            logger.warning(f"Cache delete failed for {self._full_key(key)}: {e}")
+
+    def get_or_set(self, key: str, compute: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+        """命中直接返回；未命中时同一键只由一个调用方计算并写入，其余调用方等待并共享结果（或异常）"""
+        full_key = self._full_key(key)
+        value = self._backend_get(full_key)
+        if value is not None:
+            self._count("hits")
+            return value
+
+        state = self._state
+        with state.lock:
+            flight = state.flights.get(full_key)
+            leader = flight is None
+            if leader:
+                flight = state.flights[full_key] = _Flight()
+                state.counters["misses"] += 1
+            else:
+                state.counters["coalesced"] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            # 首次读取后、成为执行者前，上一轮执行者或其他进程可能刚写入
+            value = self._backend_get(full_key)
+            if value is None:
+                value = compute()
+                self.set(key, value, ttl)
+            flight.value = value
+            return value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with state.lock:
+                state.flights.pop(full_key, None)
+            flight.done.set()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._state.lock:
+            counters = dict(self._state.counters)
+            counters["in_flight"] = len(self._state.flights)
+        lookups = counters["hits"] + counters["misses"]
+        counters["hit_ratio"] = round(counters["hits"] / lookups, 4) if lookups else 0.0
+        try:
+            counters.update(self.backend.stats())
+        except Exception as e:
+            logger.warning(f"Cache backend stats failed: {e}")
+        return counters
+
+    def _full_key(self, key: str) -> str:
+        return f"{self.namespace}:{key}" if self.namespace else key
+
+    def _backend_get(self, full_key: str) -> Optional[Any]:
+        try:
+            return self.backend.get(full_key)
+        except Exception as e:
+            self._count("errors")
+            logger.warning(f"Cache get failed for {full_key}: {e}")
+            return None
+
+    def _count(self, counter: str) -> None:
+        with self._state.lock:
+            self._state.counters[counter] += 1
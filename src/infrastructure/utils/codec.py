@@ -0,0 +1,294 @@
+"""
+缓存与消息的序列化编解码
+缓存（CacheManager 的 RedisBackend）与消息通道（RedisMessageBroker）通过 Codec 接口编解码，可替换：
+
+- JsonCodec：纯JSON，只支持JSON原生类型，便于人工排查
+- BinaryCodec：紧凑二进制。已注册的数据类（命盘结果、值对象、领域事件等）按字段顺序打包，
+  不写字段名；UUID 存16字节，日期时间、Decimal 保留原类型，解码后直接得到领域对象，
+  无需 to_dict() 转换和重新构造。打包后的结构用 marshal（C实现，重复字符串按引用存储）写出。
+
+二进制格式：4字节头（标记、格式版本、写入方 Python 主次版本号）+ marshal 数据。
+marshal 格式不保证跨 Python 版本兼容，版本号不一致时解码报 CodecError（滚动升级期间按缓存未命中处理）。
+扩展类型打包为带标记的元组，不含扩展类型的列表、字典原样写出，
+解码时只还原标记元组（如命盘结果字典几乎全程在C中解码）。
+
+模式校验：每个对象记录类型编号（类路径的CRC32）与模式指纹（注册版本号及各字段名、
+字段类型注解的CRC32）。字段增删、改名、改类型后指纹随之变化，旧缓存解码时报 CodecError，
+CacheManager 按未命中处理；字段语义变化而名称、类型不变时仍需手动提升注册版本。
+
+选用 marshal 而非 msgpack 等跨语言格式的原因：
+- 标准库自带、C实现，不增加部署依赖；命盘结果等嵌套字典与列表原样交给C编解码，
+  只有扩展类型需要在Python中打包，msgpack 的扩展类型钩子对每个值都要回调Python；
+- 数据只在本系统同版本的Python进程之间传递（缓存与进程间消息），不需要跨语言读取，
+  Python 版本差异由头部版本号拦截；
+- marshal.loads 只构造内置类型的值，不会像 pickle 那样执行任意代码，解码结果再经标记与模式校验。
+但 marshal 不防御恶意构造的数据（可能报错，旧版本解释器中甚至可能崩溃），
+因此 Redis 与消息通道必须处于可信边界内（网络隔离、启用认证），不能用于外部传入的数据；
+能写入这两处的一方本就可以篡改缓存内容与失效消息。
+"""
+
+import datetime
+import decimal
+import json
+import marshal
+import numbers
+import operator
+import sys
+import uuid
+import zlib
+from abc import ABC, abstractmethod
+from dataclasses import fields, is_dataclass
+from typing import Dict, Any, Optional, Tuple, Type
+import logging
+
+logger = logging.getLogger(__name__)
+
+BINARY_MAGIC = 0xC5
+BINARY_FORMAT_VERSION = 3
+MARSHAL_VERSION = 4
+PYTHON_VERSION = sys.version_info[:2]
+_HEADER = bytes((BINARY_MAGIC, BINARY_FORMAT_VERSION) + PYTHON_VERSION)
+_HEADER_SIZE = len(_HEADER)
+
+# 打包结构中元组只用于扩展类型，首元素为标记
+_OBJECT, _LIST, _DICT, _TUPLE, _UUID, _DATETIME, _DATE, _DECIMAL, _SET, _FROZENSET = range(10)
+_PLAIN_TYPES = frozenset((str, int, float, bool, bytes, type(None)))
+
+# 默认注册的领域类型所在模块：其中的数据类全部注册
+DOMAIN_TYPE_MODULES = (
+    "src.domain.core.value_objects",
+    "src.domain.fortune.entities",
+    "src.domain.jewelry.entities",
+    "src.domain.commerce.events",
+    "src.domain.compliance.events",
+    "src.domain.fortune.events",
+    "src.domain.healing.events",
+    "src.domain.jewelry.events",
+    "src.domain.spiritual.events",
+    "src.domain.user.events",
+)
+
+
+class CodecError(ValueError):
+    """数据无法编码，或缓存/消息数据格式、模式版本不符"""
+
+
+class Codec(ABC):
+    """编解码器接口"""
+    name = ""
+
+    @abstractmethod
+    def encode(self, value: Any) -> bytes:
+        """编码为字节串，无法编码时抛出 CodecError"""
+        pass
+
+    @abstractmethod
+    def decode(self, data: bytes) -> Any:
+        """从字节串解码，数据格式不符时抛出 CodecError"""
+        pass
+
+
+class JsonCodec(Codec):
+    name = "json"
+
+    def encode(self, value: Any) -> bytes:
+        try:
+            return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        except TypeError as e:
+            raise CodecError(str(e)) from e
+
+    def decode(self, data: bytes) -> Any:
+        return json.loads(data)
+
+
+def _type_name(annotation: Any) -> str:
+    """字段类型注解的稳定文本（字符串注解原样使用，类按模块路径，泛型按 typing 的表示）"""
+    if isinstance(annotation, str):
+        return annotation
+    if isinstance(annotation, type):
+        return f"{annotation.__module__}.{annotation.__qualname__}"
+    return repr(annotation)
+
+
+class _Schema:
+    __slots__ = ("cls", "name", "type_id", "version", "fingerprint", "fields", "values")
+
+    def __init__(self, cls: Type, name: str, version: int):
+        self.cls = cls
+        self.name = name
+        self.type_id = zlib.crc32(name.encode("utf-8"))
+        self.version = version
+        dataclass_fields = fields(cls)
+        self.fields = tuple(f.name for f in dataclass_fields)
+        signature = ";".join(f"{f.name}:{_type_name(f.type)}" for f in dataclass_fields)
+        self.fingerprint = zlib.crc32(f"{version}|{signature}".encode("utf-8"))
+        getter = operator.attrgetter(*self.fields) if self.fields else (lambda obj: ())
+        self.values = getter if len(self.fields) != 1 else (lambda obj: (getter(obj),))
+
+
+class BinaryCodec(Codec):
+    name = "binary"
+
+    def __init__(self, type_modules: Tuple[str, ...] = DOMAIN_TYPE_MODULES):
+        self._by_class: Dict[Type, _Schema] = {}
+        self._by_id: Dict[int, _Schema] = {}
+        self._type_modules = type_modules
+        self._modules_loaded = not type_modules
+
+    def register(self, cls: Type, version: int = 1, name: Optional[str] = None) -> None:
+        """
+        注册数据类；name 默认为类路径，类移动模块后可传原路径保持类型编号不变。
+        字段名与类型注解的变化由模式指纹自动识别，version 只在字段语义变化而名称、类型不变时提升
+        """
+        if not is_dataclass(cls):
+            raise TypeError(f"{cls.__name__} is not a dataclass")
+        schema = _Schema(cls, name or f"{cls.__module__}.{cls.__qualname__}", version)
+        existing = self._by_id.get(schema.type_id)
+        if existing is not None and existing.cls is not cls:
+            raise ValueError(f"Type id collision between {existing.name} and {schema.name}")
+        self._by_class[cls] = schema
+        self._by_id[schema.type_id] = schema
+
+    def encode(self, value: Any) -> bytes:
+        # 不直接 marshal 原始数据：marshal 会把 NumPy 标量等支持缓冲区协议的对象写成 bytes
+        try:
+            return _HEADER + marshal.dumps(self._pack(value), MARSHAL_VERSION)
+        except ValueError as e:
+            raise CodecError(str(e)) from e
+
+    def decode(self, data: bytes) -> Any:
+        if len(data) < _HEADER_SIZE or data[0] != BINARY_MAGIC:
+            raise CodecError("Not binary codec data")
+        if data[1] != BINARY_FORMAT_VERSION:
+            raise CodecError(f"Unsupported binary format version {data[1]}")
+        if tuple(data[2:_HEADER_SIZE]) != PYTHON_VERSION:
+            raise CodecError(f"Binary data written by Python {data[2]}.{data[3]}, "
+                             f"running {PYTHON_VERSION[0]}.{PYTHON_VERSION[1]}")
+        try:
+            packed = marshal.loads(memoryview(data)[_HEADER_SIZE:])
+        except (EOFError, TypeError, ValueError) as e:
+            raise CodecError(f"Corrupt binary codec data: {e}") from e
+        return self._unpack(packed) if type(packed) is tuple else packed
+
+    def _pack(self, value: Any) -> Any:
+        """转换为 marshal 原生结构。扩展类型打包为首元素是标记的元组；
+        列表、字典中任意一层含扩展类型时整体包成标记元组，不含时原样保留，解码时无需遍历"""
+        t = type(value)
+        if t in _PLAIN_TYPES:
+            return value
+        pack, plain = self._pack, _PLAIN_TYPES
+        if t is list and plain.issuperset(map(type, value)):
+            return value
+        if t is dict and plain.issuperset(map(type, value.values())) and plain.issuperset(map(type, value)):
+            return value
+        if isinstance(value, list):
+            items = [v if type(v) in plain else pack(v) for v in value]
+            return (_LIST, items) if tuple in map(type, items) else items
+        if isinstance(value, dict):
+            items = {(k if type(k) in plain else pack(k)): (v if type(v) in plain else pack(v))
+                     for k, v in value.items()}
+            tagged = tuple in map(type, items) or tuple in map(type, items.values())
+            return (_DICT, items) if tagged else items
+        schema = self._schema_for(t)
+        if schema is not None:
+            return (_OBJECT, schema.type_id, schema.fingerprint) + tuple(
+                [v if type(v) in plain else pack(v) for v in schema.values(value)])
+        if t is tuple:
+            return (_TUPLE,) + tuple([pack(v) for v in value])
+        if t is uuid.UUID:
+            return _UUID, value.bytes
+        if t is datetime.datetime:
+            return _DATETIME, value.isoformat()
+        if t is datetime.date:
+            return _DATE, value.toordinal()
+        if t is decimal.Decimal:
+            return _DECIMAL, str(value)
+        if t is set or t is frozenset:
+            return (_SET if t is set else _FROZENSET), [pack(v) for v in value]
+        # 内置类型的子类（如NumPy标量）按基础类型写出
+        if isinstance(value, str):
+            return str(value)
+        if isinstance(value, numbers.Integral):
+            return int(value)
+        if isinstance(value, numbers.Real):
+            return float(value)
+        # 其余NumPy标量（如 np.bool_ 不属于 numbers.Integral）转换为对应的Python值
+        if t.__module__ == "numpy" and getattr(value, "ndim", None) == 0:
+            return pack(value.item())
+        raise CodecError(f"Cannot encode value of type {t.__name__}")
+
+    def _unpack(self, packed: tuple) -> Any:
+        """还原标记元组（打包结构中只有元组需要还原）"""
+        tag = packed[0]
+        unpack = self._unpack
+        if tag == _OBJECT:
+            return self._unpack_object(packed)
+        if tag == _LIST:
+            return [unpack(v) if type(v) is tuple else v for v in packed[1]]
+        if tag == _DICT:
+            return {(unpack(k) if type(k) is tuple else k): (unpack(v) if type(v) is tuple else v)
+                    for k, v in packed[1].items()}
+        if tag == _UUID:
+            return uuid.UUID(bytes=packed[1])
+        if tag == _DATETIME:
+            return datetime.datetime.fromisoformat(packed[1])
+        if tag == _TUPLE:
+            return tuple([unpack(v) if type(v) is tuple else v for v in packed[1:]])
+        if tag == _DATE:
+            return datetime.date.fromordinal(packed[1])
+        if tag == _DECIMAL:
+            return decimal.Decimal(packed[1])
+        if tag == _SET:
+            return {unpack(v) if type(v) is tuple else v for v in packed[1]}
+        if tag == _FROZENSET:
+            return frozenset(unpack(v) if type(v) is tuple else v for v in packed[1])
+        raise CodecError(f"Unknown binary codec tag {tag}")
+
+    def _unpack_object(self, packed: tuple) -> Any:
+        type_id, fingerprint = packed[1], packed[2]
+        schema = self._by_id.get(type_id)
+        if schema is None:
+            self._load_type_modules()
+            schema = self._by_id.get(type_id)
+        if schema is None:
+            raise CodecError(f"Unknown type id {type_id}")
+        if fingerprint != schema.fingerprint:
+            raise CodecError(f"{schema.name} schema fingerprint {fingerprint:08x} does not match registered "
+                             f"schema {schema.fingerprint:08x}")
+        if len(packed) - 3 != len(schema.fields):
+            raise CodecError(f"Corrupt {schema.name} data: {len(packed) - 3} values for "
+                             f"{len(schema.fields)} fields")
+        unpack = self._unpack
+        kwargs = {name: (unpack(v) if type(v) is tuple else v) for name, v in zip(schema.fields, packed[3:])}
+        try:
+            return schema.cls(**kwargs)
+        except TypeError as e:
+            raise CodecError(f"Cannot construct {schema.name}: {e}") from e
+
+    def _schema_for(self, t: Type) -> Optional[_Schema]:
+        schema = self._by_class.get(t)
+        if schema is None and not self._modules_loaded and is_dataclass(t):
+            self._load_type_modules()
+            schema = self._by_class.get(t)
+        return schema
+
+    def _load_type_modules(self) -> None:
+        """首次遇到未注册的数据类时导入并注册默认领域类型（避免基础设施层导入时加载领域模块）"""
+        if self._modules_loaded:
+            return
+        import importlib
+        import inspect
+
+        for module_name in self._type_modules:
+            module = importlib.import_module(module_name)
+            for _, cls in inspect.getmembers(module, inspect.isclass):
+                # 抽象聚合根（未实现领域事件方法）无法实例化，不注册
+                if (cls.__module__ == module_name and is_dataclass(cls) and not inspect.isabstract(cls)
+                        and cls not in self._by_class):
+                    self.register(cls)
+        self._modules_loaded = True
+
+
+json_codec = JsonCodec()
+# 进程级二进制编解码器（默认注册领域类型）
+binary_codec = BinaryCodec()
@@ -1,46 +1,265 @@
+"""
+动态配置服务
+两级缓存：进程内配置快照（本地层）在前，共享 CacheManager（共享层）在后，最后回源数据库。
+稳态下 get_config 只是一次字典读取。
+
+update_config 写库后删除共享层键，并通过消息通道广播失效消息，
+各进程收到后从本地快照中移除该键，下次读取重新加载。
+本地快照按写时复制替换整个字典，读取不加锁；快照版本号在每次变更时递增。
+加载期间若发生过失效，加载结果只返回不写入本地层，避免并发加载的旧值覆盖失效。
+
+批量读取：get_configs / get_prefix 对未命中的键只发一条查询，结果一次性写入两级缓存；
+load_snapshot（或构造时 preload=True）在启动时一次加载全部配置，
+快照完整时 get_prefix 直接由本地快照回答，冷启动的进程不再逐键查询数据库。
+全量加载后被失效的键记为待重载，只重新加载这些键，快照仍视为完整；
+完整快照中不存在的键视为负缓存（自全量加载起 negative_ttl 内有效），
+过期后回源一次，绕过 update_config 直接写库的新键最迟 negative_ttl 后可见。
+
+过期处理（stale-while-revalidate）：本地条目超过 local_ttl（防止漏收失效消息）后仍先返回旧值，
+同时在后台线程刷新，读取不会因过期而阻塞在数据库上；只有本地从未加载过的键才同步回源。
+数据库中不存在的键同样记入本地快照（负缓存，有效期 negative_ttl），
+未配置的键不会让每次请求都查询数据库。
+"""
+
 import json
-from sqlalchemy.orm import Session
-from src.infrastructure.persistence.orm.system_config import SystemConfig
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
 from src.domain.core.exceptions import ConfigNotFoundError
+from src.infrastructure.messaging.message_broker_client import MessageBrokerClient
 from src.infrastructure.utils.cache_manager import CacheManager  # 引入缓存管理器
-import logging
 
 logger = logging.getLogger(__name__)
 
+CONFIG_INVALIDATION_CHANNEL = "dynamic_config:invalidate"
+
+# 负缓存标记：数据库中不存在的配置键
+_MISSING = object()
+
+
+def _config_model():
+    from src.infrastructure.persistence.orm.system_config import SystemConfigModel
+    return SystemConfigModel
+
 
 class DynamicConfigService:
-    def __init__(self, db_session_factory, cache_manager: CacheManager):
+    def __init__(self, db_session_factory, cache_manager: CacheManager,
+                 message_broker: Optional[MessageBrokerClient] = None,
+                 shared_ttl: int = 300, local_ttl: float = 60.0, negative_ttl: float = 30.0,
+                 channel: str = CONFIG_INVALIDATION_CHANNEL, preload: bool = False):
         self.db_session_factory = db_session_factory
         self.cache_manager = cache_manager
         self.config_cache_key_prefix = "dynamic_config:"
+        self.shared_ttl = shared_ttl
+        self.local_ttl = local_ttl
+        self.negative_ttl = negative_ttl
+        self.message_broker = message_broker
+        self.channel = channel
+        self.instance_id = uuid.uuid4().hex
+        # 本地快照：配置键 → (值或 _MISSING, 加载时刻)，只整体替换，不原地修改
+        self._snapshot: Dict[str, Tuple[Any, float]] = {}
+        self._snapshot_version = 0
+        self._invalidations = 0
+        # 全量快照的加载时刻，以及此后被失效、需要重新加载的键（整体替换）
+        self._complete_at: Optional[float] = None
+        self._pending_keys: frozenset = frozenset()
+        self._lock = threading.Lock()
+        # 后台刷新：同一批键同时只刷新一次
+        self._refresher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="config-refresh")
+        self._refreshing = set()
+        self._unsubscribe = None
+        if message_broker is not None:
+            self._unsubscribe = message_broker.subscribe(channel, self._on_invalidation)
+        if preload:
+            self.load_snapshot()
+
+    @property
+    def snapshot_version(self) -> int:
+        return self._snapshot_version
 
     def get_config(self, key):
-        cache_key = self.config_cache_key_prefix + key
-        # 尝试从缓存获取
-        cached_value = self.cache_manager.get(cache_key)
-        if cached_value is not None:
-            logger.debug(f"Config '{key}' retrieved from cache.")
-            return cached_value
-
-        # 缓存未命中，从数据库查询
+        entry = self._snapshot.get(key)
+        if entry is None:
+            if self._known_missing(key, time.monotonic()):
+                raise ConfigNotFoundError(key)
+            entry = self._load_keys([key])[key]
+        elif self._expired(entry, time.monotonic()):
+            self._refresh_in_background((key,))
+
+        if entry[0] is _MISSING:
+            raise ConfigNotFoundError(key)
+        return entry[0]
+
+    def get_configs(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """批量读取配置，数据库中不存在的键不出现在结果中"""
+        now = time.monotonic()
+        snapshot = self._snapshot
+        entries, missing, expired = {}, [], []
+        for key in dict.fromkeys(keys):
+            entry = snapshot.get(key)
+            if entry is not None:
+                entries[key] = entry
+                if self._expired(entry, now):
+                    expired.append(key)
+            elif not self._known_missing(key, now):
+                missing.append(key)
+        if expired:
+            self._refresh_in_background(tuple(expired))
+        if missing:
+            entries.update(self._load_keys(missing))
+        return {key: entry[0] for key, entry in entries.items() if entry[0] is not _MISSING}
+
+    def get_prefix(self, prefix: str) -> Dict[str, Any]:
+        """读取某前缀下的全部配置（如 "fortune."），一条查询完成"""
+        if self._snapshot_complete():
+            # 全量加载后被失效的键只重新加载这些键
+            pending = [key for key in self._pending_keys if key.startswith(prefix)]
+            if pending:
+                self._load_keys(pending)
+            if time.monotonic() - self._complete_at >= self.local_ttl:
+                self._refresh_in_background(None)
+            return {key: entry[0] for key, entry in self._snapshot.items()
+                    if key.startswith(prefix) and entry[0] is not _MISSING}
+
+        invalidations = self._invalidations
+        model = _config_model()
+        escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        loaded = self._load_rows(model.config_key.like(escaped + "%", escape="\\"))
+        self._install_many(loaded, invalidations)
+        return loaded
+
+    def load_snapshot(self) -> int:
+        """一次查询加载全部配置到两级缓存（进程启动时调用），返回配置条数"""
+        invalidations = self._invalidations
+        loaded = self._load_rows()
+        self._install_many(loaded, invalidations, complete=True)
+        logger.info(f"Loaded {len(loaded)} configs into local snapshot.")
+        return len(loaded)
+
+    def _snapshot_complete(self) -> bool:
+        return self._complete_at is not None
+
+    def _known_missing(self, key: str, now: float) -> bool:
+        """本地快照中没有该键时，能否不查库直接判定为不存在（完整快照的负缓存未过期）"""
+        return (self._complete_at is not None and key not in self._pending_keys
+                and now - self._complete_at < self.negative_ttl)
+
+    def _expired(self, entry: Tuple[Any, float], now: float) -> bool:
+        ttl = self.negative_ttl if entry[0] is _MISSING else self.local_ttl
+        return now - entry[1] >= ttl
+
+    def _load_keys(self, keys: List[str]) -> Dict[str, Tuple[Any, float]]:
+        """同步加载指定键（先共享层、再一条数据库查询），不存在的键记为负缓存"""
+        invalidations = self._invalidations
+        loaded = {}
+        for key in keys:
+            cached_value = self.cache_manager.get(self.config_cache_key_prefix + key)
+            if cached_value is not None:
+                loaded[key] = cached_value
+        not_cached = [key for key in keys if key not in loaded]
+        if not_cached:
+            model = _config_model()
+            loaded.update(self._load_rows(model.config_key.in_(not_cached)))
+            for key in not_cached:
+                if key not in loaded:
+                    logger.warning(f"Config '{key}' not found in database.")
+                    loaded[key] = _MISSING
+        return self._install_many(loaded, invalidations)
+
+    def _load_rows(self, *criteria) -> Dict[str, Any]:
+        """按条件查询配置行，解析后写入共享层"""
         with self.db_session_factory() as session:
-            config = session.query(SystemConfig).filter_by(config_key=key).first()
-            if not config:
-                logger.warning(f"Config '{key}' not found in database.")
-                raise ConfigNotFoundError(f"Config {key} not found")
+            rows: List[Any] = session.query(_config_model()).filter(*criteria).all()
+        values = {}
+        for config in rows:
+            try:
+                values[config.config_key] = self._parse_config(config)
+            except (TypeError, ValueError):
+                logger.exception(f"Config '{config.config_key}' has an invalid {config.config_type} value.")
+        for key, value in values.items():
+            self.cache_manager.set(self.config_cache_key_prefix + key, value, ttl=self.shared_ttl)
+        return values
+
+    def _refresh_in_background(self, keys: Optional[Tuple[str, ...]]) -> None:
+        """提交后台刷新（keys 为 None 表示重新加载全量快照），已在刷新中的不重复提交"""
+        with self._lock:
+            if keys in self._refreshing:
+                return
+            self._refreshing.add(keys)
+        try:
+            self._refresher.submit(self._refresh, keys)
+        except RuntimeError:
+            # 服务已关闭
+            with self._lock:
+                self._refreshing.discard(keys)
+
+    def _refresh(self, keys: Optional[Tuple[str, ...]]) -> None:
+        try:
+            if keys is None:
+                self.load_snapshot()
+            else:
+                # 刷新直接查库：共享层中的值可能与本地旧值同样陈旧
+                invalidations = self._invalidations
+                model = _config_model()
+                loaded = self._load_rows(model.config_key.in_(list(keys)))
+                loaded.update((key, _MISSING) for key in keys if key not in loaded)
+                self._install_many(loaded, invalidations)
+        except Exception:
+            # 刷新失败时继续使用旧值，下次读取再尝试
+            logger.exception(f"Background refresh of config {list(keys) if keys else 'snapshot'} failed")
+        finally:
+            with self._lock:
+                self._refreshing.discard(keys)
+
+    def _install_many(self, values: Dict[str, Any], invalidations: int,
+                      complete: bool = False) -> Dict[str, Tuple[Any, float]]:
+        """加载结果一次性写入本地快照并返回新条目；加载期间发生过失效时放弃写入"""
+        now = time.monotonic()
+        entries = {key: (value, now) for key, value in values.items()}
+        with self._lock:
+            if self._invalidations != invalidations:
+                return entries
+            if complete:
+                snapshot = entries
+                self._complete_at, self._pending_keys = now, frozenset()
+            else:
+                snapshot = dict(self._snapshot)
+                snapshot.update(entries)
+                if self._pending_keys:
+                    self._pending_keys = self._pending_keys.difference(entries)
+            self._snapshot = snapshot
+            self._snapshot_version += 1
+        return entries
 
-            # 解析并缓存
-            value = self._parse_config(config)
-            # 设置合理的缓存过期时间，或通过事件驱动进行失效
-            self.cache_manager.set(cache_key, value, ttl=300)  # 默认缓存5分钟
-            logger.info(f"Config '{key}' loaded from DB and cached.")
-            return value
+    def invalidate_local(self, *keys) -> None:
+        """从本地快照移除指定键（不传则清空）"""
+        with self._lock:
+            if keys:
+                snapshot = {k: v for k, v in self._snapshot.items() if k not in keys}
+                if self._complete_at is not None:
+                    self._pending_keys = self._pending_keys.union(keys)
+            else:
+                snapshot = {}
+                self._complete_at, self._pending_keys = None, frozenset()
+            self._snapshot = snapshot
+            self._snapshot_version += 1
+            self._invalidations += 1
+
+    def _on_invalidation(self, message: Dict[str, Any]) -> None:
+        keys = message.get("keys") or []
+        self.invalidate_local(*keys)
+        logger.debug(f"Config {keys} invalidated by {message.get('origin')}.")
 
     def update_config(self, key, new_value, config_type, description=None):
+        model = _config_model()
         with self.db_session_factory() as session:
-            config = session.query(SystemConfig).filter_by(config_key=key).first()
+            config = session.query(model).filter_by(config_key=key).first()
             if not config:
-                config = SystemConfig(config_key=key)
+                config = model(config_key=key)
                 session.add(config)
 
             config.config_value = str(new_value)
@@ -48,9 +267,26 @@ class DynamicConfigService:
             config.description = description
             session.commit()
 
-            # 缓存失效：当配置更新时，立即从缓存中移除旧值
-            self.cache_manager.delete(self.config_cache_key_prefix + key)
-            logger.info(f"Config '{key}' updated in DB and cache invalidated.")
+        # 缓存失效：先移除共享层旧值再清本地层（避免本进程从共享层重新读回旧值），再通知其他进程
+        self.cache_manager.delete(self.config_cache_key_prefix + key)
+        self.invalidate_local(key)
+        self._publish_invalidation([key])
+        logger.info(f"Config '{key}' updated in DB and cache invalidated.")
+
+    def _publish_invalidation(self, keys) -> None:
+        if self.message_broker is None:
+            return
+        try:
+            self.message_broker.publish(self.channel, {"keys": list(keys), "origin": self.instance_id})
+        except Exception:
+            # 通知失败时其他进程依靠本地层TTL兜底
+            logger.exception(f"Failed to publish invalidation for config {list(keys)}")
+
+    def close(self) -> None:
+        if self._unsubscribe is not None:
+            self._unsubscribe()
+            self._unsubscribe = None
+        self._refresher.shutdown(wait=False)
 
     def _parse_config(self, config):
         if config.config_type == 'json':
@@ -0,0 +1,23 @@
+# src/interfaces/workers/celery_app.py
+"""
+Celery 应用
+worker 启动命令：celery -A src.interfaces.workers.celery_app worker
+每个 prefork 工作进程启动时预热算法注册表，并为 configure_fortune_tasks 注册的
+命理计算服务预加载动态配置快照（见 monitoring.algorithm_warm_up）。
+"""
+
+import os
+
+from celery import Celery
+
+from src.application.tasks.fortune_tasks import configured_fortune_service
+from src.infrastructure.monitoring.algorithm_warm_up import init_algorithm_warm_up
+
+celery_app = Celery(
+    "metaphysical_jewelry",
+    broker=os.environ.get("CELERY_BROKER_URL", "redis://localhost:6379/0"),
+    backend=os.environ.get("CELERY_RESULT_BACKEND", "redis://localhost:6379/0"),
+    include=["src.application.tasks.fortune_tasks"],
+)
+
+init_algorithm_warm_up(celery_app=celery_app, fortune_service_factory=configured_fortune_service)
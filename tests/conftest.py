@@ -0,0 +1,4 @@
+import os
+
+# 代码仓库不含星历文件，测试使用 Swiss Ephemeris 内置的 Moshier 解析星历
+os.environ.setdefault("FORTUNE_EPHE_FALLBACK", "moshier")
@@ -0,0 +1,118 @@
+import uuid
+
+import pytest
+
+from src.application.services.fortune_batch_app_service import (
+    BatchJobProgress, FortuneBatchAppService, batch_analysis_id
+)
+from src.domain.core.value_objects import BirthData
+from src.domain.fortune.repositories import FortuneAnalysisRepository
+from src.infrastructure.utils.cache_manager import CacheManager, MemoryBackend
+
+BEIJING = {"longitude": 116.4, "latitude": 39.9}
+
+
+class FakeBirthDataRepository:
+    def __init__(self, births):
+        self.births = births
+
+    def find_by_user_ids(self, user_ids):
+        return {user_id: self.births[user_id] for user_id in user_ids if user_id in self.births}
+
+
+class FakeAnalysisRepository(FortuneAnalysisRepository):
+    """按ID存储的分析结果表；fail_on_save 指定第几次插入时模拟连接中断"""
+
+    def __init__(self, fail_on_save=None):
+        self.table = {}
+        self.saves = 0
+        self.fail_on_save = fail_on_save
+
+    def save(self, analysis):
+        self.saves += 1
+        if self.saves == self.fail_on_save:
+            raise ConnectionError("database connection lost")
+        self.table[analysis.id] = analysis
+
+    def update(self, analysis):
+        self.table[analysis.id] = analysis
+
+    def find_by_id(self, analysis_id):
+        return self.table.get(analysis_id)
+
+    def find_by_user_id(self, user_id):
+        return [analysis for analysis in self.table.values() if analysis.user_id == user_id]
+
+    def delete(self, analysis_id):
+        self.table.pop(analysis_id, None)
+
+    @property
+    def rows(self):
+        return list(self.table.values())
+
+
+def _births(count):
+    births = {}
+    for i in range(count):
+        location = BEIJING if i % 2 == 0 else {}
+        births[uuid.uuid4()] = BirthData(f"19{70 + i}-0{1 + i % 9}-1{i % 10}T0{i % 10}:30:00", location=location)
+    return births
+
+
+@pytest.fixture
+def batch_app(fortune_service_factory):
+    births = _births(7)
+    analyses = FakeAnalysisRepository()
+    app = FortuneBatchAppService(fortune_service_factory(), FakeBirthDataRepository(births), analyses,
+                                 checkpoint_store=CacheManager(MemoryBackend()), chunk_size=3)
+    return app, births, analyses
+
+
+def test_batch_app_service_runs_real_analyses(batch_app):
+    app, births, analyses = batch_app
+    user_ids = list(births) + [uuid.uuid4()]  # 最后一个用户未登记出生信息
+
+    progress = app.run("job-1", user_ids)
+
+    assert progress.completed and (progress.succeeded, progress.failed, progress.missing) == (7, 0, 1)
+    assert [analysis.user_id for analysis in analyses.rows] == list(births)
+    assert all(analysis.bazi_result.heavenly_stems for analysis in analyses.rows)
+    assert [bool(analysis.ziwei_result.life_palace) for analysis in analyses.rows] == \
+           [bool(births[analysis.user_id].location) for analysis in analyses.rows]
+
+
+def test_resume_after_mid_chunk_failure_does_not_duplicate_rows(fortune_service_factory):
+    births = _births(7)
+    checkpoints = CacheManager(MemoryBackend())
+    # 第二块（用户3-5）写入一行后连接中断：该块已部分写入，检查点仍停在第一块之后
+    analyses = FakeAnalysisRepository(fail_on_save=5)
+    app = FortuneBatchAppService(fortune_service_factory(), FakeBirthDataRepository(births), analyses,
+                                 checkpoint_store=checkpoints, chunk_size=3)
+    user_ids = list(births)
+
+    with pytest.raises(ConnectionError):
+        app.run("job-resume", user_ids)
+    assert len(analyses.rows) == 4
+    assert BatchJobProgress.from_dict(checkpoints.get("fortune_batch:checkpoint:job-resume")).next_offset == 3
+
+    progress = app.run("job-resume", user_ids)
+
+    assert progress.completed and (progress.succeeded, progress.failed) == (7, 0)
+    assert sorted(analysis.user_id for analysis in analyses.rows) == sorted(user_ids)
+    assert {analysis.id for analysis in analyses.rows} == {batch_analysis_id("job-resume", u) for u in user_ids}
+
+
+def test_celery_task_runs_batch_through_app_service(batch_app):
+    pytest.importorskip("celery")
+    from src.application.tasks import fortune_tasks
+
+    app, births, analyses = batch_app
+    fortune_tasks.configure_fortune_tasks(lambda: app)
+    try:
+        result = fortune_tasks.calculate_fortune_analysis_batch.apply(
+            args=("job-task", [str(user_id) for user_id in births])).get()
+    finally:
+        fortune_tasks.configure_fortune_tasks(None)
+
+    assert result["completed"] and result["succeeded"] == len(births)
+    assert sorted(analysis.user_id for analysis in analyses.rows) == sorted(births)
@@ -0,0 +1,54 @@
+import pytest
+
+from src.domain.core.exceptions import ConfigNotFoundError
+from src.domain.fortune.algorithm_registry import AlgorithmRegistry
+from src.domain.fortune.analysis_executor import AnalysisExecutor
+from src.domain.fortune.repositories import AlgorithmMetadata
+from src.domain.fortune.services import FortuneCalculationService
+from src.domain.fortune.shadow_execution import ShadowRunner
+
+
+class FakeAlgorithmRepository:
+    def __init__(self, algorithms):
+        self.algorithms = algorithms
+
+    def get_algorithm_metadata(self, algorithm_type, version=None):
+        return next((m for m in self.algorithms
+                     if m.algorithm_type == algorithm_type and m.version == version), None)
+
+    def list_algorithms(self, algorithm_type=None):
+        return list(self.algorithms)
+
+
+class FakeConfigService:
+    def __init__(self, configs=None):
+        self.configs = configs or {}
+
+    def get_config(self, key):
+        if key not in self.configs:
+            raise ConfigNotFoundError(key)
+        return self.configs[key]
+
+
+BUILTIN_ALGORITHMS = [
+    AlgorithmMetadata("bazi", "v1.0", "src.domain.fortune.algorithms.bazi_batch"),
+    AlgorithmMetadata("ziwei", "v1.0", "src.domain.fortune.algorithms.ziwei"),
+]
+
+
+@pytest.fixture
+def fortune_service_factory():
+    created = []
+
+    def build(mode="serial", configs=None, algorithms=BUILTIN_ALGORITHMS):
+        executor = AnalysisExecutor(mode=mode, max_workers=2)
+        shadow = ShadowRunner(max_workers=1)
+        service = FortuneCalculationService(FakeAlgorithmRepository(algorithms), FakeConfigService(configs),
+                                            registry=AlgorithmRegistry(), executor=executor, shadow=shadow)
+        created.append(service)
+        return service
+
+    yield build
+    for service in created:
+        service.executor.shutdown()
+        service.shadow.shutdown()
@@ -0,0 +1,92 @@
+import sys
+import types
+
+import pytest
+
+from src.domain.core.exceptions import AlgorithmNotFoundError
+from src.domain.fortune.algorithm_registry import AlgorithmRegistry
+from src.domain.fortune.repositories import AlgorithmMetadata
+
+
+class FakeAlgorithmRepository:
+    def __init__(self, algorithms):
+        self.algorithms = algorithms
+        self.metadata_calls = 0
+
+    def get_algorithm_metadata(self, algorithm_type, version=None):
+        self.metadata_calls += 1
+        return next((m for m in self.algorithms
+                     if m.algorithm_type == algorithm_type and m.version == version), None)
+
+    def list_algorithms(self, algorithm_type=None):
+        return list(self.algorithms)
+
+
+@pytest.fixture
+def fake_bazi_module(monkeypatch):
+    module = types.ModuleType("fake_bazi_v1")
+    module.calls = []
+    module.calculate = lambda data: module.calls.append(data) or {}
+    monkeypatch.setitem(sys.modules, "fake_bazi_v1", module)
+    return module
+
+
+def test_registry_resolves_metadata_once(fake_bazi_module):
+    repo = FakeAlgorithmRepository([AlgorithmMetadata("bazi", "v1.0", "fake_bazi_v1")])
+    registry = AlgorithmRegistry()
+
+    assert registry.get("bazi", "v1.0", repo) is fake_bazi_module
+    assert registry.get("bazi", "v1.0", repo) is fake_bazi_module
+    assert repo.metadata_calls == 1
+
+    registry.evict("bazi", "v1.0")
+    registry.get("bazi", "v1.0", repo)
+    assert repo.metadata_calls == 2
+
+    with pytest.raises(AlgorithmNotFoundError):
+        registry.get("bazi", "v9.9", repo)
+
+
+def test_warm_up_reports_readiness(fake_bazi_module):
+    repo = FakeAlgorithmRepository([
+        AlgorithmMetadata("bazi", "v1.0", "fake_bazi_v1"),
+        AlgorithmMetadata("bazi", "v0.9", "missing.module", is_active=False),
+    ])
+    registry = AlgorithmRegistry()
+    assert registry.readiness()["ready"]  # 未登记启动预热
+    registry.expect_warm_up()
+    assert not registry.readiness()["ready"]
+
+    status = registry.warm_up(repo)
+    assert status["ready"] and status["loaded"] == ["bazi_v1.0"]
+    assert len(fake_bazi_module.calls) == 1  # 预置命盘
+
+    broken = FakeAlgorithmRepository([AlgorithmMetadata("ziwei", "v1.0", "missing.module")])
+    status = AlgorithmRegistry().warm_up(broken)
+    assert not status["ready"] and "ziwei_v1.0" in status["errors"]
+
+
+def test_failed_canned_chart_is_reported_through_readiness(fake_bazi_module, monkeypatch):
+    def broken(data):
+        raise ValueError("solar term table missing")
+
+    monkeypatch.setattr(fake_bazi_module, "calculate", broken)
+    repo = FakeAlgorithmRepository([AlgorithmMetadata("bazi", "v1.0", "fake_bazi_v1")])
+
+    status = AlgorithmRegistry().warm_up(repo)
+
+    assert status["warmed"] and not status["ready"]
+    assert status["loaded"] == ["bazi_v1.0"] and "solar term table missing" in status["errors"]["bazi_v1.0"]
+
+
+def test_builtin_warm_up_calculates_a_ziwei_chart(monkeypatch):
+    from src.domain.fortune.algorithms import ziwei
+
+    charts = []
+    calculate = ziwei.ZiWeiCalculator.calculate
+    monkeypatch.setattr(ziwei.ZiWeiCalculator, "calculate",
+                        lambda self, *args: charts.append(calculate(self, *args)) or charts[-1])
+
+    status = AlgorithmRegistry().warm_up()
+
+    assert status["ready"] and len(charts) == 1 and charts[0]["chart"]["hash"]
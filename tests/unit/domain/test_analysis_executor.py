@@ -0,0 +1,137 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+from src.domain.core.exceptions import AlgorithmTimeoutError
+from src.domain.fortune.analysis_executor import AnalysisExecutor
+
+
+def calculate(data):
+    """进程池测试用的算法入口，spin 为纯Python循环次数（计算期间持有GIL）"""
+    time.sleep(data.get("sleep", 0))
+    total = 0
+    for i in range(data.get("spin", 0)):
+        total += i * i
+    return {"value": data["value"] * 2}
+
+
+def _timed_gather(executor, work):
+    """以 bazi、ziwei 两项分析并行执行同一份CPU密集计算，返回耗时"""
+    module = sys.modules[__name__]
+    started = time.perf_counter()
+    executor.gather({t: (lambda t=t: executor.calculate(t, module, work)) for t in ("bazi", "ziwei")})
+    return time.perf_counter() - started
+
+
+def _single_run(work):
+    started = time.perf_counter()
+    calculate(work)
+    return time.perf_counter() - started
+
+
+def test_thread_mode_runs_analyses_concurrently():
+    executor = AnalysisExecutor(mode="thread", max_workers=2)
+    started = time.perf_counter()
+    results = executor.gather({
+        "bazi": lambda: time.sleep(0.3) or "bazi",
+        "ziwei": lambda: time.sleep(0.3) or "ziwei"
+    })
+    elapsed = time.perf_counter() - started
+    executor.shutdown()
+
+    assert results == {"bazi": "bazi", "ziwei": "ziwei"}
+    assert elapsed < 0.5
+
+
+def test_timeout_does_not_wait_for_slower_analyses():
+    executor = AnalysisExecutor(mode="thread", max_workers=1, timeouts={"bazi": 0.1, "ziwei": 5.0})
+    release = threading.Event()
+    started = time.perf_counter()
+
+    with pytest.raises(AlgorithmTimeoutError):
+        executor.gather({"bazi": lambda: release.wait(2), "ziwei": lambda: release.wait(2)})
+    assert time.perf_counter() - started < 0.5
+    release.set()
+    executor.shutdown()
+
+
+def test_process_mode_calculates_in_worker():
+    executor = AnalysisExecutor(mode="process", max_workers=1, timeouts={"bazi": 0.5})
+    module = sys.modules[__name__]
+    try:
+        assert executor.calculate("ziwei", module, {"value": 21}) == {"value": 42}
+        with pytest.raises(AlgorithmTimeoutError):
+            executor.calculate("bazi", module, {"value": 1, "sleep": 2})
+    finally:
+        executor.shutdown(wait=False)
+
+
+@pytest.mark.parametrize("mode", ["thread", "serial"])
+def test_calculate_enforces_timeout_in_every_mode(mode):
+    executor = AnalysisExecutor(mode=mode, max_workers=1, timeouts={"bazi": 0.1})
+    module = sys.modules[__name__]
+    started = time.perf_counter()
+
+    with pytest.raises(AlgorithmTimeoutError):
+        executor.calculate("bazi", module, {"value": 1, "sleep": 1})
+    assert time.perf_counter() - started < 0.5
+    executor.shutdown(wait=False)
+
+
+@pytest.mark.parametrize("mode", ["thread", "serial"])
+def test_gather_enforces_timeout_for_single_and_serial_tasks(mode):
+    executor = AnalysisExecutor(mode=mode, max_workers=1, timeouts={"bazi": 0.1})
+    release = threading.Event()
+    started = time.perf_counter()
+
+    with pytest.raises(AlgorithmTimeoutError):
+        executor.gather({"bazi": lambda: release.wait(2)})
+    with pytest.raises(AlgorithmTimeoutError):
+        executor.gather({"ziwei": lambda: "ziwei", "bazi": lambda: release.wait(2)})
+    assert time.perf_counter() - started < 0.5
+    assert executor.gather({"ziwei": lambda: "ziwei"}) == {"ziwei": "ziwei"}
+    release.set()
+    executor.shutdown()
+
+
+def test_process_mode_keeps_other_types_in_threads():
+    executor = AnalysisExecutor(mode="process", max_workers=1)
+    try:
+        assert executor.calculate("face", sys.modules[__name__], {"value": 4}) == {"value": 8}
+        assert executor._process_pool is None
+    finally:
+        executor.shutdown()
+
+
+def test_benchmark_thread_mode_serializes_cpu_bound_analyses():
+    """基准：纯Python计算持有GIL，线程模式下两项分析的耗时接近两次单独计算之和"""
+    work = {"value": 1, "spin": 1_000_000}
+    executor = AnalysisExecutor(mode="thread", max_workers=2, default_timeout=60.0, timeouts={"bazi": 60.0})
+    try:
+        # 单次计算与两项并行交替计时，取比值的中位数，排除其他进程（如前序测试退出中的工作进程）的干扰
+        ratios = sorted(_timed_gather(executor, work) / _single_run(work) for _ in range(5))
+    finally:
+        executor.shutdown()
+
+    assert ratios[2] > 1.5, ratios
+
+
+@pytest.mark.skipif((os.cpu_count() or 1) < 2, reason="需要至少2个CPU核心")
+def test_benchmark_process_mode_runs_cpu_bound_analyses_in_parallel():
+    """基准：进程模式下两项CPU密集分析在不同核心上同时计算，耗时明显低于线程模式"""
+    work = {"value": 1, "spin": 1_000_000}
+    timeouts = {"bazi": 60.0, "ziwei": 60.0}
+    threaded = AnalysisExecutor(mode="thread", max_workers=2, timeouts=timeouts)
+    processes = AnalysisExecutor(mode="process", max_workers=2, timeouts=timeouts)
+    try:
+        # 先启动两个工作进程并完成预热，只比较计算耗时
+        _timed_gather(processes, {"value": 1, "sleep": 0.5})
+        ratios = sorted(_timed_gather(processes, work) / _timed_gather(threaded, work) for _ in range(5))
+    finally:
+        threaded.shutdown()
+        processes.shutdown(wait=False)
+
+    assert ratios[2] < 0.8, ratios
@@ -0,0 +1,92 @@
+from src.domain.fortune.chart_cache import ChartCache, chart_key
+
+
+class DictCache:
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ttl=None):
+        self.data[key] = value
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+
+BIRTH = {"birth_datetime": "1990-05-01T08:30:00", "location": {"lat": 39.9042, "lon": 116.4074},
+         "timezone": "Asia/Shanghai"}
+
+
+def test_chart_key_is_canonical():
+    reordered = {"timezone": " Asia/Shanghai", "location": {"lon": 116.4074000000001, "lat": 39.9042},
+                 "birth_datetime": "1990-05-01 08:30"}
+    assert chart_key("bazi", "v1.0", BIRTH) == chart_key("bazi", "v1.0", reordered)
+    assert chart_key("bazi", "v1.0", BIRTH) != chart_key("bazi", "v2.0", BIRTH)
+    assert chart_key("bazi", "v1.0", BIRTH) != chart_key("bazi", "v1.0", BIRTH, constants_digest="other")
+
+
+def test_chart_cache_tiers_and_invalidation():
+    shared = DictCache()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {"heavenly_stems": ["庚", "辛", "壬", "癸"]}
+
+    cache = ChartCache(shared_cache=shared)
+    first = cache.get_or_compute("bazi", "v1.0", BIRTH, compute)
+    first["heavenly_stems"].append("甲")  # 调用方修改结果不影响缓存
+    assert cache.get_or_compute("bazi", "v1.0", BIRTH, compute) == {"heavenly_stems": ["庚", "辛", "壬", "癸"]}
+
+    # 其他进程的进程内缓存为空，从共享缓存命中
+    other = ChartCache(shared_cache=shared)
+    other.get_or_compute("bazi", "v1.0", BIRTH, compute)
+    assert len(calls) == 1
+    assert other.stats()["shared_hits"] == 1
+
+    assert cache.invalidate_version("bazi", "v1.0") == 1
+    cache.get_or_compute("bazi", "v1.0", BIRTH, compute)
+    assert len(calls) == 2
+
+    stats = cache.stats()
+    assert stats["local_hits"] == 1 and stats["misses"] == 2
+    assert stats["hit_ratio"] == round(1 / 3, 4)
+
+
+def test_local_tier_is_bounded_lru_with_ttl():
+    cache = ChartCache(max_entries=2, local_ttl=60)
+    births = [dict(BIRTH, birth_datetime=f"1990-05-0{day}T08:30:00") for day in (1, 2, 3)]
+    for birth in births:
+        cache.get_or_compute("bazi", "v1.0", birth, lambda: {"ok": True})
+    assert cache.stats()["local_size"] == 2
+
+    # 最久未使用的第一张命盘已被淘汰
+    cache.get_or_compute("bazi", "v1.0", births[0], lambda: {"ok": True})
+    assert cache.stats()["misses"] == 4
+
+    expired = ChartCache(local_ttl=0)
+    expired.get_or_compute("bazi", "v1.0", BIRTH, lambda: {"ok": True})
+    expired.get_or_compute("bazi", "v1.0", BIRTH, lambda: {"ok": True})
+    assert expired.stats()["misses"] == 2
+
+
+def test_invalidation_during_generation_read_is_not_cached():
+    class InvalidatingCache(DictCache):
+        """读取代次号时模拟另一线程同时失效该版本"""
+        def get(self, key):
+            value = super().get(key)
+            if key.endswith("gen:bazi:v1.0") and self.invalidate:
+                self.invalidate = False
+                cache.invalidate_version("bazi", "v1.0")
+            return value
+
+    shared = InvalidatingCache()
+    shared.invalidate = True
+    cache = ChartCache(shared_cache=shared)
+
+    stale_key = cache._shared_key("bazi", "v1.0", "k")
+    assert stale_key.endswith(":0:k")  # 失效前读到的旧代次号只用于本次调用
+    fresh_key = cache._shared_key("bazi", "v1.0", "k")
+    assert fresh_key == f"fortune_chart:bazi:v1.0:{shared.data['fortune_chart:gen:bazi:v1.0']}:k"
@@ -0,0 +1,51 @@
+import uuid
+
+import numpy as np
+
+from src.domain.fortune.algorithms.bazi import calculate_bazi
+from src.domain.fortune.compatibility import (
+    CompatibilityIndex, chart_features, features_from_bazi, interaction_matrix
+)
+
+
+def _random_index(n, seed=7):
+    rng = np.random.default_rng(seed)
+    features = chart_features(rng.dirichlet(np.ones(5), n).round(2), rng.integers(0, 10, n), rng.integers(0, 12, n))
+    return CompatibilityIndex([uuid.UUID(int=i + 1) for i in range(n)], features)
+
+
+def test_blocked_top_k_matches_brute_force():
+    index = _random_index(2000)
+    queries = [0, 17, 1999]
+    mask = np.ones(len(index), dtype=bool)
+    mask[::3] = False
+
+    rows, scores = index.top_k(index.features[queries], k=15, candidate_mask=mask, exclude_rows=queries,
+                               max_block_elements=3 * 128)
+
+    full = index.scores(index.features[queries])
+    full[:, ~mask] = -np.inf
+    full[np.arange(3), queries] = -np.inf
+    assert np.allclose(scores, -np.sort(-full, axis=1)[:, :15])
+    assert np.allclose(np.take_along_axis(full, rows, axis=1), scores)
+    assert mask[rows].all() and (rows != np.array(queries)[:, None]).all()
+
+
+def test_score_is_symmetric_and_index_round_trips(tmp_path):
+    matrix = interaction_matrix()
+    assert np.array_equal(matrix, matrix.T)
+
+    index = _random_index(50)
+    index.save(str(tmp_path / "compat"))
+    loaded = CompatibilityIndex.load(str(tmp_path / "compat"))
+    user = uuid.UUID(int=1)
+    assert loaded.top_k_for_users([user], k=3) == index.top_k_for_users([user], k=3)
+    assert all(candidate != user for candidate, _ in loaded.top_k_for_users([user], k=49)[user])
+
+
+def test_features_from_scalar_chart():
+    bazi = calculate_bazi({"birth_datetime": "1990-05-15T10:30:00", "gender": "male"})
+    features = features_from_bazi(bazi)
+    # 日干庚、年支午
+    assert features[10 + 6] == 1.0 and features[20 + 6] == 1.0
+    assert np.isclose(features[:5].sum(), 1.0, atol=0.02)
@@ -0,0 +1,71 @@
+import datetime
+import random
+
+import numpy as np
+import swisseph as swe
+
+from src.domain.fortune.algorithms import ephemeris_batch
+from src.domain.fortune.algorithms.ziwei import ZiWeiCalculator
+
+
+def test_batch_planet_positions_match_scalar_calls():
+    ephemeris_batch.clear_cache()
+    jds = 2447892.5 + np.linspace(0, 3650, 500)
+    jds = np.concatenate([jds, jds[:50]])  # 重复时刻只计算一次
+    positions = ephemeris_batch.planet_positions(jds)
+
+    assert len(positions) == len(jds)
+    assert len(ephemeris_batch._cache) == 500
+    for i in range(0, len(jds), 37):
+        jd = jds[i]
+        assert abs(positions.sun_longitude[i] - swe.calc_ut(jd, swe.SUN)[0][0]) < 1e-3
+        assert abs(positions.moon_longitude[i] - swe.calc_ut(jd, swe.MOON)[0][0]) < 1e-2
+        assert abs(positions.sidereal_time[i] - swe.sidtime(jd)) < 1e-3
+        assert ephemeris_batch.planet_position(jd) == (positions.sun_longitude[i], positions.moon_longitude[i],
+                                                        positions.sidereal_time[i])
+
+
+def _cohort_records(count, seed=20240815):
+    rng = random.Random(seed)
+    start = datetime.datetime(1950, 1, 1)
+    records = []
+    for _ in range(count):
+        birth = start + datetime.timedelta(minutes=rng.randrange(60 * 24 * 365 * 70))
+        records.append({
+            "birth_data": {"birth_datetime": birth.isoformat(), "gender": rng.choice(["male", "female"]),
+                           "timezone": rng.choice(["Asia/Shanghai", "Asia/Tokyo", "Europe/London"])},
+            "location_data": {"longitude": rng.uniform(-120, 140), "latitude": rng.uniform(-40, 60)}
+        })
+    return records
+
+
+def test_ziwei_cohort_matches_per_record_calculate(monkeypatch):
+    calculator = ZiWeiCalculator()
+    records = _cohort_records(40)
+
+    ephemeris_batch.clear_cache()
+    expected = [calculator.calculate(r["birth_data"], r["location_data"]) for r in records]
+
+    ephemeris_batch.clear_cache()
+    evaluated = []
+    evaluate = ephemeris_batch._evaluate
+    monkeypatch.setattr(ephemeris_batch, "_evaluate", lambda jd: evaluated.append(jd) or evaluate(jd))
+    cohort = calculator.calculate_cohort(records)
+
+    assert cohort == expected
+    assert all(len(chart["major_limits"]) == 12 for chart in cohort)
+    # 星历在批量预取时一次求出，逐张排盘全部命中缓存
+    assert len(evaluated) == len(records)
+
+
+def test_ziwei_cohort_accepts_records_without_location():
+    calculator = ZiWeiCalculator()
+    records = _cohort_records(3)
+    del records[0]["location_data"]
+    records[1]["location_data"] = None
+
+    cohort = calculator.calculate_cohort(records)
+
+    assert cohort[0] == calculator.calculate(records[0]["birth_data"], {})
+    assert cohort[1] == calculator.calculate(records[1]["birth_data"], {})
+    assert cohort[2] == calculator.calculate(records[2]["birth_data"], records[2]["location_data"])
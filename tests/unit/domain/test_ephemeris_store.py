@@ -0,0 +1,80 @@
+import os
+
+import pytest
+import swisseph as swe
+
+from src.domain.core.exceptions import EphemerisUnavailableError
+from src.domain.fortune.algorithms.ephemeris_store import EphemerisStore, build_store, file_sha256, verify_store
+
+FILES = ["sepl_18.se1", "semo_18.se1"]
+
+
+@pytest.fixture
+def source_dir(tmp_path):
+    source = tmp_path / "source"
+    source.mkdir()
+    for i, name in enumerate(FILES):
+        (source / name).write_bytes(bytes([i]) * 4096)
+    return source
+
+
+def test_build_and_verify_store(tmp_path, source_dir):
+    target = tmp_path / "ephe"
+    manifest = build_store(str(target), source_dir=str(source_dir), files=FILES)
+
+    assert set(manifest) == set(FILES)
+    assert manifest["sepl_18.se1"]["sha256"] == file_sha256(str(source_dir / "sepl_18.se1"))
+    assert verify_store(str(target)) == []
+
+    (target / "semo_18.se1").write_bytes(b"corrupted")
+    assert verify_store(str(target)) == ["semo_18.se1"]
+
+
+def test_build_store_rejects_checksum_mismatch(tmp_path, source_dir):
+    target = tmp_path / "ephe"
+    with pytest.raises(ValueError):
+        build_store(str(target), source_dir=str(source_dir), files=FILES,
+                    expected_checksums={"sepl_18.se1": "0" * 64})
+    assert not (target / "sepl_18.se1").exists()
+
+
+def test_store_maps_files_read_only(tmp_path, source_dir):
+    target = tmp_path / "ephe"
+    build_store(str(target), source_dir=str(source_dir), files=FILES)
+    store = EphemerisStore(str(target)).open()
+    try:
+        assert store.available
+        assert store._maps["semo_18.se1"][:2] == b"\x01\x01"
+    finally:
+        store.close()
+        swe.set_ephe_path(None)
+
+
+
+def test_store_without_manifest_fails_unless_fallback_allowed(tmp_path):
+    empty = tmp_path / "empty"
+    empty.mkdir()
+    with pytest.raises(EphemerisUnavailableError, match="manifest not found"):
+        EphemerisStore(str(empty)).open()
+
+    # 显式允许时回退到内置星历，不创建任何文件
+    assert not EphemerisStore(str(empty), allow_fallback=True).open().available
+    assert os.listdir(empty) == []
+    swe.set_ephe_path(None)
+
+
+def test_store_skips_empty_files(tmp_path, source_dir):
+    (source_dir / "semo_18.se1").write_bytes(b"")
+    target = tmp_path / "ephe"
+    build_store(str(target), source_dir=str(source_dir), files=FILES)
+
+    with pytest.raises(EphemerisUnavailableError, match="semo_18.se1 is empty"):
+        EphemerisStore(str(target)).open()
+
+    store = EphemerisStore(str(target), allow_fallback=True).open()
+    try:
+        assert list(store._maps) == ["sepl_18.se1"]
+    finally:
+        store.close()
+        swe.set_ephe_path(None)
+
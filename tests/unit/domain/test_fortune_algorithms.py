@@ -0,0 +1,439 @@
+import datetime
+import random
+
+import numpy as np
+import pytest
+
+from src.config import constants_compiled, constants_compiler
+from src.config.loader import CONSTANTS, load_constants, constants_digest
+from src.domain.fortune.algorithms.bazi import calculate_bazi, analyze_ten_gods
+from src.domain.fortune.algorithms.bazi_batch import calculate_batch, calculate_bazi_batch
+from src.domain.fortune.algorithms.ganzhi import (
+    HEAVENLY_STEMS, BRANCH_HIDDEN_STEMS, CYCLE_STEM, CYCLE_BRANCH, TEN_GODS, TEN_GOD_NAMES, UNKNOWN_GOD,
+    hidden_ten_god_codes
+)
+from src.domain.fortune.algorithms.luck_pillars import LUCK_PILLAR_COUNT
+
+TIMEZONES = ["Asia/Shanghai", "Asia/Tokyo", "Europe/London", "America/New_York", "UTC"]
+
+
+def _random_records(count, seed=20240601):
+    rng = random.Random(seed)
+    start = datetime.datetime(1801, 1, 1)
+    span = int((datetime.datetime(2199, 12, 31) - start).total_seconds())
+    records = []
+    for _ in range(count):
+        birth = start + datetime.timedelta(seconds=rng.randrange(span))
+        # 覆盖整点、子时与零点边界
+        if rng.random() < 0.2:
+            birth = birth.replace(hour=rng.choice([0, 23]), minute=0, second=0)
+        records.append({
+            "birth_datetime": birth.isoformat(),
+            "timezone": rng.choice(TIMEZONES),
+            "gender": rng.choice(["male", "female"])
+        })
+    return records
+
+
+def test_bazi_batch_matches_scalar_on_random_sample():
+    records = _random_records(3000)
+    result = calculate_bazi_batch(records)
+
+    assert len(result) == len(records)
+    for i, record in enumerate(records):
+        assert result.record(i) == calculate_bazi(record), record
+
+
+def test_bazi_batch_falls_back_outside_solar_term_table():
+    records = [
+        {"birth_datetime": "1795-03-01T08:00:00", "timezone": "Asia/Shanghai", "gender": "female"},
+        {"birth_datetime": "1990-05-15T10:30:00", "timezone": "Asia/Shanghai", "gender": "male"},
+    ]
+    result = calculate_bazi_batch(records)
+
+    assert result.to_dicts() == [calculate_bazi(r) for r in records]
+
+
+def test_bazi_batch_of_no_records_is_empty():
+    result = calculate_bazi_batch([])
+
+    assert len(result) == 0 and result.to_dicts() == []
+    assert result.stem_codes.shape == (0, 4) and result.luck_ages.shape == (0, LUCK_PILLAR_COUNT)
+    assert calculate_batch([]) == []
+
+
+def test_bazi_batch_rejects_invalid_datetime():
+    with pytest.raises(ValueError):
+        calculate_bazi_batch([{"birth_datetime": "not-a-date"}])
+
+
+def test_bazi_batch_handles_dst_transitions():
+    records = [
+        {"birth_datetime": "2021-10-31T01:30:00", "timezone": "Europe/London"},
+        {"birth_datetime": "2021-03-14T02:30:00", "timezone": "America/New_York"},
+        {"birth_datetime": "1988-04-10T02:30:00", "timezone": "Asia/Shanghai"},
+        {"birth_datetime": "1900-01-01T00:00:00", "timezone": "Asia/Shanghai"},
+    ]
+    result = calculate_bazi_batch(records)
+
+    assert result.to_dicts() == [calculate_bazi(r) for r in records]
+
+
+def test_ten_gods_table_matches_constants():
+    for day in range(10):
+        for other in range(10):
+            pair = HEAVENLY_STEMS[day] + HEAVENLY_STEMS[other]
+            expected = [name for name, pairs in CONSTANTS['TEN_GODS_MAP'].items() if pair in pairs]
+            assert [TEN_GOD_NAMES[TEN_GODS[day][other]]] == expected
+
+    bazi = {"heavenly_stems": ["甲", "丙", "庚", "癸"]}
+    assert analyze_ten_gods(bazi) == {"ten_gods": ["偏财", "七杀", "比肩", "伤官"]}
+
+
+def test_compiled_constants_are_up_to_date():
+    constants = load_constants()
+    assert constants_compiled.SOURCE_DIGEST == constants_compiler.source_digest()
+    assert constants_compiled.CONSTANTS_DIGEST == constants_digest(constants)
+    assert constants_compiled.CONSTANTS == constants_compiler.freeze(constants)
+    assert constants_compiled.TABLES == constants_compiler.compile_tables(constants)
+
+
+def test_hidden_ten_gods_vectorized():
+    records = _random_records(200, seed=7)
+    result = calculate_bazi_batch(records)
+    day_stems = result.stem_codes[:, 2]
+    codes = hidden_ten_god_codes(day_stems, result.branch_codes)
+
+    assert codes.shape == (len(records), 4, 3)
+    assert (result.hidden_ten_god_codes == codes).all()
+    for i in range(len(records)):
+        for p, branch in enumerate(result.branch_codes[i]):
+            hidden = BRANCH_HIDDEN_STEMS[branch]
+            expected = [TEN_GODS[day_stems[i]][stem] for stem, _ in hidden]
+            expected += [UNKNOWN_GOD] * (3 - len(hidden))
+            assert codes[i, p].tolist() == expected
+
+
+def test_equation_of_time_table_matches_scalar():
+    from src.domain.fortune.algorithms.solar_time import (
+        EOT_TABLE_START_JD, EOT_TABLE_END_JD, equation_of_time, equation_of_time_array,
+        equation_of_time_lookup, equation_of_time_lookup_array
+    )
+
+    rng = np.random.default_rng(3)
+    jds = rng.uniform(EOT_TABLE_START_JD - 1000, EOT_TABLE_END_JD + 1000, 5000)
+    scalar = np.array([equation_of_time(jd) for jd in jds])
+
+    assert np.abs(equation_of_time_array(jds) - scalar).max() < 1e-9
+    assert np.abs(equation_of_time_lookup_array(jds) - scalar).max() < 1e-6
+    assert all(abs(equation_of_time_lookup(jd) - s) < 1e-6 for jd, s in zip(jds[:500], scalar))
+
+
+def test_true_solar_offsets_match_legacy_conversion():
+    from dateutil.relativedelta import relativedelta
+    from src.domain.fortune.algorithms.solar_time import UNIX_EPOCH_JD, equation_of_time, true_solar_offsets
+
+    rng = random.Random(11)
+    epoch = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+    births, longitudes, expected = [], [], []
+    for _ in range(2000):
+        dt = epoch + datetime.timedelta(seconds=rng.randrange(-5 * 10 ** 9, 5 * 10 ** 9))
+        longitude = rng.uniform(-180, 180)
+        micros = (dt - epoch) // datetime.timedelta(microseconds=1)
+        # 原 ZiWeiCalculator._convert_to_true_solar_time 的计算方式
+        minutes = equation_of_time(UNIX_EPOCH_JD + micros / 86400e6) + (longitude - 120) * 4
+        hours, rest = divmod(minutes, 60)
+        legacy = dt + relativedelta(hours=longitude / 15.0 + hours, minutes=rest)
+        births.append(micros)
+        longitudes.append(longitude)
+        expected.append((legacy - dt) // datetime.timedelta(microseconds=1))
+
+    offsets = true_solar_offsets(births, longitudes)
+    assert np.abs(offsets - np.array(expected)).max() <= 1
+
+
+# 基线（579ca6e）紫微安星规则的原样转写：以天干地支名称查表，逐颗追加星曜
+_LEGACY_ZIWEI_MAP = {"甲": 11, "乙": 6, "丙": 2, "丁": 9, "戊": 3, "己": 0, "庚": 8, "辛": 4, "壬": 7, "癸": 1}
+_LEGACY_WENCHANG_MAP = {"甲": 0, "乙": 5, "丙": 10, "丁": 3, "戊": 8, "己": 1, "庚": 6, "辛": 11, "壬": 4, "癸": 9}
+_LEGACY_ZUOFU_MAP = {"甲": 0, "乙": 1, "丙": 2, "丁": 3, "戊": 4, "己": 5, "庚": 6, "辛": 7, "壬": 8, "癸": 9}
+_LEGACY_YOUBI_MAP = {"甲": 0, "乙": 11, "丙": 10, "丁": 9, "戊": 8, "己": 7, "庚": 6, "辛": 5, "壬": 4, "癸": 3}
+_LEGACY_TIANKUI_MAP = {"甲": 11, "乙": 10, "丙": 1, "丁": 0, "戊": 11, "己": 10, "庚": 5, "辛": 4, "壬": 3, "癸": 2}
+_LEGACY_TIANYUE_MAP = {"甲": 1, "乙": 0, "丙": 11, "丁": 10, "戊": 1, "己": 0, "庚": 7, "辛": 6, "壬": 5, "癸": 4}
+
+
+def _legacy_major_stars(palaces, year_stem, month_branch, life_idx, sun_idx, moon_idx):
+    from src.domain.fortune.algorithms.ganzhi import EARTHLY_BRANCHES
+
+    stars = {palace: [] for palace in palaces}
+    branch_idx = EARTHLY_BRANCHES.index(month_branch)
+    ziwei_idx = (_LEGACY_ZIWEI_MAP[year_stem] + branch_idx) % 12
+    tianfu_idx = (ziwei_idx + 4) % 12
+    tanlang_idx = (ziwei_idx + branch_idx) % 12
+    tianxiang_idx = (tianfu_idx + 1) % 12
+    qisha_idx = (ziwei_idx + 6) % 12
+    for star, idx in (("紫微", ziwei_idx), ("天府", tianfu_idx), ("太阳", sun_idx), ("太阴", moon_idx),
+                      ("天机", life_idx + 2), ("武曲", life_idx + 5), ("天同", life_idx + 7),
+                      ("廉贞", life_idx + 7), ("贪狼", tanlang_idx), ("巨门", tanlang_idx + 1),
+                      ("天相", tianxiang_idx), ("天梁", tianxiang_idx + 1), ("七杀", qisha_idx),
+                      ("破军", qisha_idx + 1)):
+        stars[palaces[idx % 12]].append(star)
+    return {palace: found or ["空宫"] for palace, found in stars.items()}
+
+
+def _legacy_minor_stars(palaces, day_stem, hour_branch, year_stem, month_branch):
+    from src.domain.fortune.algorithms.ganzhi import EARTHLY_BRANCHES
+
+    hour_idx, month_idx = EARTHLY_BRANCHES.index(hour_branch), EARTHLY_BRANCHES.index(month_branch)
+    wenchang = (_LEGACY_WENCHANG_MAP[day_stem] + hour_idx) % 12
+    return {
+        "文昌": palaces[wenchang], "文曲": palaces[(wenchang + 2) % 12],
+        "左辅": palaces[(_LEGACY_ZUOFU_MAP[year_stem] + month_idx) % 12],
+        "右弼": palaces[(_LEGACY_YOUBI_MAP[year_stem] + month_idx) % 12],
+        "天魁": palaces[_LEGACY_TIANKUI_MAP[year_stem]], "天钺": palaces[_LEGACY_TIANYUE_MAP[year_stem]],
+    }
+
+
+def test_ziwei_placement_tables_match_rules():
+    from src.domain.fortune.algorithms import ziwei_tables
+    from src.domain.fortune.algorithms.ganzhi import HEAVENLY_STEMS, EARTHLY_BRANCHES
+    from src.domain.fortune.algorithms.ziwei import ZIWEI_CONFIG
+
+    palaces = ziwei_tables.PALACES
+    assert tuple(ZIWEI_CONFIG["palaces"]) == palaces
+    # 随包发布的安星表与当前规则一致
+    built = ziwei_tables.build_placement_tables()
+    shipped = ziwei_tables._load_tables()
+    for name in ("major", "hour", "month"):
+        assert np.array_equal(built[name], shipped[name])
+
+    # 查表结果与基线逐星规则逐一比对（含宫内星曜顺序）
+    for stem in range(10):
+        for branch in range(12):
+            for life in range(12):
+                sun, moon = (life + stem) % 12, (life + branch) % 12
+                masks = ziwei_tables.major_star_masks(stem, branch, life, sun, moon)
+                assert ziwei_tables.masks_to_palaces(masks) == _legacy_major_stars(
+                    palaces, HEAVENLY_STEMS[stem], EARTHLY_BRANCHES[branch], life, sun, moon)
+            legacy = _legacy_minor_stars(palaces, HEAVENLY_STEMS[stem], EARTHLY_BRANCHES[branch],
+                                         HEAVENLY_STEMS[stem], EARTHLY_BRANCHES[branch])
+            placed = zip(ziwei_tables.HOUR_STARS + ziwei_tables.MONTH_STARS,
+                         ziwei_tables.hour_star_palaces(stem, branch) + ziwei_tables.month_star_palaces(stem, branch))
+            assert {star: palaces[idx] for star, idx in placed} == legacy
+
+    # 基线实现的固定取值（甲年寅月、庚日申时）
+    assert built["major"][0, 2, 0].tolist() == [1, 5, 2, 5, 7, 7, 3, 4, 6, 7, 7, 8]
+    assert built["hour"][6, 8].tolist() == [2, 4]
+    assert built["month"][6, 8].tolist() == [2, 2, 5, 7]
+
+    masks = ziwei_tables.major_star_masks(0, 2, 0, 3, 3)
+    vectorized = ziwei_tables.major_star_masks_array(np.array([0]), np.array([2]), np.array([0]),
+                                                     np.array([3]), np.array([3]))
+    assert vectorized[0].tolist() == masks
+
+
+def test_ziwei_calculate_places_tabled_stars_by_baseline_rules():
+    from src.domain.fortune.algorithms.ganzhi import HEAVENLY_STEMS, EARTHLY_BRANCHES
+    from src.domain.fortune.algorithms.lunar import solar_to_lunar
+    from src.domain.fortune.algorithms.ziwei import ZiWeiCalculator, ZIWEI_CONFIG
+
+    calculator = ZiWeiCalculator()
+    palaces = ZIWEI_CONFIG["palaces"]
+    for birth in ("1990-05-15T14:30:00", "1984-02-02T23:10:00", "2003-11-30T06:45:00"):
+        result = calculator.calculate({"birth_datetime": birth, "gender": "female"},
+                                      {"longitude": 121.5, "latitude": 31.2})
+        lunar = solar_to_lunar(datetime.date.fromisoformat(birth[:10]))
+        hour = int(birth[11:13])
+        legacy = _legacy_minor_stars(palaces, HEAVENLY_STEMS[calculator._get_lunar_day_stem(lunar)],
+                                     EARTHLY_BRANCHES[((hour + 1) // 2) % 12],
+                                     HEAVENLY_STEMS[calculator._get_lunar_year_stem(lunar.year)],
+                                     EARTHLY_BRANCHES[(lunar.month - 1) % 12])
+        minor_stars = result["stars"]["minor_stars"]
+        assert {star: minor_stars[star] for star in legacy} == legacy
+
+
+def test_ziwei_hour_stars_follow_birth_hour():
+    from src.domain.fortune.algorithms.ziwei import ZiWeiCalculator, ZIWEI_CONFIG
+
+    calculator = ZiWeiCalculator()
+    palaces = ZIWEI_CONFIG["palaces"]
+    location = {"longitude": 120.0, "latitude": 30.0}
+    # 1990年（午年）：火星寅午戌起丑、铃星起卯
+    early = calculator.calculate({"birth_datetime": "1990-05-15T03:30:00"}, location)["stars"]["minor_stars"]
+    late = calculator.calculate({"birth_datetime": "1990-05-15T20:30:00"}, location)["stars"]["minor_stars"]
+
+    # 寅时（2）与戌时（10）
+    assert (early["火星"], early["铃星"]) == (palaces[(1 + 2) % 12], palaces[(3 + 2) % 12])
+    assert (late["火星"], late["铃星"]) == (palaces[(1 + 10) % 12], palaces[(3 + 10) % 12])
+    assert (early["地空"], early["地劫"]) == (palaces[11 - 2], palaces[(11 - 2 + 6) % 12])
+    assert (late["地空"], late["地劫"]) == (palaces[11 - 10], palaces[(11 - 10 + 6) % 12])
+
+
+def test_calendar_index_matches_per_pillar_calculation():
+    import pytz
+    from lunarcalendar import Converter, Solar
+    from src.domain.fortune.algorithms import bazi, calendar_index, solar_terms
+
+    rng = random.Random(17)
+    tz = pytz.timezone("Asia/Shanghai")
+    births = [tz.localize(datetime.datetime(1901, 1, 1) + datetime.timedelta(minutes=rng.randrange(100 * 10 ** 6)))
+              for _ in range(500)]
+    # 节气边界前后1微秒
+    for year in range(1901, 2100, 11):
+        instant = solar_terms.get_term_instant(year, "立春")
+        births += [(instant + datetime.timedelta(microseconds=d)).astimezone(tz) for d in (-1, 0, 1)]
+
+    for birth in births:
+        day = calendar_index.lookup(birth)
+        year_stem, _ = bazi._year_pillar_codes(birth)
+        assert CYCLE_STEM[day.year_cycle] == year_stem
+        term_index = solar_terms.last_term_index(birth, birth.year)
+        assert day.term_index == (-1 if term_index is None else term_index)
+        assert (CYCLE_STEM[day.day_cycle], CYCLE_BRANCH[day.day_cycle]) == bazi._day_pillar_codes(birth)
+        lunar = Converter.Solar2Lunar(Solar(birth.year, birth.month, birth.day))
+        assert (day.lunar_year, day.lunar_month, day.lunar_day, day.leap) == \
+            (lunar.year, lunar.month, lunar.day, bool(lunar.isleap))
+
+    assert calendar_index.lookup(tz.localize(datetime.datetime(1850, 1, 1))) is None
+
+
+def test_lunar_service_round_trip_across_table_edges():
+    from src.domain.fortune.algorithms.lunar import LunarDate, lunar_months, lunar_to_solar, solar_to_lunar
+
+    dates = [datetime.date(1899, 12, 1), datetime.date(1900, 1, 30), datetime.date(1900, 1, 31),
+             datetime.date(1990, 5, 1), datetime.date(2100, 2, 8), datetime.date(2100, 6, 1)]
+    for date in dates:
+        assert lunar_to_solar(solar_to_lunar(date)) == date
+
+    assert solar_to_lunar(datetime.date(1900, 1, 31)) == LunarDate(1900, 1, 1, False)
+    assert lunar_to_solar(LunarDate(1990, 4, 31)) is None
+    ordinals = [d.toordinal() for d in dates]
+    assert lunar_months(ordinals).tolist() == [solar_to_lunar(d).month for d in dates]
+
+
+def test_lunar_service_matches_lunarcalendar_over_full_range():
+    from lunarcalendar import Converter, Lunar, Solar
+    from src.domain.fortune.algorithms import calendar_index
+    from src.domain.fortune.algorithms.lunar import LunarDate, lunar_months, lunar_to_solar, solar_to_lunar
+
+    # 紫微斗数与五行局原先直接调用lunarcalendar，逐日对照整个索引范围及前后各一年
+    start, end = datetime.date(1899, 1, 1), datetime.date(2101, 12, 31)
+    dates = [datetime.date.fromordinal(o) for o in range(start.toordinal(), end.toordinal() + 1)]
+    expected = [Converter.Solar2Lunar(Solar(d.year, d.month, d.day)) for d in dates]
+    assert [solar_to_lunar(d) for d in dates] == \
+           [LunarDate(l.year, l.month, l.day, bool(l.isleap)) for l in expected]
+    assert lunar_months([d.toordinal() for d in dates]).tolist() == [l.month for l in expected]
+
+    for date, lunar in zip(dates, expected):
+        if lunar.day == 1 and calendar_index.LUNAR_START_YEAR <= lunar.year <= calendar_index.LUNAR_END_YEAR:
+            assert lunar_to_solar(LunarDate(lunar.year, lunar.month, 1, bool(lunar.isleap))) == date
+    # lunardate在此日给出六月初一
+    assert solar_to_lunar(datetime.date(1933, 7, 22)) == LunarDate(1933, 5, 30, True)
+    assert lunar_to_solar(LunarDate(1933, 5, 30, True)) == \
+           Converter.Lunar2Solar(Lunar(1933, 5, 30, True)).to_date()
+
+
+def test_ziwei_annual_projection_matches_single_year_trend():
+    import swisseph as swe
+    from src.domain.fortune.algorithms.ziwei import ZiWeiCalculator, ZIWEI_CONFIG
+
+    calculator = ZiWeiCalculator.__new__(ZiWeiCalculator)
+    major_stars = {palace: ["空宫"] for palace in ZIWEI_CONFIG["palaces"]}
+    major_stars.update({"命宫": ["紫微", "天府"], "财帛": ["七杀"]})
+    minor_stars = {"文昌": "命宫", "擎羊": "财帛", "地空": "财帛", "禄存": "子女"}
+    chart = {"stars": {"major_stars": major_stars, "minor_stars": minor_stars}, "wuxing_bureau": "水二局"}
+
+    projection = calculator.project_annual_fortune(chart, 1990, 2049)
+    assert [p["year"] for p in projection] == list(range(1990, 2050))
+    for p in projection[::7]:
+        jd = swe.julday(p["year"], 6, 1, 0.0)
+        assert calculator._analyze_fortune_trend(major_stars, minor_stars, jd, "水二局") == p
+    # 流年命宫12年一轮、流年五行10年一轮，60年后完全重复
+    assert [{**p, "year": 0, "analysis": ""} for p in calculator.project_annual_fortune(chart, 2050, 2051)] == \
+           [{**p, "year": 0, "analysis": ""} for p in projection[:2]]
+    with pytest.raises(ValueError):
+        calculator.project_annual_fortune(chart, 2000, 1999)
+
+
+def test_luck_pillars_follow_month_pillar():
+    from src.domain.fortune.algorithms.luck_pillars import calculate_luck_pillars, calculate_luck_pillars_batch
+
+    # 壬辰月逆排、丙寅月顺排
+    backward = calculate_luck_pillars(8, 4, False, 6.41, count=3)
+    assert [(p["stem"] + p["branch"], p["start_age"], p["end_age"]) for p in backward] == \
+           [("辛卯", 6.41, 16.41), ("庚寅", 16.41, 26.41), ("己丑", 26.41, 36.41)]
+    forward = calculate_luck_pillars(2, 2, True, 0.07, count=2)
+    assert [p["stem"] + p["branch"] for p in forward] == ["丁卯", "戊辰"]
+
+    cycles, ages = calculate_luck_pillars_batch(np.array([8, 2]), np.array([4, 2]),
+                                                np.array([False, True]), np.array([6.41, 0.07]), count=2)
+    assert [CYCLE_STEM[c] for c in cycles[0]] == [7, 6] and ages[1].tolist() == [0.07, 10.07]
+
+
+def test_ziwei_major_limits_step_through_luck_pillar_engine():
+    from src.domain.fortune.algorithms.lunar import LunarDate
+    from src.domain.fortune.algorithms.ziwei import ZiWeiCalculator, ZIWEI_CONFIG
+
+    calculator = ZiWeiCalculator()
+    # 男顺女逆（与年干阴阳无关）；日干编码 (15+4+1990)%10=9，起限 = 8 + 9%5
+    lunar = LunarDate(1990, 4, 15)
+    male = calculator._calculate_major_limits("金四局", "财帛", "male", lunar)
+    female = calculator._calculate_major_limits("金四局", "财帛", "female", lunar)
+
+    assert [limit["palace"] for limit in male[:3]] == ["财帛", "疾厄", "迁移"]
+    assert [limit["palace"] for limit in female[:3]] == ["财帛", "子女", "夫妻"]
+    assert [(limit["start_age"], limit["end_age"]) for limit in male[:2]] == [(12, 19), (20, 27)]
+    assert len(male) == 12 and {limit["palace"] for limit in male} == set(ZIWEI_CONFIG["palaces"])
+    assert all(limit["duration"] == 8 for limit in male)
+    # 阴年（1991）同样男顺女逆
+    assert calculator._calculate_major_limits("金四局", "财帛", "male", LunarDate(1991, 4, 15))[1]["palace"] == "疾厄"
+    assert calculator._calculate_major_limits("金四局", "财帛", "female", LunarDate(1991, 4, 15))[1]["palace"] == "子女"
+
+
+def test_ziwei_chart_json_and_cached_svg():
+    import xml.dom.minidom
+    from src.domain.fortune.algorithms import ziwei_chart
+    from src.domain.fortune.algorithms.ziwei import ZIWEI_CONFIG
+
+    assert ziwei_chart.MINOR_STAR_ORDER == tuple(ZIWEI_CONFIG["minor_stars"])
+    major_stars = {palace: ["空宫"] for palace in ZIWEI_CONFIG["palaces"]}
+    major_stars.update({"命宫": ["紫微", "天府"], "财帛": ["七杀"]})
+    minor_stars = {star: "空宫" for star in ZIWEI_CONFIG["minor_stars"]}
+    minor_stars.update({"文昌": "命宫", "擎羊": "财帛"})
+
+    chart = ziwei_chart.build_chart("命宫", "财帛", major_stars, minor_stars)
+    assert (chart["life"], chart["body"]) == (0, 4)
+    assert chart["hash"] == ziwei_chart.chart_hash(chart)
+    assert chart["hash"] != ziwei_chart.build_chart("命宫", "命宫", major_stars, minor_stars)["hash"]
+
+    svg = ziwei_chart.render_svg(chart)
+    xml.dom.minidom.parseString(svg)
+    assert "七杀" in svg and "擎羊" in svg and svg.count("<g ") == 12
+    assert ziwei_chart.render_svg(dict(chart)) is svg
+
+
+def test_ziwei_calculate_renders_its_chart():
+    import json
+    import xml.dom.minidom
+    from src.domain.fortune.algorithms import ziwei_chart
+    from src.domain.fortune.algorithms.ziwei import ZiWeiCalculator
+
+    calculator = ZiWeiCalculator()
+    result = calculator.calculate({"birth_datetime": "1990-05-15T14:30:00", "gender": "male"},
+                                  {"longitude": 116.4, "latitude": 39.9})
+    chart = result["chart"]
+    life_palace, body_palace = result["palaces"]["life_palace"], result["palaces"]["body_palace"]
+
+    assert ziwei_chart.PALACES[chart["life"]] == life_palace and ziwei_chart.PALACES[chart["body"]] == body_palace
+    assert chart["hash"] == ziwei_chart.chart_hash(chart)
+    assert calculator.render_chart(chart, fmt="json") is chart
+    json.dumps(chart)
+
+    svg = calculator.render_chart(chart)
+    xml.dom.minidom.parseString(svg)
+    assert svg.count("<g ") == 12
+    # 命盘中的每颗主星与辅星都出现在SVG中
+    for stars in result["stars"]["major_stars"].values():
+        assert all(star in svg for star in stars if star != "空宫")
+    assert all(star in svg for star in result["stars"]["minor_stars"])
+    with pytest.raises(ValueError):
+        calculator.render_chart(chart, fmt="png")
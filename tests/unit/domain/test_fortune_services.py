@@ -0,0 +1,123 @@
+import sys
+import threading
+import time
+import types
+import uuid
+
+from src.domain.core.value_objects import BirthData
+from src.domain.fortune.algorithms import bazi_batch
+from src.domain.fortune.algorithms.bazi import calculate_bazi
+from src.domain.fortune.algorithms.ziwei import get_ziwei_calculator
+from src.domain.fortune.algorithms import ziwei
+from src.domain.fortune.analysis_executor import _executor_from_env
+from src.domain.fortune.entities import BaziResult, ZiweiResult
+from src.domain.fortune.repositories import AlgorithmMetadata
+
+BEIJING = {"longitude": 116.4, "latitude": 39.9}
+
+
+def test_fortune_analysis_batch_runs_registered_batch_entry_points(fortune_service_factory, monkeypatch):
+    batch_calls = []
+    calculate_batch = bazi_batch.calculate_batch
+    monkeypatch.setattr(bazi_batch, "calculate_batch",
+                        lambda records: batch_calls.append(len(records)) or calculate_batch(records))
+
+    births = {
+        uuid.uuid4(): BirthData("1990-05-15T14:30:00", location=BEIJING),
+        uuid.uuid4(): BirthData("1984-02-02T23:10:00", timezone="Asia/Tokyo"),
+        uuid.uuid4(): BirthData("2003-11-30T06:45:00", location=BEIJING),
+        uuid.uuid4(): BirthData("not-a-date", location=BEIJING),
+    }
+    batch = fortune_service_factory().calculate_fortune_analysis_batch(births)
+
+    assert batch_calls == [len(births)]  # 八字整批向量化计算
+    invalid = list(births)[3]
+    assert list(batch.failed) == [invalid] and "bazi" in batch.failed[invalid]
+    assert [analysis.user_id for analysis in batch.analyses] == list(births)[:3]
+
+    for analysis in batch.analyses:
+        birth = births[analysis.user_id]
+        assert analysis.analysis_type == "bazi_ziwei" and analysis.id is not None
+        assert analysis.get_domain_events() == []
+        chart = calculate_bazi(birth.to_dict())
+        assert analysis.bazi_result == BaziResult.from_chart(chart)
+        assert analysis.wuxing_analysis == chart["main_elements"]
+        if birth.location:
+            ziwei_chart = get_ziwei_calculator().calculate(birth.to_dict(), birth.location)
+            assert analysis.ziwei_result == ZiweiResult.from_chart(ziwei_chart)
+            assert analysis.ziwei_result.life_palace and analysis.ziwei_result.fortune_trend
+        else:
+            assert analysis.ziwei_result == ZiweiResult()
+
+
+def test_single_analysis_maps_full_charts_onto_results(fortune_service_factory):
+    service = fortune_service_factory()
+    birth = BirthData("1990-05-15T14:30:00", location=BEIJING)
+
+    bazi = service.calculate_bazi(birth)
+    assert bazi.heavenly_stems == calculate_bazi(birth.to_dict())["heavenly_stems"]
+    ziwei = service.calculate_ziwei(birth, BEIJING)
+    assert ziwei.life_palace == get_ziwei_calculator().calculate(birth.to_dict(), BEIJING)["palaces"]["life_palace"]
+
+
+def _slow_module(name, calculate, delay, running):
+    """延迟 delay 秒后调用真实算法的算法模块；running 记录正在计算的分析类型及同时计算的峰值"""
+    module = types.ModuleType(name)
+
+    def slow_calculate(data):
+        with running["lock"]:
+            running["active"] += 1
+            running["peak"] = max(running["peak"], running["active"])
+        time.sleep(delay)
+        with running["lock"]:
+            running["active"] -= 1
+        return calculate(data)
+
+    module.calculate = slow_calculate
+    return module
+
+
+def test_default_executor_sends_cpu_bound_types_to_process_pool(monkeypatch):
+    monkeypatch.delenv("FORTUNE_ANALYSIS_MODE", raising=False)
+    executor = _executor_from_env()
+
+    assert executor.mode == "process"
+    assert executor.process_types == {"bazi", "ziwei"}
+
+
+def test_thread_executor_runs_independent_analysis_types_concurrently(fortune_service_factory, monkeypatch):
+    # 模拟算法只在 sys.modules 中注册，无法在spawn子进程中导入，使用线程模式验证并行分派
+    running = {"lock": threading.Lock(), "active": 0, "peak": 0}
+    monkeypatch.setitem(sys.modules, "slow_bazi", _slow_module("slow_bazi", calculate_bazi, 0.3, running))
+    monkeypatch.setitem(sys.modules, "slow_ziwei", _slow_module("slow_ziwei", ziwei.calculate, 0.3, running))
+    service = fortune_service_factory(mode="thread", algorithms=[
+        AlgorithmMetadata("bazi", "v1.0", "slow_bazi"), AlgorithmMetadata("ziwei", "v1.0", "slow_ziwei")])
+    birth = BirthData("1990-05-15T14:30:00", location=BEIJING)
+
+    started = time.perf_counter()
+    analysis = service.calculate_fortune_analysis(uuid.uuid4(), birth, BEIJING)
+    elapsed = time.perf_counter() - started
+
+    assert analysis.bazi_result.heavenly_stems and analysis.ziwei_result.life_palace
+    assert running["peak"] == 2
+    assert elapsed < 0.55  # 接近最慢一项（0.3秒），而不是两项之和
+
+
+def test_shadow_candidate_latency_is_recorded_once(fortune_service_factory):
+    # 候选版本与主版本为同一实现，结果应完全一致
+    service = fortune_service_factory(
+        configs={"fortune.bazi.shadow": {"version": "v2.0", "sample_rate": 1.0}},
+        algorithms=[AlgorithmMetadata("bazi", "v1.0", "src.domain.fortune.algorithms.bazi_batch"),
+                    AlgorithmMetadata("bazi", "v2.0", "src.domain.fortune.algorithms.bazi_batch")])
+    birth = BirthData("1990-05-15T14:30:00", location=BEIJING)
+
+    service.calculate_bazi(birth)
+    assert service.shadow.wait_idle()
+    service.calculate_bazi(birth)  # 主版本命中命盘缓存，不记录耗时；候选版本仍按抽样影子执行
+    assert service.shadow.wait_idle()
+
+    stats = service.get_shadow_stats()
+    assert stats["latency"]["bazi:v1.0"]["count"] == 1
+    assert stats["latency"]["bazi:v2.0"]["count"] == 2
+    comparison = stats["comparisons"]["bazi:v1.0->v2.0"]
+    assert (comparison["compared"], comparison["mismatches"]) == (2, 0)
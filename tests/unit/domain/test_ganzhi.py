@@ -0,0 +1,164 @@
+import datetime
+import random
+
+import pytest
+
+from src.config.loader import CONSTANTS
+from src.domain.fortune.algorithms.bazi import (
+    calculate_year_pillar, calculate_month_pillar, calculate_day_pillar, calculate_hour_pillar
+)
+from src.domain.fortune.algorithms.ganzhi import (
+    HEAVENLY_STEMS, EARTHLY_BRANCHES, ELEMENTS, STEM_CODES, BRANCH_CODES, ELEMENT_CODES, STEM_ELEMENT,
+    BRANCH_ELEMENT, ELEMENT_GENERATES, ELEMENT_CONTROLS, ELEMENT_GENERATED_BY, ELEMENT_CONTROLLED_BY,
+    ELEMENT_RELATION, BRANCH_HIDDEN_STEMS, MONTH_STEM_START, HOUR_STEM_START, CYCLE_STEM, CYCLE_BRANCH,
+    cycle_code, nayin_element, is_yang_stem
+)
+from src.domain.fortune.algorithms.lunar import LunarDate
+from src.domain.fortune.algorithms.solar_terms import TERM_ORDER, get_solar_terms
+from src.domain.fortune.algorithms.wuxing import WuxingCalculator
+
+ephem = pytest.importorskip("ephem")
+
+WUXING_MAP = CONSTANTS['WUXING_MAP']
+WUXING_RELATIONS = CONSTANTS['WUXING_RELATIONS']
+
+# 以下为编码改造前（基线版本）按汉字计算的实现，作为等价性对照
+_LEGACY_MONTH_STEM_START = {"甲": "丙", "己": "丙", "乙": "戊", "庚": "戊", "丙": "庚",
+                            "辛": "庚", "丁": "壬", "壬": "壬", "戊": "甲", "癸": "甲"}
+_LEGACY_HOUR_STEM_START = {"甲": "甲", "己": "甲", "乙": "丙", "庚": "丙", "丙": "戊",
+                           "辛": "戊", "丁": "庚", "壬": "庚", "戊": "壬", "癸": "壬"}
+_LEGACY_BUREAUS = {"水": "水二局", "木": "木三局", "金": "金四局", "土": "土五局", "火": "火六局"}
+
+
+def _legacy_year_pillar(birth):
+    year = birth.year
+    if birth < get_solar_terms(year)["立春"]:
+        year -= 1
+    year_index = (year - 1900 + 36) % 60
+    return HEAVENLY_STEMS[year_index % 10], EARTHLY_BRANCHES[year_index % 12]
+
+
+def _legacy_month_pillar(birth, year_stem):
+    terms = get_solar_terms(birth.year)
+    last_term = None
+    for term in TERM_ORDER:
+        if terms[term] < birth:
+            last_term = term
+        else:
+            break
+    if last_term:
+        branch_index = (TERM_ORDER.index(last_term) // 2 + 2) % 12
+    else:
+        branch_index = (birth.month - 1) % 12
+    start_index = HEAVENLY_STEMS.index(_LEGACY_MONTH_STEM_START.get(year_stem, "丙"))
+    return HEAVENLY_STEMS[(start_index + branch_index) % 10], EARTHLY_BRANCHES[branch_index]
+
+
+def _legacy_day_pillar(birth):
+    naive = birth.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    days_diff = ephem.julian_date(naive) - ephem.julian_date(datetime.datetime(1900, 1, 1))
+    day_index = int(days_diff) % 60
+    return HEAVENLY_STEMS[day_index % 10], EARTHLY_BRANCHES[day_index % 12]
+
+
+def _legacy_hour_pillar(birth, day_stem):
+    utc = birth.astimezone(datetime.timezone.utc)
+    if utc.hour == 23 or (utc.hour == 0 and utc.minute == 0):
+        branch_index = 0
+        day_stem, _ = _legacy_day_pillar(birth + datetime.timedelta(days=1))
+    else:
+        branch_index = ((utc.hour + 1) // 2) % 12
+    start_index = HEAVENLY_STEMS.index(_LEGACY_HOUR_STEM_START.get(day_stem, "甲"))
+    return HEAVENLY_STEMS[(start_index + branch_index) % 10], EARTHLY_BRANCHES[branch_index]
+
+
+def _legacy_nayin(stem, branch):
+    nayin_index = (HEAVENLY_STEMS.index(stem) * 12 + EARTHLY_BRANCHES.index(branch)) % 5
+    return ["金", "火", "木", "水", "土"][nayin_index]
+
+
+def _legacy_relation(year_wuxing, bureau_wuxing):
+    if year_wuxing == bureau_wuxing:
+        return "比和"
+    if WUXING_RELATIONS[year_wuxing]["生"] == bureau_wuxing:
+        return "相生"
+    if WUXING_RELATIONS[year_wuxing]["克"] == bureau_wuxing:
+        return "相克"
+    if WUXING_RELATIONS[bureau_wuxing]["生"] == year_wuxing:
+        return "被生"
+    if WUXING_RELATIONS[bureau_wuxing]["克"] == year_wuxing:
+        return "被克"
+    return "平"
+
+
+def test_code_tables_match_character_constants():
+    assert [ELEMENTS[e] for e in STEM_ELEMENT] == [WUXING_MAP[s] for s in HEAVENLY_STEMS]
+    assert [ELEMENTS[e] for e in BRANCH_ELEMENT] == [WUXING_MAP[b] for b in EARTHLY_BRANCHES]
+    for element, relations in WUXING_RELATIONS.items():
+        code = ELEMENT_CODES[element]
+        assert ELEMENTS[ELEMENT_GENERATES[code]] == relations["生"]
+        assert ELEMENTS[ELEMENT_CONTROLS[code]] == relations["克"]
+        assert ELEMENTS[ELEMENT_GENERATED_BY[code]] == relations["被生"]
+        assert ELEMENTS[ELEMENT_CONTROLLED_BY[code]] == relations["被克"]
+    for branch, hidden in CONSTANTS['BRANCH_HIDDEN_STEMS'].items():
+        assert [(HEAVENLY_STEMS[s], w) for s, w in BRANCH_HIDDEN_STEMS[BRANCH_CODES[branch]]] == \
+               [tuple(item) for item in hidden]
+    for stem in HEAVENLY_STEMS:
+        code = STEM_CODES[stem]
+        assert HEAVENLY_STEMS[MONTH_STEM_START[code]] == _LEGACY_MONTH_STEM_START[stem]
+        assert HEAVENLY_STEMS[HOUR_STEM_START[code]] == _LEGACY_HOUR_STEM_START[stem]
+        assert is_yang_stem(code) == (code in (0, 2, 4, 6, 8))
+
+
+def test_cycle_codes_match_sexagenary_index():
+    for index in range(60):
+        stem, branch = index % 10, index % 12
+        assert (CYCLE_STEM[index], CYCLE_BRANCH[index]) == (stem, branch)
+        assert cycle_code(stem, branch) == index
+
+
+def test_nayin_and_relations_match_string_implementation():
+    for stem in range(10):
+        for branch in range(12):
+            assert ELEMENTS[nayin_element(stem, branch)] == \
+                   _legacy_nayin(HEAVENLY_STEMS[stem], EARTHLY_BRANCHES[branch])
+
+    calculator = WuxingCalculator()
+    for year_wuxing in ELEMENTS:
+        for bureau_wuxing in ELEMENTS:
+            assert ELEMENT_RELATION[ELEMENT_CODES[year_wuxing]][ELEMENT_CODES[bureau_wuxing]] == \
+                   _legacy_relation(year_wuxing, bureau_wuxing)
+            assert calculator.analyze_wuxing_relation(year_wuxing, bureau_wuxing) == \
+                   _legacy_relation(year_wuxing, bureau_wuxing)
+    assert calculator.analyze_wuxing_relation("", "木") == "平"
+
+
+def test_wuxing_bureau_matches_string_implementation():
+    calculator = WuxingCalculator()
+    major_stars = {"命宫": ["紫微", "天府"]}
+    for year in range(1984, 2044):
+        stem, branch = HEAVENLY_STEMS[(year - 1900) % 10], EARTHLY_BRANCHES[(year - 1900) % 12]
+        expected = _LEGACY_BUREAUS[_legacy_nayin(stem, branch)]
+        assert calculator.calculate_wuxing_bureau(LunarDate(year, 1, 1), major_stars) == expected
+
+
+def test_pillars_match_string_implementation():
+    rng = random.Random(20240615)
+    start = datetime.datetime(1850, 1, 1, tzinfo=datetime.timezone.utc)
+    span = int((datetime.datetime(2150, 1, 1, tzinfo=datetime.timezone.utc) - start).total_seconds())
+    births = [start + datetime.timedelta(seconds=rng.randrange(span)) for _ in range(300)]
+    # 立春前后与晚子时边界
+    spring = get_solar_terms(2024)["立春"]
+    births += [spring - datetime.timedelta(seconds=1), spring + datetime.timedelta(seconds=1),
+               datetime.datetime(2024, 3, 1, 23, 30, tzinfo=datetime.timezone.utc),
+               datetime.datetime(2024, 3, 2, 0, 0, tzinfo=datetime.timezone.utc)]
+
+    for birth in births:
+        year_stem, _ = calculate_year_pillar(birth)
+        day_stem, _ = calculate_day_pillar(birth)
+        assert calculate_year_pillar(birth) == _legacy_year_pillar(birth), birth
+        assert calculate_day_pillar(birth) == _legacy_day_pillar(birth), birth
+        for stem in (year_stem, "未知"):
+            assert calculate_month_pillar(birth, stem) == _legacy_month_pillar(birth, stem), birth
+        for stem in (day_stem, "未知"):
+            assert calculate_hour_pillar(birth, stem) == _legacy_hour_pillar(birth, stem), birth
@@ -0,0 +1,45 @@
+import random
+
+from src.domain.fortune.shadow_execution import ShadowConfig, ShadowRunner, LatencyHistogram, diff_results
+
+
+def test_diff_results_reports_changed_paths_with_float_tolerance():
+    primary = {"elements": {"wood": 0.25, "fire": 0.5}, "pillars": ["甲子", "乙丑"], "gender": "male"}
+    candidate = {"elements": {"wood": 0.2500000001, "fire": 0.4}, "pillars": ["甲子", "丙寅"], "extra": 1,
+                 "gender": "male"}
+
+    assert diff_results(primary, primary) == []
+    assert diff_results(primary, candidate) == ["$.elements.fire", "$.extra", "$.pillars[1]"]
+
+
+def test_shadow_runner_records_mismatches_and_latency():
+    runner = ShadowRunner(max_workers=1, rng=random.Random(0))
+    try:
+        assert runner.submit("bazi", "v1.0", "v2.0", {"value": 1}, lambda: {"value": 1})
+        assert runner.submit("bazi", "v1.0", "v2.0", {"value": 1}, lambda: {"value": 2})
+        assert runner.submit("bazi", "v1.0", "v2.0", {"value": 1}, lambda: 1 / 0)
+        assert runner.wait_idle()
+        runner.record_latency("bazi", "v1.0", 0.003)
+        stats = runner.stats()
+    finally:
+        runner.shutdown()
+
+    comparison = stats["comparisons"]["bazi:v1.0->v2.0"]
+    assert (comparison["compared"], comparison["mismatches"], comparison["candidate_errors"]) == (2, 1, 1)
+    assert comparison["recent_mismatches"] == [["$.value"]]
+    assert stats["latency"]["bazi:v2.0"]["count"] == 2
+    assert stats["latency"]["bazi:v1.0"]["p50_ms"] == 5.0
+
+
+def test_shadow_sampling_and_config():
+    runner = ShadowRunner(rng=random.Random(1))
+    sampled = sum(runner.should_sample(0.1) for _ in range(10000))
+    assert 800 < sampled < 1200
+    assert ShadowConfig.from_dict({"version": "v2.0", "sample_rate": 0}) is None
+    assert ShadowConfig.from_dict({"version": "v2.0", "sample_rate": 2}).sample_rate == 1.0
+
+    histogram = LatencyHistogram()
+    for ms in (1, 3, 30, 20000):
+        histogram.observe(ms / 1000)
+    assert histogram.to_dict()["buckets"]["le_inf"] == 1
+    assert histogram.percentile(1.0) == 20000.0
@@ -0,0 +1,51 @@
+import datetime
+
+import numpy as np
+import pytest
+
+from src.domain.fortune.algorithms import solar_terms
+from src.domain.fortune.algorithms.solar_terms import (
+    TABLE_START_YEAR, TABLE_END_YEAR, TERM_ORDER, compute_solar_terms, find_nearest_jie, get_solar_terms,
+    get_term_instant, last_term_index
+)
+
+pytest.importorskip("ephem")
+
+
+def _computed(year):
+    return {name: instant.replace(tzinfo=datetime.timezone.utc)
+            for name, instant in compute_solar_terms(year).items()}
+
+
+def test_table_spans_configured_years():
+    assert (solar_terms._TABLE_START, solar_terms._TABLE_END) == (TABLE_START_YEAR, TABLE_END_YEAR)
+    assert solar_terms._TABLE.shape == (TABLE_END_YEAR - TABLE_START_YEAR + 1, len(TERM_ORDER))
+
+
+@pytest.mark.parametrize("year", [1800, 1801, 1900, 1990, 2024, 2199, 2200])
+def test_table_matches_computed_terms(year):
+    assert get_solar_terms(year) == _computed(year)
+    assert get_term_instant(year, "立春") == _computed(year)["立春"]
+
+
+@pytest.mark.parametrize("year", [1799, 2201])
+def test_years_outside_table_fall_back_to_computation(year):
+    solar_terms._computed_row.cache_clear()
+
+    assert get_solar_terms(year) == _computed(year)
+    assert solar_terms._computed_row.cache_info().misses == 1
+
+
+@pytest.mark.parametrize("year", [1799, 1800, 2200, 2201])
+def test_term_lookups_at_table_edges_follow_computed_terms(year):
+    terms = _computed(year)
+    births = [terms["清明"] + datetime.timedelta(seconds=1), terms["小寒"] - datetime.timedelta(seconds=1)]
+    prefix_max = np.maximum.accumulate([terms[name] for name in TERM_ORDER])
+    jie = sorted({t for y in (year - 1, year, year + 1) for name, t in _computed(y).items()
+                  if name in solar_terms.JIE_NAMES})
+
+    for birth in births:
+        expected = int(np.searchsorted(prefix_max, birth, side="left")) - 1
+        assert last_term_index(birth, year) == (expected if expected >= 0 else None)
+        assert find_nearest_jie(birth, "forward") == next(t for t in jie if t > birth)
+        assert find_nearest_jie(birth, "backward") == [t for t in jie if t < birth][-1]
@@ -0,0 +1,110 @@
+import importlib
+import sys
+
+import pytest
+from flask import Flask
+
+from src.domain.fortune.algorithm_registry import AlgorithmRegistry
+from src.domain.fortune.repositories import AlgorithmMetadata
+from src.domain.fortune.services import FortuneCalculationService
+from src.infrastructure.monitoring import algorithm_warm_up
+from src.infrastructure.utils.cache_manager import CacheManager
+from src.infrastructure.utils.dynamic_config import DynamicConfigService
+from tests.unit.infrastructure.test_dynamic_config import ConfigTable
+
+
+class FakeAlgorithmRepository:
+    def __init__(self, algorithms):
+        self.algorithms = algorithms
+
+    def get_algorithm_metadata(self, algorithm_type, version=None):
+        return next((m for m in self.algorithms
+                     if m.algorithm_type == algorithm_type and m.version == version), None)
+
+    def list_algorithms(self, algorithm_type=None):
+        return list(self.algorithms)
+
+
+BUILTIN_ALGORITHMS = [
+    AlgorithmMetadata("bazi", "v1.0", "src.domain.fortune.algorithms.bazi_batch"),
+    AlgorithmMetadata("ziwei", "v1.0", "src.domain.fortune.algorithms.ziwei"),
+]
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    registry = AlgorithmRegistry()
+    monkeypatch.setattr(algorithm_warm_up, "algorithm_registry", registry)
+    return registry
+
+
+def test_app_startup_warms_registry_in_background(registry):
+    assert registry.readiness()["ready"]  # 未配置启动预热的进程直接就绪
+
+    thread = algorithm_warm_up.init_algorithm_warm_up(
+        Flask(__name__), algorithm_repo_factory=lambda: FakeAlgorithmRepository(BUILTIN_ALGORITHMS))
+    thread.join(timeout=30)
+
+    status = registry.readiness()
+    assert status["ready"] and status["loaded"] == ["bazi_v1.0", "ziwei_v1.0"]
+
+
+def test_repository_failure_keeps_app_not_ready(registry):
+    def broken_factory():
+        raise ConnectionError("database unavailable")
+
+    algorithm_warm_up.init_algorithm_warm_up(Flask(__name__), algorithm_repo_factory=broken_factory,
+                                             background=False)
+    status = registry.readiness()
+    assert not status["warmed"] and not status["ready"]
+
+
+def test_celery_worker_process_init_warms_registry(registry):
+    pytest.importorskip("celery")
+    from celery.signals import worker_process_init
+
+    algorithm_warm_up.init_algorithm_warm_up(celery_app=object(),
+                                             algorithm_repo_factory=lambda: FakeAlgorithmRepository(BUILTIN_ALGORITHMS))
+    worker_process_init.send(sender=None)
+    assert registry.readiness()["ready"]
+
+
+def test_worker_bootstrap_registers_warm_up(registry, monkeypatch):
+    pytest.importorskip("celery")
+    from celery.signals import worker_process_init
+
+    # 重新导入 worker 启动模块，使其登记到本测试的注册表
+    monkeypatch.delitem(sys.modules, "src.interfaces.workers.celery_app", raising=False)
+    celery_app = importlib.import_module("src.interfaces.workers.celery_app")
+
+    assert not registry.readiness()["ready"]
+    worker_process_init.send(sender=None)
+    assert registry.readiness()["ready"] and celery_app.celery_app.main == "metaphysical_jewelry"
+
+
+def test_cold_start_reads_configs_from_preloaded_snapshot(registry):
+    table = ConfigTable(**{"fortune.bazi.default_version": ('{"version": "v2.0"}', "json"),
+                           "fortune.ziwei.shadow": ('{"version": "v1.1", "sample_rate": 0.1}', "json")})
+    service = FortuneCalculationService(FakeAlgorithmRepository(BUILTIN_ALGORITHMS),
+                                        DynamicConfigService(table, CacheManager()), registry=registry)
+
+    algorithm_warm_up.init_algorithm_warm_up(Flask(__name__), fortune_service_factory=lambda: service,
+                                             background=False)
+    assert table.queries == 1
+
+    # 首批请求的配置读取（含未配置的键）全部由启动时加载的快照回答
+    assert service._get_default_version("bazi") == "v2.0"
+    assert service._get_default_version("ziwei") == "v1.0"
+    assert service._get_shadow_config("ziwei").version == "v1.1"
+    assert service._get_shadow_config("bazi") is None
+    assert table.queries == 1
+    assert registry.readiness()["ready"]
+
+
+def test_config_preload_failure_does_not_block_readiness(registry):
+    def broken_factory():
+        raise ConnectionError("database unavailable")
+
+    algorithm_warm_up.init_algorithm_warm_up(Flask(__name__), fortune_service_factory=broken_factory,
+                                             background=False)
+    assert registry.readiness()["ready"]
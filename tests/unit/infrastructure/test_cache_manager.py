@@ -0,0 +1,96 @@
+import threading
+import time
+
+import pytest
+
+from src.infrastructure.utils.cache_manager import CacheManager, MemoryBackend, RedisBackend
+
+
+class RedisStandIn:
+    """只实现 get / set(ex=) / delete 的本地 Redis 替身"""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        value, expires_at = self.data.get(key, (None, None))
+        if expires_at is not None and time.monotonic() >= expires_at:
+            del self.data[key]
+            return None
+        return value
+
+    def set(self, key, value, ex=None):
+        assert isinstance(value, bytes)
+        self.data[key] = (value, time.monotonic() + ex if ex else None)
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+
+def test_lru_ttl_and_namespaces():
+    cache = CacheManager(MemoryBackend(max_entries=2), namespace="fortune")
+    config = cache.namespaced("config")
+    cache.set("a", 1)
+    config.set("a", 2, ttl=0.05)
+    assert (cache.get("a"), config.get("a")) == (1, 2)
+    cache.set("b", 3)  # 淘汰最久未使用的 fortune:a
+    assert cache.get("a") is None
+    time.sleep(0.06)
+    assert config.get("a") is None
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (2, 2, 1)
+
+
+def test_redis_backend_round_trips_through_stand_in():
+    client = RedisStandIn()
+    cache = CacheManager(RedisBackend(client), namespace="catalog")
+    cache.set("jewelry:1", {"name": "白水晶", "price_cents": 19900}, ttl=60)
+    assert "catalog:jewelry:1" in client.data
+    assert cache.get("jewelry:1") == {"name": "白水晶", "price_cents": 19900}
+    cache.delete("jewelry:1")
+    assert cache.get("jewelry:1") is None
+
+
+@pytest.mark.parametrize("backend", [MemoryBackend(), RedisBackend(RedisStandIn())])
+def test_zero_ttl_is_not_stored(backend):
+    cache = CacheManager(backend, namespace="fortune")
+    cache.set("a", 1, ttl=None)
+    cache.set("b", 2)
+    assert (cache.get("a"), cache.get("b")) == (1, 2)
+
+    # ttl=0 不等于永不过期：不写入，并清除已有的值
+    cache.set("a", 3, ttl=0)
+    cache.set("c", 4, ttl=0)
+    assert (cache.get("a"), cache.get("c")) == (None, None)
+    CacheManager(backend, namespace="fortune", default_ttl=0).set("b", 5)
+    assert cache.get("b") is None
+
+
+def test_concurrent_misses_compute_once():
+    cache = CacheManager()
+    calls, started = [], threading.Event()
+
+    def compute():
+        calls.append(1)
+        started.set()
+        time.sleep(0.05)
+        return {"score": 88}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_set("chart", compute)))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1 and results == [{"score": 88}] * 8
+    assert cache.stats()["coalesced"] + cache.stats()["hits"] == 7
+
+
+def test_failed_computation_is_not_cached():
+    cache = CacheManager()
+    with pytest.raises(RuntimeError):
+        cache.get_or_set("chart", lambda: (_ for _ in ()).throw(RuntimeError("boom")))
+    assert cache.get_or_set("chart", lambda: 1) == 1
@@ -0,0 +1,108 @@
+import datetime
+import decimal
+import json
+import uuid
+from dataclasses import make_dataclass
+
+import numpy as np
+import pytest
+
+from src.domain.core.value_objects import Money
+from src.domain.fortune.algorithms.bazi import calculate_bazi
+from src.domain.fortune.entities import BaziResult, ZiweiResult
+from src.domain.jewelry.events import JewelryCreatedEvent
+from src.domain.user.events import SpiritualPowerChangedEvent
+from src.infrastructure.utils.cache_manager import CacheManager, RedisBackend
+from src.infrastructure.utils.codec import BinaryCodec, CodecError, binary_codec
+
+
+def _bazi_result():
+    return BaziResult(["庚", "辛", "丙", "癸"], ["午", "巳", "子", "巳"],
+                      {"木": 0.1, "火": 0.35, "土": 0.15, "金": 0.25, "水": 0.15}, ["火"], ["木"], "宜佩戴绿幽灵")
+
+
+def test_domain_objects_round_trip_smaller_than_json():
+    bazi = _bazi_result()
+    ziwei = ZiweiResult("命宫", ["紫微", "天府"], [{"star": "紫微", "relation": "会照"}], "平稳", "宜静")
+    event = JewelryCreatedEvent(jewelry_id=uuid.uuid4(), name="白水晶手串", category_id=3)
+    for obj in (bazi, ziwei, event):
+        encoded = binary_codec.encode(obj)
+        assert binary_codec.decode(encoded) == obj
+        assert len(encoded) < len(json.dumps(obj.to_dict()).encode())
+
+    decoded = binary_codec.decode(binary_codec.encode(event))
+    assert isinstance(decoded.jewelry_id, uuid.UUID) and decoded.event_type == "jewelry.created"
+
+
+def test_nested_extension_types_round_trip():
+    user_id = uuid.uuid4()
+    value = {
+        "failed": {user_id: "invalid birth data"},
+        "events": [SpiritualPowerChangedEvent(user_id=user_id, amount=20, change_type="increase",
+                                              source_type="reward")],
+        "price": Money(decimal.Decimal("199.00")),
+        "at": datetime.datetime(2026, 10, 18, 8, 30, tzinfo=datetime.timezone.utc),
+        "day": datetime.date(2026, 10, 18),
+        "pair": (1, "甲"),
+        "tags": {"火", "土"},
+        "plain": [[1, 2], {"a": None}]
+    }
+    assert binary_codec.decode(binary_codec.encode(value)) == value
+
+    chart = calculate_bazi({"birth_datetime": "1990-05-15T10:30:00", "gender": "male"})
+    assert binary_codec.decode(binary_codec.encode(chart)) == chart
+    assert binary_codec.decode(binary_codec.encode([np.float64(0.5), np.int64(3)])) == [0.5, 3]
+
+
+def _reading_codec(version=1, **annotations):
+    """注册一个名为 Reading 的数据类（各次调用类路径相同），模拟不同部署版本中的同一类型"""
+    reading = make_dataclass("Reading", list(annotations.items()))
+    reading.__module__, reading.__qualname__ = __name__, "Reading"
+    codec = BinaryCodec(type_modules=())
+    codec.register(reading, version=version)
+    return codec, reading
+
+
+def test_schema_drift_is_detected_by_fingerprint():
+    old, old_reading = _reading_codec(score=int)
+    same, _ = _reading_codec(score=int)
+    assert same.decode(old.encode(old_reading(1))).score == 1
+
+    # 字段改名、改类型、增加字段（字段数不变或变化）与手动提升版本都会被拒绝
+    for new, _ in (_reading_codec(points=int), _reading_codec(score=float),
+                   _reading_codec(score=int, note=str), _reading_codec(version=2, score=int)):
+        with pytest.raises(CodecError, match="fingerprint"):
+            new.decode(old.encode(old_reading(1)))
+
+
+def test_schema_change_is_a_cache_miss():
+    old, reading = _reading_codec(score=int)
+    new, _ = _reading_codec(score=str)
+
+    class Client(dict):
+        def set(self, key, value, ex=None):
+            self[key] = value
+
+        def delete(self, key):
+            self.pop(key, None)
+
+    client = Client()
+    CacheManager(RedisBackend(client, codec=old)).set("reading", reading(1))
+    assert CacheManager(RedisBackend(client, codec=new)).get("reading") is None
+
+
+def test_numpy_scalars_encode_as_python_values():
+    values = [np.bool_(True), np.bool_(False), np.int8(-3), np.float32(0.25), np.str_("甲")]
+    decoded = binary_codec.decode(binary_codec.encode(values))
+
+    assert decoded == [True, False, -3, 0.25, "甲"]
+    assert [type(v) for v in decoded] == [bool, bool, int, float, str]
+    assert binary_codec.decode(binary_codec.encode({"forward": np.bool_(True)})) == {"forward": True}
+
+
+def test_data_from_another_python_version_is_rejected():
+    encoded = bytearray(binary_codec.encode(_bazi_result()))
+    encoded[3] = (encoded[3] + 1) % 256
+
+    with pytest.raises(CodecError):
+        binary_codec.decode(bytes(encoded))
@@ -0,0 +1,139 @@
+from types import SimpleNamespace
+
+import pytest
+
+from src.domain.core.exceptions import ConfigNotFoundError
+from src.infrastructure.messaging.message_broker_client import InMemoryMessageBroker
+from src.infrastructure.utils.cache_manager import CacheManager, MemoryBackend
+from src.infrastructure.utils.dynamic_config import DynamicConfigService
+
+
+class ConfigTable:
+    """按 config_key 存放配置行的最小会话替身，记录查询次数"""
+
+    def __init__(self, **rows):
+        self.rows = {key: SimpleNamespace(config_key=key, config_value=value, config_type=config_type)
+                     for key, (value, config_type) in rows.items()}
+        self.queries = 0
+
+    def __call__(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def query(self, model):
+        self.queries += 1
+        return self
+
+    def filter_by(self, config_key):
+        self._key = config_key
+        return self
+
+    def first(self):
+        return self.rows.get(self._key)
+
+    def filter(self, *criteria):
+        self._criteria = criteria
+        return self
+
+    def all(self):
+        rows = list(self.rows.values())
+        for clause in self._criteria:
+            value = clause.right.value
+            if clause.operator.__name__ == "in_op":
+                rows = [row for row in rows if row.config_key in value]
+            else:
+                rows = [row for row in rows if row.config_key.startswith(value.rstrip("%").replace("\\", ""))]
+        return rows
+
+    def commit(self):
+        pass
+
+
+def test_local_tier_and_invalidation_across_instances():
+    broker, backend = InMemoryMessageBroker(), MemoryBackend()
+    shared = CacheManager(backend)
+    table = ConfigTable(**{"fortune.bazi.default_version": ('{"v": 1}', "json")})
+    writer = DynamicConfigService(table, shared, broker)
+    reader = DynamicConfigService(table, shared, broker)
+
+    assert reader.get_config("fortune.bazi.default_version") == {"v": 1}
+
+    # 稳态读取只走本地快照
+    backend.clear()
+    version, queries = reader.snapshot_version, table.queries
+    assert reader.get_config("fortune.bazi.default_version") == {"v": 1}
+    assert (reader.snapshot_version, table.queries) == (version, queries)
+
+    writer.update_config("fortune.bazi.default_version", '{"v": 2}', "json")
+    assert reader.get_config("fortune.bazi.default_version") == {"v": 2}
+
+    with pytest.raises(ConfigNotFoundError):
+        reader.get_config("fortune.ziwei.default_version")
+
+
+def test_bulk_loads_use_one_query():
+    table = ConfigTable(**{"fortune.bazi.default_version": ('{"version": "v2.0"}', "json"),
+                           "fortune.ziwei.default_version": ('{"version": "v1.1"}', "json"),
+                           "site.name": ("lingxi", "string")})
+    service = DynamicConfigService(table, CacheManager())
+
+    configs = service.get_configs(["fortune.bazi.default_version", "fortune.face.default_version", "site.name"])
+    assert configs == {"fortune.bazi.default_version": {"version": "v2.0"}, "site.name": "lingxi"}
+    assert table.queries == 1
+    assert set(service.get_prefix("fortune.")) == {"fortune.bazi.default_version", "fortune.ziwei.default_version"}
+    assert table.queries == 2
+
+    booted = DynamicConfigService(table, CacheManager(), preload=True)
+    queries = table.queries
+    assert booted.get_prefix("fortune.ziwei") == {"fortune.ziwei.default_version": {"version": "v1.1"}}
+    assert booted.get_configs(["site.name", "fortune.face.default_version"]) == {"site.name": "lingxi"}
+    with pytest.raises(ConfigNotFoundError):
+        booted.get_config("fortune.face.default_version")
+    assert table.queries == queries
+
+
+def test_negative_cache_and_stale_while_revalidate():
+    table = ConfigTable(**{"fortune.bazi.default_version": ('{"version": "v1.0"}', "json")})
+    service = DynamicConfigService(table, CacheManager(), local_ttl=0.0, negative_ttl=60.0)
+
+    for _ in range(3):
+        with pytest.raises(ConfigNotFoundError):
+            service.get_config("fortune.bazi.shadow")
+    assert table.queries == 1
+
+    assert service.get_config("fortune.bazi.default_version") == {"version": "v1.0"}
+    table.rows["fortune.bazi.default_version"].config_value = '{"version": "v2.0"}'
+    # 已过期：先返回旧值，后台刷新
+    assert service.get_config("fortune.bazi.default_version") == {"version": "v1.0"}
+    service._refresher.shutdown(wait=True)
+    assert service.get_config("fortune.bazi.default_version") == {"version": "v2.0"}
+
+
+def test_complete_snapshot_sees_new_keys_and_reloads_only_invalidated_ones():
+    table = ConfigTable(**{"fortune.bazi.default_version": ('{"version": "v1.0"}', "json"),
+                           "fortune.ziwei.default_version": ('{"version": "v1.0"}', "json")})
+    broker, shared = InMemoryMessageBroker(), CacheManager(MemoryBackend())
+    service = DynamicConfigService(table, shared, broker, negative_ttl=0.0, preload=True)
+    writer = DynamicConfigService(table, shared, broker)
+
+    # 绕过 update_config 直接写库的键：完整快照的负缓存过期后回源一次即可见
+    table.rows["fortune.bazi.shadow"] = SimpleNamespace(
+        config_key="fortune.bazi.shadow", config_value='{"version": "v2.0"}', config_type="json")
+    queries = table.queries
+    assert service.get_config("fortune.bazi.shadow") == {"version": "v2.0"}
+    assert service.get_configs(["fortune.bazi.shadow"]) == {"fortune.bazi.shadow": {"version": "v2.0"}}
+    assert table.queries == queries + 1
+
+    # 失效单个键后只重新加载该键一次，之后 get_prefix 仍由本地快照回答
+    writer.update_config("fortune.ziwei.default_version", '{"version": "v1.1"}', "json")
+    queries = table.queries
+    for _ in range(3):
+        assert service.get_prefix("fortune.ziwei") == {"fortune.ziwei.default_version": {"version": "v1.1"}}
+    assert set(service.get_prefix("fortune.")) == {"fortune.bazi.default_version", "fortune.bazi.shadow",
+                                                   "fortune.ziwei.default_version"}
+    assert table.queries == queries + 1
@@ -0,0 +1,29 @@
+import threading
+
+import app as app_module
+from src.domain.fortune import algorithm_registry as registry_module
+from src.domain.fortune.algorithm_registry import AlgorithmRegistry
+from src.infrastructure.monitoring import algorithm_warm_up
+
+
+def test_app_boot_warms_algorithms_and_becomes_ready(monkeypatch):
+    registry = AlgorithmRegistry()
+    monkeypatch.setattr(app_module, "algorithm_registry", registry)
+    monkeypatch.setattr(algorithm_warm_up, "algorithm_registry", registry)
+    # 预热在放行前阻塞，以观察预热期间的未就绪状态
+    release = threading.Event()
+    warm_builtin_tables = registry_module._warm_builtin_tables
+    monkeypatch.setattr(registry_module, "_warm_builtin_tables",
+                        lambda: release.wait(30) and warm_builtin_tables())
+
+    app = app_module.create_app()
+    client = app.test_client()
+
+    response = client.get("/readyz")
+    assert response.status_code == 503 and not response.get_json()["algorithms"]["warmed"]
+
+    release.set()
+    app.extensions["algorithm_warm_up"].join(timeout=60)
+
+    response = client.get("/readyz")
+    assert response.status_code == 200 and response.get_json()["algorithms"]["ready"]